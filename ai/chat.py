@@ -1,5 +1,35 @@
-import requests
+import json
+import time
+import queue
+import threading
+from collections import deque
 from config import API_KEY, BIGMODEL_URL
+from utils.metricas import metricas
+
+# Con menos latencias que estas la cobertura se lanza a los `cobertura_inicial` segundos
+MUESTRAS_MINIMAS = 10
+# Una lectura cortada por el plazo solo se usa si sus frases completas suman al menos estos caracteres
+MINIMO_PARCIAL = 80
+
+class _Intento:
+    """Una petición en curso; la lee su propio hilo"""
+    def __init__(self, numero):
+        self.numero = numero
+        self.enviado = time.monotonic()
+        self.primer_token = None
+        self.partes = []
+        self.uso = None
+        self.respuesta = None
+        self.cancelado = False
+
+    def cancelar(self):
+        self.cancelado = True
+        respuesta = self.respuesta
+        if respuesta is not None:
+            try:
+                respuesta.close()   # desbloquea la lectura del stream
+            except Exception:
+                pass
 
 class BigModelChat:
     def __init__(self):
@@ -9,22 +39,204 @@ class BigModelChat:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-    
-    def send_message(self, mensaje):
-        """Enviar mensaje a BigModel y obtener respuesta"""
+        # Tokens usados en la última petición (según devuelve la API)
+        self.ultimo_uso = None
+        # Plazo por lectura (ver configurar_plazo); sin él se espera lo que haga falta
+        self.presupuesto = None
+        self.percentil = 90
+        self.cobertura_inicial = 2.0
+        self.latencias = deque(maxlen=100)  # segundos hasta el primer token
+        self.pedidas = 0
+        self.fuera_de_plazo = 0
+        self.coberturas = 0
+        self.coberturas_ganadas = 0
+        self.recortadas = 0
+        self.respaldos = 0
+
+    def configurar_plazo(self, presupuesto, percentil=90, cobertura_inicial=2.0):
+        """Limitar cada lectura a `presupuesto` segundos.
+
+        Si la primera petición no ha dado ningún token cuando ya ha pasado el
+        percentil `percentil` de las latencias hasta el primer token, se lanza
+        una segunda igual y se queda la que empiece antes.
+        """
+        self.presupuesto = presupuesto
+        self.percentil = percentil
+        self.cobertura_inicial = cobertura_inicial
+
+    def send_message(self, mensaje, max_tokens=1000, respaldo=None):
+        """Enviar mensaje a BigModel y obtener respuesta.
+
+        Si el LLM falla o no termina dentro del plazo se devuelve `respaldo`
+        (una lectura hecha en local), nunca un mensaje de error.
+        """
         data = {
             "model": "glm-4-flash",
             "messages": [{"role": "user", "content": mensaje}],
-            "max_tokens": 1000,
-            "temperature": 0.7
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            # En streaming sabemos cuándo llega el primer token
+            "stream": True
         }
-        
+        self.ultimo_uso = None
+        self.pedidas += 1
+
+        metricas.marcar('llm_enviado')
+        inicio = time.monotonic()
+        plazo = inicio + self.presupuesto if self.presupuesto else None
+        cobertura = inicio + self._espera_cobertura() if plazo else None
+        avisos = queue.Queue()
+        intentos = [self._lanzar(0, data, avisos)]
+        pendientes = 1
+        ganador = None
+        texto = None
         try:
-            response = requests.post(self.url, headers=self.headers, json=data)
-            
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                return f"Error: {response.status_code}"
+            while True:
+                limites = [t for t in (plazo, cobertura) if t is not None]
+                espera = max(0.0, min(limites) - time.monotonic()) if limites else None
+                try:
+                    tipo, intento, detalle = avisos.get(timeout=espera)
+                except queue.Empty:
+                    ahora = time.monotonic()
+                    if ahora >= plazo:
+                        break
+                    if cobertura is None or ahora < cobertura:
+                        continue
+                    # la primera petición no da señales: lanzar la cobertura
+                    cobertura = None
+                    self.coberturas += 1
+                    metricas.contar('llm_cobertura')
+                    print(f"\n⏱️ LLM: lanzando una segunda petición "
+                          f"({ahora - inicio:.1f} s sin respuesta)")
+                    intentos.append(self._lanzar(1, data, avisos))
+                    pendientes += 1
+                    continue
+
+                if tipo == 'primer':
+                    if ganador is None:
+                        ganador = intento
+                        cobertura = None
+                        metricas.marcar('primer_token', intento.primer_token)
+                        self.latencias.append(intento.primer_token - intento.enviado)
+                        for otro in intentos:
+                            if otro is not intento:
+                                otro.cancelar()
+                    continue
+
+                pendientes -= 1
+                if intento.cancelado:
+                    continue
+                if tipo == 'fin' and intento.partes:
+                    ganador = intento
+                    texto = ''.join(intento.partes)
+                    break
+                print(f"\n❌ Error del LLM: {detalle or 'respuesta vacía'}")
+                if intento is ganador or (ganador is None and pendientes == 0 and cobertura is None):
+                    break
+                if pendientes == 0:
+                    # falló antes de la cobertura: lanzarla ya en lugar de esperar
+                    cobertura = time.monotonic()
+        finally:
+            for intento in intentos:
+                intento.cancelar()
+
+        if texto is not None:
+            metricas.marcar('ultimo_token')
+            self.ultimo_uso = ganador.uso
+            if ganador.numero:
+                self.coberturas_ganadas += 1
+                metricas.contar('llm_cobertura_ganada')
+                print("⏱️ LLM: ganó la segunda petición")
+            metricas.anotar('llm', 'cobertura' if ganador.numero else 'llm')
+            return texto
+
+        if plazo is not None and time.monotonic() >= plazo:
+            self.fuera_de_plazo += 1
+            metricas.contar('llm_fuera_de_plazo')
+            print(f"\n⏱️ LLM: fuera de plazo ({self.presupuesto:.1f} s)")
+            parcial = _hasta_ultima_frase(''.join(ganador.partes)) if ganador else ''
+            if len(parcial) >= MINIMO_PARCIAL:
+                # ya casi estaba: mejor sus frases completas que una lectura de plantilla
+                self.recortadas += 1
+                metricas.contar('llm_recortada')
+                metricas.anotar('llm', 'recortada')
+                return parcial
+        self.respaldos += 1
+        metricas.contar('llm_respaldo')
+        metricas.anotar('llm', 'respaldo')
+        print("🔮 Usando la lectura local")
+        return respaldo
+
+    def informe(self):
+        """Resumen de cómo acabaron las lecturas pedidas hasta ahora"""
+        def porcentaje(n):
+            return f"{100.0 * n / self.pedidas:.0f}%" if self.pedidas else "-"
+        lineas = [f"   lecturas {self.pedidas}, fuera de plazo {self.fuera_de_plazo} "
+                  f"({porcentaje(self.fuera_de_plazo)}), recortadas {self.recortadas}, "
+                  f"locales {self.respaldos} ({porcentaje(self.respaldos)})",
+                  f"   segundas peticiones {self.coberturas}, ganadas {self.coberturas_ganadas}"]
+        if self.latencias:
+            lineas.append(f"   primer token: p{self.percentil} {self._percentil():.2f} s "
+                          f"({len(self.latencias)} muestras)")
+        return '\n'.join(lineas)
+
+    def _espera_cobertura(self):
+        if len(self.latencias) < MUESTRAS_MINIMAS:
+            return self.cobertura_inicial
+        return self._percentil()
+
+    def _percentil(self):
+        # solo se miden las peticiones que llegan a dar tokens: si acaso, se cubre antes
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * self.percentil / 100))]
+
+    def _lanzar(self, numero, data, avisos):
+        intento = _Intento(numero)
+        threading.Thread(target=self._pedir, args=(intento, data, avisos),
+                         name=f"llm-{numero}", daemon=True).start()
+        return intento
+
+    def _pedir(self, intento, data, avisos):
+        """Hilo de una petición: avisa del primer token y de cómo termina"""
+        try:
+            import requests
+            # sin plazo no hay timeout, como siempre; con plazo, ninguna lectura del socket lo supera
+            timeout = self.presupuesto or None
+            with requests.post(self.url, headers=self.headers, json=data, stream=True,
+                               timeout=timeout) as response:
+                intento.respuesta = response
+                if intento.cancelado:
+                    return avisos.put(('fin', intento, None))
+                if response.status_code != 200:
+                    return avisos.put(('error', intento, f"HTTP {response.status_code}"))
+                self._leer_stream(response, intento, avisos)
+            avisos.put(('fin', intento, None))
         except Exception as e:
-            return f"Error de conexión: {str(e)}"
\ No newline at end of file
+            avisos.put(('error', intento, f"conexión: {e}"))
+
+    def _leer_stream(self, response, intento, avisos):
+        """Juntar los fragmentos (eventos SSE) de una respuesta en streaming"""
+        for linea in response.iter_lines():
+            if intento.cancelado:
+                return
+            linea = linea.decode('utf-8').strip()
+            if not linea.startswith('data:'):
+                continue
+            contenido = linea[5:].strip()
+            if contenido == '[DONE]':
+                break
+
+            fragmento = json.loads(contenido)
+            if fragmento.get("usage"):
+                intento.uso = fragmento["usage"]
+            for opcion in fragmento.get("choices", []):
+                texto = opcion.get("delta", {}).get("content")
+                if texto:
+                    if not intento.partes:
+                        intento.primer_token = time.monotonic()
+                        avisos.put(('primer', intento, None))
+                    intento.partes.append(texto)
+
+def _hasta_ultima_frase(texto):
+    fin = max(texto.rfind(signo) for signo in '.!?')
+    return texto[:fin + 1].strip() if fin >= 0 else ''
@@ -0,0 +1,15 @@
+def indice_dispositivo(pyaudio_instance, dispositivo, entrada=True):
+    """Índice de PyAudio de un dispositivo dado por índice o por parte de su nombre.
+
+    None deja el dispositivo predeterminado del sistema.
+    """
+    if dispositivo is None or isinstance(dispositivo, int):
+        return dispositivo
+    buscado = dispositivo.lower()
+    for i in range(pyaudio_instance.get_device_count()):
+        info = pyaudio_instance.get_device_info_by_index(i)
+        canales = info['maxInputChannels'] if entrada else info['maxOutputChannels']
+        if canales > 0 and buscado in info['name'].lower():
+            return i
+    raise ValueError(f"no hay ningún dispositivo de {'entrada' if entrada else 'salida'} "
+                     f"que se llame '{dispositivo}'")
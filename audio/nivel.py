@@ -0,0 +1,27 @@
+import math
+from array import array
+
+def rms_pcm16(data):
+    """Nivel RMS de un bloque PCM de 16 bits mono"""
+    muestras = array('h', data)
+    if not muestras:
+        return 0.0
+    return math.sqrt(sum(m * m for m in muestras) / len(muestras))
+
+def envolvente_pcm16(data, frames_por_bloque, canales=1):
+    """RMS de cada bloque de `frames_por_bloque` frames de un PCM de 16 bits.
+
+    Con numpy se calcula de una vez para todo el audio; sin él, bloque a bloque.
+    """
+    paso = frames_por_bloque * canales
+    try:
+        import numpy as np
+    except ImportError:
+        return [rms_pcm16(data[i:i + 2 * paso]) for i in range(0, len(data) - 1, 2 * paso)]
+    muestras = np.frombuffer(data, dtype='<i2', count=len(data) // 2).astype(np.float32)
+    if not len(muestras):
+        return []
+    inicios = np.arange(0, len(muestras), paso)
+    sumas = np.add.reduceat(muestras * muestras, inicios)
+    cuentas = np.diff(np.append(inicios, len(muestras)))
+    return np.sqrt(sumas / cuentas).tolist()
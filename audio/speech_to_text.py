@@ -1,42 +1,73 @@
 import os
 import json
-import zipfile
-import requests
-import vosk
-import pyaudio
+import time
 from config import VOSK_MODEL_DIR
+from utils.perfil_arranque import perfil
+from audio.dispositivos import indice_dispositivo
+
+# vosk, pyaudio y requests se importan al usarse por primera vez: son lo más
+# lento del arranque y así no se pagan antes de mostrar nada
 
 class VoskSTT:
     def __init__(self):
         self.vosk_model_dir = VOSK_MODEL_DIR
+        self.modelo_path = None
         self.model = None
         self.recognizer = None
         self.audio_stream = None
         self.pyaudio_instance = None
+        self.dispositivo = None     # índice o nombre del micrófono; None = el predeterminado
+        self.ultimo_bloque = 0.0    # monotonic del último bloque leído del micrófono
+        # Para medir latencias: cuándo cambió por última vez el parcial
+        # (≈ fin del habla) y los tiempos del último resultado final
+        self._ultimo_parcial = ''
+        self._fin_habla = None
+        self.tiempos_final = None
     
     def initialize(self):
         """Inicializar Vosk y configurar modelo"""
-        modelo_path = self._configurar_modelo()
-        if not modelo_path:
+        self.modelo_path = self._configurar_modelo()
+        if not self.modelo_path:
             return False
         
         try:
-            self.model = vosk.Model(modelo_path)
-            self.recognizer = vosk.KaldiRecognizer(self.model, 16000)
+            if self.model is None:
+                self.cargar_modelo()
+            else:
+                # modelo ya cargado (p. ej. heredado del lanzador prefork): solo falta el reconocedor
+                import vosk
+                self.recognizer = vosk.KaldiRecognizer(self.model, 16000)
             return True
         except Exception as e:
             print(f"Error inicializando Vosk: {e}")
             return False
     
+    def cargar_modelo(self):
+        """Cargar el modelo y crear el reconocedor (también al volver de un descanso)"""
+        with perfil.medir('importar vosk'):
+            import vosk
+        with perfil.medir('cargar modelo vosk'):
+            model = vosk.Model(self.modelo_path)
+        self.model = model
+        self.recognizer = vosk.KaldiRecognizer(model, 16000)
+    
+    def liberar_modelo(self):
+        """Soltar el modelo para ahorrar memoria; procesar_bloque no reconoce nada hasta recargarlo"""
+        self.recognizer = None
+        self.model = None
+        self._ultimo_parcial, self._fin_habla = '', None
+    
     def start_listening(self):
         """Iniciar captura de audio"""
         try:
+            import pyaudio
             self.pyaudio_instance = pyaudio.PyAudio()
             self.audio_stream = self.pyaudio_instance.open(
                 format=pyaudio.paInt16,
                 channels=1,
                 rate=16000,
                 input=True,
+                input_device_index=indice_dispositivo(self.pyaudio_instance, self.dispositivo),
                 frames_per_buffer=8000
             )
             self.audio_stream.start_stream()
@@ -50,16 +81,49 @@ class VoskSTT:
         if not self.audio_stream or not self.recognizer:
             return None, None
         
+        data = self.leer_bloque()
+        if data is None:
+            return None, None
+        return self.procesar_bloque(data)
+    
+    def leer_bloque(self, frames=4000):
+        """Leer un bloque de audio del micrófono (bloquea hasta tenerlo)"""
         try:
-            data = self.audio_stream.read(4000, exception_on_overflow=False)
-            
-            if self.recognizer.AcceptWaveform(data):
-                result = json.loads(self.recognizer.Result())
+            data = self.audio_stream.read(frames, exception_on_overflow=False)
+            self.ultimo_bloque = time.monotonic()
+            return data
+        except Exception as e:
+            print(f"Error leyendo audio: {e}")
+            return None
+    
+    def descartar_pendiente(self):
+        """Tirar el audio acumulado en el buffer (p. ej. el eco del TTS)"""
+        try:
+            disponibles = self.audio_stream.get_read_available()
+            if disponibles:
+                self.audio_stream.read(disponibles, exception_on_overflow=False)
+        except Exception as e:
+            print(f"Error vaciando audio: {e}")
+    
+    def procesar_bloque(self, data):
+        """Pasar un bloque al reconocedor; devuelve (texto_final, texto_parcial)"""
+        recognizer = self.recognizer
+        if recognizer is None:
+            return None, None
+        try:
+            if recognizer.AcceptWaveform(data):
+                result = json.loads(recognizer.Result())
                 if result.get('text'):
+                    ahora = time.monotonic()
+                    self.tiempos_final = (self._fin_habla or ahora, ahora)
+                    self._ultimo_parcial, self._fin_habla = '', None
                     return result['text'], None
             else:
-                partial = json.loads(self.recognizer.PartialResult())
+                partial = json.loads(recognizer.PartialResult())
                 if partial.get('partial'):
+                    if partial['partial'] != self._ultimo_parcial:
+                        self._ultimo_parcial = partial['partial']
+                        self._fin_habla = time.monotonic()
                     return None, partial['partial']
             
             return None, None
@@ -67,6 +131,13 @@ class VoskSTT:
             print(f"Error en reconocimiento: {e}")
             return None, None
     
+    def reiniciar(self):
+        """Olvidar lo que el reconocedor tenga a medias"""
+        recognizer = self.recognizer
+        if recognizer:
+            recognizer.Reset()
+        self._ultimo_parcial, self._fin_habla = '', None
+    
     def stop_listening(self):
         """Detener captura de audio"""
         try:
@@ -101,6 +172,9 @@ class VoskSTT:
         
         print("Descargando modelo Vosk en español...")
         try:
+            import requests
+            import zipfile
+            
             response = requests.get(modelo_url, stream=True)
             
             with open(modelo_zip, 'wb') as f:
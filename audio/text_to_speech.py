@@ -1,19 +1,54 @@
 import os
+import time
 import tempfile
-import subprocess
-import pyaudio
-import wave
-from config import PIPER_EXECUTABLE, PIPER_DATA_DIR, MODELO_VOZ, BASE_DIR
+from config import PIPER_EXECUTABLE, PIPER_DATA_DIR, PIPER_DIR, MODELO_VOZ
+from utils.metricas import metricas
+from audio.nivel import envolvente_pcm16
+from audio.dispositivos import indice_dispositivo
+
+FRAMES_BLOQUE = 1024    # frames por escritura al stream de salida
+ADELANTO_BLOQUES = 2    # la boca se adelanta ~90 ms a lo que suena
+NIVEL_MINIMO = 1000.0   # RMS por debajo del cual un audio entero se toma por silencio
+
+class SalidaNula:
+    """Sustituye al stream de salida: descarta el audio, tardando lo que duraría si tiempo_real"""
+    def __init__(self, tiempo_real=True):
+        self.tiempo_real = tiempo_real
+        self.bytes_por_segundo = None
+
+    def configurar(self, ancho, canales, frecuencia):
+        self.bytes_por_segundo = ancho * canales * frecuencia
+
+    def write(self, data):
+        if self.tiempo_real:
+            time.sleep(len(data) / self.bytes_por_segundo)
 
 class PiperTTS:
     def __init__(self):
         self.piper_executable = PIPER_EXECUTABLE
         self.piper_data_dir = PIPER_DATA_DIR
         self.modelo_voz = MODELO_VOZ
-        self.base_dir = BASE_DIR
+        self.piper_dir = PIPER_DIR
+        # PyAudio y el stream de salida se abren una vez y quedan residentes
+        self.pyaudio_instance = None
+        self.stream_salida = None
+        self.formato_salida = None
+        self.salida_nula = None
+        self.dispositivo = None     # índice o nombre del altavoz; None = el predeterminado
+        # función(nivel 0..1) que recibe la envolvente mientras suena el audio
+        self.al_nivel = None
   
     def speak(self, texto):
         """Convertir texto a voz y reproducir"""
+        output_file = self.sintetizar(texto)
+        if not output_file:
+            return False
+        
+        self.reproducir(output_file)
+        return True
+    
+    def sintetizar(self, texto):
+        """Generar el WAV con Piper; devuelve la ruta del archivo o None"""
         try:
             # Limpiar el texto antes de enviarlo a Piper
             texto_limpio = self._limpiar_texto(texto)
@@ -24,10 +59,9 @@ class PiperTTS:
                 output_file = temp_file.name
             
             # Configurar entorno
-            piper_dir = os.path.join(self.base_dir, "piper")
             env = os.environ.copy()
-            env['LD_LIBRARY_PATH'] = f"{piper_dir}:{env.get('LD_LIBRARY_PATH', '')}"
-            env['ESPEAK_DATA_PATH'] = os.path.join(piper_dir, "espeak-ng-data")
+            env['LD_LIBRARY_PATH'] = f"{self.piper_dir}:{env.get('LD_LIBRARY_PATH', '')}"
+            env['ESPEAK_DATA_PATH'] = os.path.join(self.piper_dir, "espeak-ng-data")
             
             # Crear archivo temporal con el texto limpio
             with tempfile.NamedTemporaryFile(mode='w', delete=False, encoding='utf-8') as texto_file:
@@ -35,6 +69,7 @@ class PiperTTS:
                 texto_file_path = texto_file.name
             
             # Ejecutar piper directamente
+            import subprocess
             cmd = [self.piper_executable, '--model', modelo_path, '--output_file', output_file]
             
             with open(texto_file_path, 'r', encoding='utf-8') as input_file:
@@ -45,17 +80,24 @@ class PiperTTS:
             os.remove(texto_file_path)
             
             if result.returncode == 0 and os.path.exists(output_file):
-                # Reproducir usando PyAudio directamente
-                self._reproducir_wav(output_file)
-                os.remove(output_file)
-                return True
+                return output_file
             else:
                 print(f"Error en Piper: {result.stderr}")
-                return False
+                return None
                 
         except Exception as e:
             print(f"Error TTS: {e}")
-            return False
+            return None
+    
+    def reproducir(self, archivo_wav, borrar=True):
+        """Reproducir un WAV ya sintetizado y borrarlo (salvo que se vaya a reutilizar)"""
+        self._reproducir_wav(archivo_wav)
+        if not borrar:
+            return
+        try:
+            os.remove(archivo_wav)
+        except OSError:
+            pass
 
     def _limpiar_texto(self, texto):
         """Limpiar texto eliminando símbolos innecesarios pero manteniendo puntuación y números"""
@@ -79,31 +121,107 @@ class PiperTTS:
         
     def _reproducir_wav(self, archivo_wav):
         """Reproducir archivo WAV usando PyAudio"""
+        import wave
         try:
             with wave.open(archivo_wav, 'rb') as wf:
-                # Configurar PyAudio para reproducción
-                p = pyaudio.PyAudio()
-                
-                stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                               channels=wf.getnchannels(),
-                               rate=wf.getframerate(),
-                               output=True)
-                
-                # Leer y reproducir el archivo por chunks
-                chunk_size = 1024
-                data = wf.readframes(chunk_size)
-                
-                while data:
-                    stream.write(data)
-                    data = wf.readframes(chunk_size)
-                
-                # Limpiar
-                stream.stop_stream()
-                stream.close()
-                p.terminate()
-                
+                ancho, canales, frecuencia = wf.getsampwidth(), wf.getnchannels(), wf.getframerate()
+                stream = self._abrir_salida(ancho, canales, frecuencia)
+                data = wf.readframes(wf.getnframes())
+
+            # Envolvente de todo el audio de una vez, antes de empezar a sonar
+            niveles = None
+            if self.al_nivel and ancho == 2:
+                niveles = self._normalizar(envolvente_pcm16(data, FRAMES_BLOQUE, canales))
+            # bloques que el stream tiene en cola antes de que suene lo recién escrito
+            latencia = getattr(stream, 'get_output_latency', lambda: 0.0)()
+            en_cola = round(latencia * frecuencia / FRAMES_BLOQUE)
+
+            # Reproducir por chunks
+            paso = FRAMES_BLOQUE * ancho * canales
+            for i, inicio in enumerate(range(0, len(data), paso)):
+                if niveles:
+                    self._publicar_nivel(niveles, i - en_cola)
+                stream.write(data[inicio:inicio + paso])
+                if i == 0:
+                    metricas.marcar('primera_muestra')
+
+            # Lo que queda en cola sigue sonando `latencia` segundos más: la boca lo
+            # acompaña y el fin se marca cuando deja de sonar de verdad. Un sumidero
+            # nulo sin tiempo real no tiene nada que esperar.
+            fin = time.monotonic() + latencia
+            if getattr(stream, 'tiempo_real', True):
+                if niveles:
+                    for i in range(len(niveles) - en_cola, len(niveles)):
+                        self._publicar_nivel(niveles, i)
+                        time.sleep(FRAMES_BLOQUE / frecuencia)
+                resto = fin - time.monotonic()
+                if resto > 0:
+                    time.sleep(resto)
+            metricas.marcar('fin_reproduccion', fin)
+
         except Exception as e:
             print(f"Error reproduciendo audio: {e}")
+        finally:
+            if self.al_nivel:
+                self.al_nivel(0.0)
+
+    @staticmethod
+    def _normalizar(envolvente):
+        """Llevar la envolvente a 0..1 respecto al pico de esta frase"""
+        if not envolvente:
+            return []
+        pico = max(max(envolvente), NIVEL_MINIMO)
+        return [min(1.0, e / pico) for e in envolvente]
+
+    def _publicar_nivel(self, niveles, i):
+        """Nivel del bloque que suena ahora o de los próximos (el mayor)"""
+        ventana = niveles[max(0, i):max(0, i + 1 + ADELANTO_BLOQUES)]
+        self.al_nivel(max(ventana) if ventana else 0.0)
+    
+    def silenciar(self, tiempo_real=True):
+        """Mandar el audio a un sumidero nulo (repeticiones y benchmarks sin altavoz)"""
+        self._cerrar_salida()
+        self.salida_nula = SalidaNula(tiempo_real)
+    
+    def _abrir_salida(self, ancho, canales, frecuencia):
+        """Reutilizar el stream de salida mientras el formato no cambie"""
+        if self.salida_nula:
+            self.salida_nula.configurar(ancho, canales, frecuencia)
+            return self.salida_nula
+        formato = (ancho, canales, frecuencia)
+        if self.stream_salida and self.formato_salida == formato:
+            return self.stream_salida
+        
+        self._cerrar_salida()
+        if not self.pyaudio_instance:
+            import pyaudio
+            self.pyaudio_instance = pyaudio.PyAudio()
+        p = self.pyaudio_instance
+        self.stream_salida = p.open(format=p.get_format_from_width(ancho),
+                                    channels=canales,
+                                    rate=frecuencia,
+                                    output=True,
+                                    output_device_index=indice_dispositivo(p, self.dispositivo,
+                                                                           entrada=False))
+        self.formato_salida = formato
+        return self.stream_salida
+    
+    def _cerrar_salida(self):
+        if self.stream_salida:
+            self.stream_salida.stop_stream()
+            self.stream_salida.close()
+        self.stream_salida = None
+        self.formato_salida = None
+    
+    def cerrar(self):
+        """Liberar el dispositivo de salida"""
+        try:
+            self._cerrar_salida()
+            if self.pyaudio_instance:
+                self.pyaudio_instance.terminate()
+                self.pyaudio_instance = None
+        except Exception as e:
+            print(f"Error cerrando audio: {e}")
     
     def verificar_configuracion(self):
         """Verificar que Piper y el modelo estén disponibles"""
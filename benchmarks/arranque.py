@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque: lanza `main.py --profile-startup` varias veces y
+compara la mediana de cada etapa con la línea base guardada.
+
+    python benchmarks/arranque.py                  # comparar con la línea base
+    python benchmarks/arranque.py --guardar        # guardar una línea base nueva
+
+Sale con código 1 si alguna etapa empeora más de la tolerancia.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from comparar import cargar_base, guardar_base, comparar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(RAIZ, "benchmarks", "baseline_arranque.json")
+
+def medir_arranque(repeticiones):
+    """Ejecutar el arranque perfilado y devolver las medianas por etapa (ms)"""
+    muestras = {}
+    for _ in range(repeticiones):
+        with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+            ruta = f.name
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", "--profile-startup", ruta],
+                       cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        muestras.setdefault('proceso completo', []).append((time.perf_counter() - t0) * 1000)
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                datos = json.load(f)
+            for etapa, ms in datos['etapas'].items():
+                muestras.setdefault(etapa, []).append(ms)
+        except (OSError, ValueError):
+            print("⚠️ El arranque no llegó a escribir su perfil")
+        finally:
+            os.remove(ruta)
+    return {etapa: statistics.median(valores) for etapa, valores in muestras.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque")
+    parser.add_argument('-n', '--repeticiones', type=int, default=5)
+    parser.add_argument('--tolerancia', type=float, default=0.20,
+                        help="empeoramiento relativo permitido por etapa (0.20 = 20%%)")
+    parser.add_argument('--margen-ms', type=float, default=5.0,
+                        help="diferencia absoluta por debajo de la cual no se considera regresión")
+    parser.add_argument('--guardar', action='store_true', help="guardar el resultado como línea base")
+    args = parser.parse_args()
+
+    resultado = medir_arranque(args.repeticiones)
+
+    if args.guardar:
+        guardar_base(BASELINE, resultado)
+
+    regresiones = comparar(resultado, cargar_base(BASELINE), args.tolerancia,
+                           args.margen_ms, unidad='ms')
+    if regresiones:
+        print(f"Regresión de arranque en: {', '.join(regresiones)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
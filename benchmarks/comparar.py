@@ -0,0 +1,38 @@
+"""
+Comparación de un resultado de benchmark con su línea base guardada.
+
+Todas las métricas son "menos es mejor"; una métrica empeora si supera a la
+base en más de la tolerancia relativa y también en más del margen absoluto
+(para no saltar por ruido en valores pequeños).
+"""
+import os
+import json
+
+def cargar_base(ruta):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+def guardar_base(ruta, resultado):
+    with open(ruta, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"Línea base guardada en {ruta}")
+
+def comparar(resultado, base, tolerancia, margen, unidad=''):
+    """Imprimir la tabla actual/base y devolver las métricas que empeoraron"""
+    regresiones = []
+    ancho = max([28] + [len(nombre) for nombre in resultado])
+    print(f"{'métrica':<{ancho}} {'actual':>10} {'base':>10}")
+    for nombre, valor in sorted(resultado.items(), key=lambda e: -e[1]):
+        ref = base.get(nombre)
+        ref_txt = f"{ref:8.1f}{unidad}" if ref is not None else " " * (8 + len(unidad))
+        marca = ""
+        if ref is not None and valor - ref > margen and valor > ref * (1 + tolerancia):
+            regresiones.append(nombre)
+            marca = "  ❌"
+        print(f"{nombre:<{ancho}} {valor:8.1f}{unidad} {ref_txt}{marca}")
+
+    if not base:
+        print("Sin línea base: ejecuta con --guardar para crearla")
+    return regresiones
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark del oráculo animado sin pantalla (SDL con el driver `dummy`).
+
+Dibuja el `FortuneTeller` de `utils/sprite_pygame.py` con un atlas sintético
+(o el de assets/ con --assets) siguiendo un guion: reposo, parpadeos y habla
+con la boca movida por una envolvente como la del TTS. El bucle es el mismo
+que el del renderizador: eventos, update, draw_changes, a `FPS`.
+
+    python benchmarks/render.py                  # medir y comparar con la línea base
+    python benchmarks/render.py --guardar        # guardar una línea base nueva
+
+Informa, por fase, ms por cuadro de update, compose y draw, percentiles del
+tiempo de cuadro, cuadros perdidos al ritmo de `FPS` y memoria asignada por
+cuadro (en una pasada aparte sin ritmo, con tracemalloc; solo cuenta lo que
+asigna Python, no los píxeles de SDL). Sale con código 1 si algo empeora
+más de la tolerancia.
+"""
+import os
+import sys
+import math
+import time
+import argparse
+import tracemalloc
+from comparar import cargar_base, guardar_base, comparar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+from utils import sprite_pygame as sp
+
+BASELINE = os.path.join(RAIZ, "benchmarks", "baseline_render.json")
+
+# (fase, segundos)
+GUION = (("reposo", 3.0), ("parpadeo", 2.0), ("habla", 4.0))
+PERCENTILES = (50, 90, 99)
+BLOQUE_TTS = 1024 / 22050   # cada cuánto llega un nivel de boca al hablar
+
+# --- atlas sintético ---
+def atlas_sintetico():
+    """Atlas con base, 4 manos, 3 ojos, 4 bocas y 3 brillos, y su config"""
+    atlas = pygame.Surface((512, 256), pygame.SRCALPHA)
+    cfg = {"offsets": {"hands": [8, 110], "eyes": [38, 40], "mouths": [48, 70], "glow": [0, 0]}}
+
+    pygame.draw.ellipse(atlas, (90, 60, 140), (0, 0, 128, 180))
+    pygame.draw.circle(atlas, (230, 200, 170), (64, 60), 36)
+    cfg["base"] = [[0, 0, 128, 180]]
+
+    cfg["hands"] = []
+    for i in range(4):
+        x = 130 + i * 60
+        pygame.draw.ellipse(atlas, (230, 200, 170), (x, 10 + i * 3, 40, 24))
+        pygame.draw.ellipse(atlas, (230, 200, 170), (x + 16, 30 - i * 3, 40, 24))
+        cfg["hands"].append([x, 0, 58, 60])
+
+    cfg["eyes"] = []
+    for i in range(3):
+        x = 130 + i * 60
+        alto = 10 - i * 4
+        pygame.draw.ellipse(atlas, (20, 20, 40), (x, 70, 14, max(2, alto)))
+        pygame.draw.ellipse(atlas, (20, 20, 40), (x + 36, 70, 14, max(2, alto)))
+        cfg["eyes"].append([x, 64, 52, 16])
+
+    cfg["mouths"] = []
+    for i in range(4):
+        x = 130 + i * 40
+        pygame.draw.ellipse(atlas, (150, 40, 60), (x, 90, 32, 2 + i * 5))
+        cfg["mouths"].append([x, 88, 34, 22])
+
+    cfg["glow"] = []
+    for i in range(3):
+        x = 130 + i * 130
+        color = (120, 140, 255, 40 + 30 * i)
+        pygame.draw.ellipse(atlas, color, (x, 120, 128, 130), 6)
+        cfg["glow"].append([x, 120, 128, 136])
+    return atlas, cfg
+
+def nivel_boca(t):
+    """Envolvente sintética: sílabas de ~4 Hz con pausas entre frases"""
+    if (t % 1.6) > 1.3:
+        return 0.0
+    return abs(math.sin(2 * math.pi * 4 * t)) ** 0.7
+
+# --- guion ---
+class Guion:
+    """Aplica al oráculo lo que toca en cada instante del guion"""
+    def __init__(self, ft):
+        self.ft = ft
+        self.fase = None
+        self.inicio = 0.0
+        self.siguiente = 0.0
+
+    def aplicar(self, fase, t):
+        ft = self.ft
+        if fase != self.fase:
+            self.fase, self.inicio, self.siguiente = fase, t, t
+            estado = {"reposo": "esperando", "parpadeo": "escuchando", "habla": "hablando"}[fase]
+            ft.set_state(estado, {"texto": "Veo en tu camino un encuentro inesperado"})
+        if t < self.siguiente:
+            return
+        if fase == "parpadeo":
+            ft.blink_now()
+            self.siguiente = t + 0.3
+        elif fase == "habla":
+            ft.set_mouth_level(nivel_boca(t - self.inicio))
+            self.siguiente = t + BLOQUE_TTS
+
+def fases(fps):
+    """(fase, cuadros) del guion a `fps`"""
+    return [(fase, int(segundos * fps)) for fase, segundos in GUION]
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def crear_oraculo(usar_assets):
+    if usar_assets:
+        atlas, cfg = sp.load_sprite()
+        if not cfg:
+            sys.exit(f"No hay atlas en {sp.ASSETS}")
+    else:
+        atlas, cfg = atlas_sintetico()
+    return sp.FortuneTeller(atlas, cfg)
+
+# --- medición ---
+def medir_ritmo(screen, usar_assets, fps):
+    """Bucle a ritmo de `fps`: tiempos por parte y cuadros perdidos, por fase"""
+    ft = crear_oraculo(usar_assets)
+    sp.draw_full(screen, ft)
+    guion = Guion(ft)
+    clock = pygame.time.Clock()
+    periodo = 1.0 / fps
+    resultado = {}
+    t = 0.0
+    clock.tick(fps)
+    for fase, cuadros in fases(fps):
+        update, compose, draw, total = [], [], [], []
+        perdidos = 0
+        for _ in range(cuadros):
+            dt = clock.tick(fps) / 1000.0
+            if dt > periodo * 1.5:
+                perdidos += round(dt / periodo) - 1
+            t += dt
+            t0 = time.perf_counter()
+            pygame.event.get()
+            guion.aplicar(fase, t)
+            compose_antes = ft.stats["compose_ms"]
+            t1 = time.perf_counter()
+            ft.update(dt)
+            t2 = time.perf_counter()
+            sp.draw_changes(screen, ft)
+            t3 = time.perf_counter()
+            ms_compose = ft.stats["compose_ms"] - compose_antes
+            compose.append(ms_compose)
+            update.append((t2 - t1) * 1000 - ms_compose)
+            draw.append((t3 - t2) * 1000)
+            total.append((t3 - t0) * 1000)
+        resultado[fase] = {"update": update, "compose": compose, "draw": draw,
+                           "total": total, "perdidos": perdidos}
+    return resultado, ft
+
+def medir_memoria(screen, usar_assets, fps):
+    """Sin ritmo y con tracemalloc: KB transitorios y bloques netos por cuadro, por fase"""
+    ft = crear_oraculo(usar_assets)
+    sp.draw_full(screen, ft)
+    guion = Guion(ft)
+    dt = 1.0 / fps
+    t = 0.0
+    resultado = {}
+    tracemalloc.start()
+    try:
+        for fase, cuadros in fases(fps):
+            kb, bloques = [], []
+            for _ in range(cuadros):
+                t += dt
+                antes, _ = tracemalloc.get_traced_memory()
+                tracemalloc.reset_peak()
+                vivos = sys.getallocatedblocks()
+                pygame.event.get()
+                guion.aplicar(fase, t)
+                ft.update(dt)
+                sp.draw_changes(screen, ft)
+                _, pico = tracemalloc.get_traced_memory()
+                kb.append((pico - antes) / 1024)
+                bloques.append(sys.getallocatedblocks() - vivos)
+            resultado[fase] = (sum(kb) / len(kb), sum(bloques) / len(bloques))
+    finally:
+        tracemalloc.stop()
+    return resultado
+
+def informar(ritmo, memoria, ft, fps):
+    """Imprimir la tabla por fase y devolver las métricas para la línea base"""
+    metricas = {}
+    print(f"{'fase':<10} {'update':>8} {'compose':>8} {'draw':>8} "
+          + " ".join(f"{'p' + str(p):>7}" for p in PERCENTILES)
+          + f" {'perdidos':>9} {'KB/cuadro':>10} {'bloques':>8}")
+    for fase, datos in ritmo.items():
+        n = len(datos["total"])
+        medias = {parte: sum(datos[parte]) / n for parte in ("update", "compose", "draw")}
+        pcts = {p: percentil(datos["total"], p) for p in PERCENTILES}
+        kb, bloques = memoria[fase]
+        print(f"{fase:<10} {medias['update']:8.3f} {medias['compose']:8.3f} {medias['draw']:8.3f} "
+              + " ".join(f"{pcts[p]:7.3f}" for p in PERCENTILES)
+              + f" {datos['perdidos']:4d}/{n:<4d} {kb:10.1f} {bloques:8.1f}")
+        for parte, valor in medias.items():
+            metricas[f"{fase}: {parte} ms"] = valor
+        metricas[f"{fase}: cuadro p{PERCENTILES[-1]} ms"] = pcts[PERCENTILES[-1]]
+        metricas[f"{fase}: KB por cuadro"] = kb
+    print(f"(ms por cuadro; percentiles del cuadro completo; objetivo {fps} fps = {1000 / fps:.1f} ms)")
+    print(f"Oráculo: {ft.stats_text()}\n")
+    return metricas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del oráculo animado sin pantalla")
+    parser.add_argument('--fps', type=int, default=sp.FPS)
+    parser.add_argument('--assets', action='store_true',
+                        help="usar el atlas de assets/ en lugar del sintético")
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help="empeoramiento relativo permitido por métrica (0.25 = 25%%)")
+    parser.add_argument('--margen', type=float, default=0.2,
+                        help="diferencia absoluta por debajo de la cual no se considera regresión")
+    parser.add_argument('--guardar', action='store_true', help="guardar el resultado como línea base")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((sp.W, sp.H))
+    print(f"SDL: {pygame.display.get_driver()}, atlas {'assets' if args.assets else 'sintético'}\n")
+    ritmo, ft = medir_ritmo(screen, args.assets, args.fps)
+    memoria = medir_memoria(screen, args.assets, args.fps)
+    pygame.quit()
+
+    resultado = informar(ritmo, memoria, ft, args.fps)
+    if args.guardar:
+        guardar_base(BASELINE, resultado)
+
+    regresiones = comparar(resultado, cargar_base(BASELINE), args.tolerancia, args.margen)
+    if regresiones:
+        print(f"Regresión de dibujo en: {', '.join(regresiones)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Benchmark de una sesión completa de lectura de la suerte, sin dispositivos.
+
+Se ejecuta el diálogo real de `AsistenteVoz` con Vosk y Piper de verdad,
+pero el micrófono lee respuestas grabadas en WAV (una por turno de escucha),
+el LLM es un servidor local que imita el streaming de BigModel y el audio de
+salida va a un sumidero nulo que tarda lo mismo que tardaría en sonar.
+
+    python benchmarks/sesion.py --generar-audio    # crear los WAV del guion con Piper
+    python benchmarks/sesion.py --guardar          # medir y guardar la línea base
+    python benchmarks/sesion.py                    # medir y comparar
+
+Informa el tiempo de cada sesión, percentiles de latencia por turno, CPU por
+etapa del pipeline y RSS pico. Sale con código 1 si algo empeora más de la
+tolerancia o si alguna sesión no llega al final.
+"""
+import os
+import sys
+import json
+import time
+import wave
+import array
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from comparar import cargar_base, guardar_base, comparar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+BASELINE = os.path.join(RAIZ, "benchmarks", "baseline_sesion.json")
+DIR_AUDIO = os.path.join(RAIZ, "benchmarks", "audio")
+
+# Respuestas del visitante, en el orden en que se le pregunta
+GUION = [
+    "me llamo laura",
+    "treinta y dos",
+    "doce de marzo de mil novecientos noventa y dos",
+    "quiero saber del amor",
+]
+
+LECTURA = ("Tu camino de vida habla de constancia y de una intuición que hoy se "
+           "agudiza. En el amor, el número del día favorece las conversaciones "
+           "sinceras; escucha antes de decidir y deja que los encuentros lleguen "
+           "sin prisa, porque este año personal premia la paciencia.")
+
+FRECUENCIA = 16000          # la que espera Vosk
+SILENCIO_ANTES = 0.3        # segundos de silencio antes de cada respuesta
+SILENCIO_DESPUES = 1.5      # y después, para que Vosk cierre la frase
+
+PERCENTILES = (50, 90, 99)
+ETAPAS = ('captura', 'reconocimiento', 'llm', 'sintesis', 'reproduccion', 'vigilante')
+
+# --- entrada: micrófono con guion ---
+def leer_wav_16k(ruta):
+    """PCM16 mono a 16 kHz de un WAV (se convierte si hace falta)"""
+    with wave.open(ruta, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{ruta}: se esperaba PCM de 16 bits")
+        canales, frecuencia = wf.getnchannels(), wf.getframerate()
+        muestras = array.array('h', wf.readframes(wf.getnframes()))
+    if canales > 1:
+        muestras = array.array('h', (sum(muestras[i:i + canales]) // canales
+                                     for i in range(0, len(muestras), canales)))
+    if frecuencia != FRECUENCIA:
+        muestras = remuestrear(muestras, frecuencia, FRECUENCIA)
+    return muestras.tobytes()
+
+def remuestrear(muestras, origen, destino):
+    """Interpolación lineal: suficiente para voz que solo va a reconocerse"""
+    n = int(len(muestras) * destino / origen)
+    paso = origen / destino
+    salida = array.array('h', bytes(2 * n))
+    ultimo = len(muestras) - 1
+    for i in range(n):
+        x = i * paso
+        j = int(x)
+        if j >= ultimo:
+            salida[i] = muestras[ultimo]
+        else:
+            f = x - j
+            salida[i] = int(muestras[j] * (1 - f) + muestras[j + 1] * f)
+    return salida
+
+def crear_microfono(base, respuestas, tiempo_real=True):
+    """Subclase de VoskSTT cuyo micrófono reproduce las respuestas grabadas"""
+    class MicrofonoGuion(base):
+        def __init__(self):
+            super().__init__()
+            self.respuestas = respuestas
+            self.tiempo_real = tiempo_real
+            self.turno = 0
+            self.buffer = b''
+            self.siguiente = None
+
+        def reiniciar_guion(self):
+            self.turno = 0
+            self.buffer = b''
+
+        def start_listening(self):
+            self.siguiente = time.monotonic()
+            return True
+
+        def descartar_pendiente(self):
+            # Cada turno de escucha nuevo recibe la siguiente respuesta del guion
+            silencio_antes = bytes(2 * int(FRECUENCIA * SILENCIO_ANTES))
+            silencio_despues = bytes(2 * int(FRECUENCIA * SILENCIO_DESPUES))
+            if self.turno < len(self.respuestas):
+                self.buffer = silencio_antes + self.respuestas[self.turno] + silencio_despues
+                self.turno += 1
+            else:
+                self.buffer = b''
+            self.siguiente = time.monotonic()
+
+        def leer_bloque(self, frames=4000):
+            data, self.buffer = self.buffer[:2 * frames], self.buffer[2 * frames:]
+            data = data.ljust(2 * frames, b'\0')
+            if self.tiempo_real:
+                # Entregar al ritmo de un micrófono de verdad
+                self.siguiente += frames / FRECUENCIA
+                espera = self.siguiente - time.monotonic()
+                if espera > 0:
+                    time.sleep(espera)
+                else:
+                    self.siguiente = time.monotonic()
+            return data
+
+        def stop_listening(self):
+            pass
+
+    return MicrofonoGuion
+
+# --- LLM simulado ---
+def servir_llm(puerto, primer_token, por_token):
+    """Servidor SSE con el formato de BigModel (se ejecuta en otro proceso)"""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            time.sleep(primer_token)
+            palabras = LECTURA.split(' ')
+            for i, palabra in enumerate(palabras):
+                fragmento = {"choices": [{"delta": {"content": palabra + (' ' if i < len(palabras) - 1 else '')}}]}
+                if i == len(palabras) - 1:
+                    fragmento["usage"] = {"prompt_tokens": 180, "completion_tokens": len(palabras)}
+                self.wfile.write(f"data: {json.dumps(fragmento)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+                time.sleep(por_token)
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(('127.0.0.1', puerto), Manejador).serve_forever()
+
+def puerto_libre():
+    import socket
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+# --- mediciones ---
+def cpu_por_hilo():
+    """Segundos de CPU de cada hilo con nombre (Linux: /proc/self/task)"""
+    tick = os.sysconf('SC_CLK_TCK')
+    cpu = {}
+    for hilo in threading.enumerate():
+        try:
+            with open(f"/proc/self/task/{hilo.native_id}/stat") as f:
+                campos = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        nombre = 'dialogo' if hilo is threading.main_thread() else hilo.name
+        cpu[nombre] = cpu.get(nombre, 0.0) + (int(campos[11]) + int(campos[12])) / tick
+    return cpu
+
+def percentil(valores, p):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados) + 0.5) - 1))
+    return ordenados[k]
+
+def leer_intervalos(ruta_jsonl):
+    intervalos = {}
+    with open(ruta_jsonl, encoding='utf-8') as f:
+        for linea in f:
+            for nombre, ms in json.loads(linea)['intervalos_ms'].items():
+                intervalos.setdefault(nombre, []).append(ms)
+    return intervalos
+
+# --- benchmark ---
+def generar_audio():
+    """Sintetizar las respuestas del guion con Piper"""
+    import shutil
+    from audio.text_to_speech import PiperTTS
+    tts = PiperTTS()
+    if not tts.verificar_configuracion():
+        sys.exit(1)
+    os.makedirs(DIR_AUDIO, exist_ok=True)
+    for n, texto in enumerate(GUION, 1):
+        archivo = tts.sintetizar(texto)
+        if not archivo:
+            sys.exit(1)
+        destino = os.path.join(DIR_AUDIO, f"{n:02d}.wav")
+        shutil.move(archivo, destino)
+        print(f"🎙️ {destino}: {texto}")
+
+def cargar_respuestas(directorio):
+    archivos = sorted(f for f in os.listdir(directorio) if f.endswith('.wav'))
+    return [leer_wav_16k(os.path.join(directorio, f)) for f in archivos]
+
+def ejecutar(args):
+    import resource
+    import main as programa
+    from utils.metricas import metricas
+
+    if not os.path.isdir(args.audio) or not os.listdir(args.audio):
+        print(f"❌ No hay respuestas grabadas en {args.audio}: ejecuta con --generar-audio")
+        sys.exit(1)
+    respuestas = cargar_respuestas(args.audio)
+    tiempo_real = not args.sin_tiempo_real
+
+    # El asistente se construye con sus propias clases, solo cambian los extremos
+    programa.VoskSTT = crear_microfono(programa.VoskSTT, respuestas, tiempo_real)
+
+    puerto = puerto_libre()
+    servidor = multiprocessing.Process(target=servir_llm, daemon=True,
+                                       args=(puerto, args.llm_primer_token, args.llm_por_token))
+    servidor.start()
+
+    asistente = programa.AsistenteVoz()
+    asistente.chat.url = f"http://127.0.0.1:{puerto}/"
+    asistente.tts.silenciar(tiempo_real)
+    if not asistente.verificar_configuracion() or not asistente.stt.start_listening():
+        servidor.terminate()
+        sys.exit(1)
+
+    fd, ruta_jsonl = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    metricas.configurar(ruta_jsonl=ruta_jsonl)
+
+    orquestador = asistente.orquestador
+    duraciones = []
+    abandonadas = 0
+    try:
+        for n in range(args.calentamiento + args.sesiones):
+            medir = n >= args.calentamiento
+            if medir and not metricas.activo:
+                metricas.activar()
+                cpu_antes = cpu_por_hilo()
+                hijos_antes = resource.getrusage(resource.RUSAGE_CHILDREN)
+            asistente.stt.reiniciar_guion()
+            inicio = time.monotonic()
+            dialogo = orquestador.ejecutar_sesion(asistente.plan, args.timeout)
+            if medir:
+                duraciones.append(time.monotonic() - inicio)
+                abandonadas += dialogo.abandonado or not dialogo.respuesta
+        cpu_despues = cpu_por_hilo()
+        hijos_despues = resource.getrusage(resource.RUSAGE_CHILDREN)
+    finally:
+        asistente.detener()
+        servidor.terminate()
+
+    resultado = {}
+    for p in PERCENTILES:
+        resultado[f"sesion p{p} ms"] = percentil(duraciones, p) * 1000
+    for nombre, valores in leer_intervalos(ruta_jsonl).items():
+        for p in PERCENTILES:
+            resultado[f"{nombre} p{p} ms"] = percentil(valores, p)
+    os.remove(ruta_jsonl)
+
+    for etapa in ETAPAS + ('dialogo',):
+        cpu = cpu_despues.get(etapa, 0.0) - cpu_antes.get(etapa, 0.0)
+        resultado[f"cpu {etapa} ms/sesion"] = cpu * 1000 / args.sesiones
+    piper = (hijos_despues.ru_utime + hijos_despues.ru_stime
+             - hijos_antes.ru_utime - hijos_antes.ru_stime)
+    resultado["cpu piper ms/sesion"] = piper * 1000 / args.sesiones
+    # ru_maxrss está en KB en Linux
+    resultado["rss pico MB"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    resultado["rss pico piper MB"] = hijos_despues.ru_maxrss / 1024
+    return resultado, abandonadas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de una sesión completa")
+    parser.add_argument('-n', '--sesiones', type=int, default=5)
+    parser.add_argument('--calentamiento', type=int, default=1,
+                        help="sesiones previas sin medir (sintetizan las frases fijas)")
+    parser.add_argument('--audio', default=DIR_AUDIO,
+                        help="directorio con las respuestas en WAV, en orden alfabético")
+    parser.add_argument('--generar-audio', action='store_true',
+                        help="crear las respuestas del guion con Piper y salir")
+    parser.add_argument('--llm-primer-token', type=float, default=0.4, metavar='S')
+    parser.add_argument('--llm-por-token', type=float, default=0.02, metavar='S')
+    parser.add_argument('--timeout', type=float, default=20,
+                        help="segundos sin voz para dar una sesión por abandonada")
+    parser.add_argument('--sin-tiempo-real', action='store_true',
+                        help="no esperar lo que durarían la entrada y la salida de audio")
+    parser.add_argument('--tolerancia', type=float, default=0.20,
+                        help="empeoramiento relativo permitido por métrica (0.20 = 20%%)")
+    parser.add_argument('--margen', type=float, default=5.0,
+                        help="diferencia absoluta (ms o MB) por debajo de la cual no hay regresión")
+    parser.add_argument('--guardar', action='store_true', help="guardar el resultado como línea base")
+    parser.add_argument('--json', metavar='RUTA', help="guardar también el resultado en JSON")
+    args = parser.parse_args()
+    if args.sesiones < 1:
+        parser.error("--sesiones debe ser al menos 1")
+    if args.calentamiento < 0:
+        parser.error("--calentamiento no puede ser negativo")
+
+    if args.generar_audio:
+        generar_audio()
+        return
+
+    resultado, abandonadas = ejecutar(args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+    if args.guardar and not abandonadas:
+        guardar_base(BASELINE, resultado)
+
+    regresiones = comparar(resultado, cargar_base(BASELINE), args.tolerancia, args.margen)
+    if abandonadas:
+        print(f"❌ {abandonadas} de {args.sesiones} sesiones no llegaron a la lectura")
+        sys.exit(1)
+    if regresiones:
+        print(f"Regresión en: {', '.join(regresiones)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tokens de la lectura antes y después de calcular la numerología en local.
+
+Envía al LLM de verdad, para una misma sesión de ejemplo, el prompt de antes
+(instrucciones que piden simular los cálculos y los datos tal como se
+dijeron, con max_tokens 1000) y el de ahora (instrucciones del plan y el
+resumen de `utils/numerologia.py`, con `max_tokens_lectura`). Los tokens
+salen del bloque `usage` de la API (`chat.ultimo_uso`), no de una estimación.
+
+    python benchmarks/tokens.py              # 3 lecturas de cada
+    python benchmarks/tokens.py -n 10 --json tokens.json
+
+Necesita red y la API_KEY de config.py. Las lecturas que fallan o no traen
+`usage` se descartan; sale con código 1 si de algún prompt no queda ninguna.
+"""
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from config import CONFIG_SECUENCIA
+from ai.chat import BigModelChat
+from pipeline.plan import cargar
+from utils import numerologia
+
+# Lo que respondió el visitante, tal como lo escribe Vosk
+DATOS = {
+    'nombre': "me llamo laura",
+    'edad': "treinta y dos",
+    'fecha de nacimiento': "doce de marzo de mil novecientos noventa y dos",
+}
+TEMA = 'amor'
+
+# Instrucciones y límite de antes de calcular en local
+INSTRUCCIONES_ANTES = (
+    "Eres un lector de la suerte con un enfoque en la numerología y la astrología. Tu "
+    "misión es analizar la suerte de una persona en un área específica basándote en su "
+    "fecha de nacimiento y la fecha actual. Utiliza un tono serio, sabio y ligeramente "
+    "científico. La respuesta debe ser solo un resumen, y debe simular cálculos "
+    "numerológicos o astrológicos para justificar la lectura. Explica el significado de "
+    "los números de su fecha de nacimiento y cómo se relacionan con la fecha de hoy para "
+    "determinar su suerte. NO utilices guiones, asteriscos, símbolos o viñetas. Solo usa "
+    "texto de prosa simple. \n\nTema elegido: {tema_elegido}\n\nAquí están los datos de "
+    "la persona:\nFecha actual: {fecha_actual}")
+MAX_TOKENS_ANTES = 1000
+
+def prompt_antes(ahora):
+    prompt = INSTRUCCIONES_ANTES.replace('{tema_elegido}', TEMA)
+    datos = f"Fecha actual: {ahora.strftime('%d-%m-%Y %H:%M:%S')}\n"
+    for clave, valor in DATOS.items():
+        datos += f"{clave.capitalize()}: {valor}\n"
+    return prompt + "\n" + datos.strip()
+
+def prompt_ahora(plan, ahora):
+    prompt = plan.plantilla_llm.render(tema_elegido=TEMA, fecha_actual=ahora.strftime("%d-%m-%Y"))
+    return prompt + "\n" + numerologia.resumen(DATOS, ahora.date())
+
+def medir(chat, prompt, max_tokens, veces):
+    """`usage` de cada lectura que llegó; las que fallan no cuentan"""
+    usos = []
+    for _ in range(veces):
+        # sin respaldo: si el LLM falla send_message devuelve None y no hay `usage`
+        respuesta = chat.send_message(prompt, max_tokens=max_tokens, respaldo=None)
+        if respuesta is None or not chat.ultimo_uso:
+            print("⚠️ Lectura fallida o sin 'usage': no se cuenta")
+            continue
+        usos.append(chat.ultimo_uso)
+    return usos
+
+def media(usos, *campos):
+    return sum(uso.get(campo, 0) for uso in usos for campo in campos) / len(usos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tokens de la lectura antes y después")
+    parser.add_argument('-n', '--veces', type=int, default=3,
+                        help="lecturas de cada prompt (las respuestas varían)")
+    parser.add_argument('--json', metavar='RUTA', help="guardar también el resultado en JSON")
+    args = parser.parse_args()
+    if args.veces < 1:
+        parser.error("--veces debe ser al menos 1")
+
+    plan = cargar(CONFIG_SECUENCIA)
+    ahora = datetime.now()
+    chat = BigModelChat()
+    variantes = (('antes', prompt_antes(ahora), MAX_TOKENS_ANTES),
+                 ('ahora', prompt_ahora(plan, ahora), plan.max_tokens))
+
+    resultado = {}
+    for nombre, prompt, max_tokens in variantes:
+        usos = medir(chat, prompt, max_tokens, args.veces)
+        if not usos:
+            print(f"❌ Ninguna lectura del prompt de {nombre} trajo 'usage'")
+            sys.exit(1)
+        resultado[nombre] = {
+            'lecturas': len(usos),
+            'caracteres': len(prompt),
+            'max_tokens': max_tokens,
+            'prompt_tokens': media(usos, 'prompt_tokens'),
+            'completion_tokens': media(usos, 'completion_tokens'),
+            'total_tokens': media(usos, 'prompt_tokens', 'completion_tokens'),
+        }
+
+    print(f"{'':8} {'lecturas':>8} {'caracteres':>10} {'prompt':>8} {'respuesta':>10} {'total':>8}  (medias)")
+    for nombre, fila in resultado.items():
+        print(f"{nombre:8} {fila['lecturas']:>8} {fila['caracteres']:>10} {fila['prompt_tokens']:>8.1f} "
+              f"{fila['completion_tokens']:>10.1f} {fila['total_tokens']:>8.1f}")
+    antes, despues = resultado['antes']['total_tokens'], resultado['ahora']['total_tokens']
+    print(f"Ahorro: {antes - despues:.1f} tokens por lectura ({100.0 * (antes - despues) / antes:.0f}%)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
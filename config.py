@@ -12,9 +12,31 @@ API_KEY = "ca36d471ff014587928191ebb8f4f58c.ig5CnGJG9VFTIgYN"
 MODELO_VOZ = "es_MX-mario-medium.onnx"
 
 # RUTAS
-PIPER_EXECUTABLE = os.path.join(BASE_DIR, "piper", "piper")
-PIPER_DATA_DIR = os.path.join(BASE_DIR, "piper_data")
-VOSK_MODEL_DIR = os.path.join(BASE_DIR, "vosk-model-small-es-0.42")
+# En el ejecutable, los modelos y piper van en un paquete junto a él (utils/paquete.py)
+# que se extrae una sola vez a una caché; sin paquete se buscan en BASE_DIR
+PAQUETE_RECURSOS = None
+if getattr(sys, 'frozen', False):
+    _ruta_paquete = os.path.join(os.path.dirname(sys.executable), "recursos.ovpak")
+    if os.path.exists(_ruta_paquete):
+        from utils.paquete import PaqueteRecursos
+        PAQUETE_RECURSOS = PaqueteRecursos(_ruta_paquete)
+
+def ruta_recurso(nombre):
+    """Directorio en disco de un recurso: del paquete si lo hay, si no en BASE_DIR"""
+    if PAQUETE_RECURSOS:
+        return PAQUETE_RECURSOS.directorio(nombre)
+    return os.path.join(BASE_DIR, nombre)
+
+PIPER_DIR = ruta_recurso("piper")
+PIPER_EXECUTABLE = os.path.join(PIPER_DIR, "piper")
+PIPER_DATA_DIR = ruta_recurso("piper_data")
+VOSK_MODEL_DIR = ruta_recurso("vosk-model-small-es-0.42")
+
+# El guion del diálogo se edita sin recompilar: en el ejecutable va junto a él
+if getattr(sys, 'frozen', False):
+    CONFIG_SECUENCIA = os.path.join(os.path.dirname(sys.executable), "config_secuencia.json")
+else:
+    CONFIG_SECUENCIA = os.path.join(BASE_DIR, "config_secuencia.json")
 
 # BIGMODEL API
 BIGMODEL_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
\ No newline at end of file
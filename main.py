@@ -4,32 +4,56 @@ Asistente de Voz con IA - Versión Modular
 """
 import sys
 import os
-import json
-from config import BASE_DIR
-from ai.chat import BigModelChat
-from audio.text_to_speech import PiperTTS
-from audio.speech_to_text import VoskSTT
-from utils.helpers import AnimacionPensando, formatear_mensaje
+import time
+import signal
+import argparse
+import multiprocessing
+from utils.perfil_arranque import perfil
+
+with perfil.medir('importar módulos'):
+    from config import BASE_DIR, CONFIG_SECUENCIA
+    from ai.chat import BigModelChat
+    from audio.text_to_speech import PiperTTS
+    from audio.speech_to_text import VoskSTT
+    from utils.helpers import AnimacionPensando, formatear_mensaje
+    from utils.interfaz import BusInterfaz
+    from pipeline.orquestador import Orquestador
+    from pipeline.plan import CargadorPlan
+    from utils.metricas import metricas
 
 class AsistenteVoz:
-    def __init__(self):
-        # Inicializar componentes
+    def __init__(self, repeticion=False, tiempo_real=True, stt=None, tts=None):
+        # Inicializar componentes (en modo prefork, stt y tts llegan ya cargados del lanzador)
         self.chat = BigModelChat()
-        self.tts = PiperTTS()
-        self.stt = VoskSTT()
+        self.tts = tts or PiperTTS()
+        self.stt = stt or VoskSTT()
+        if repeticion:
+            # Repetir sesiones grabadas: mismo pipeline, pero el micrófono y el
+            # LLM salen de la grabación y el audio no se oye
+            from pipeline.grabacion import MicrofonoGrabado, ChatGrabado
+            self.chat = ChatGrabado(tiempo_real)
+            self.stt = MicrofonoGrabado(self.stt, tiempo_real)
+            self.tts.silenciar(tiempo_real)
+        # Un solo bus de estado (y un solo hilo de dibujo) para consola y sprite
+        self.interfaz = BusInterfaz()
         self.animacion = AnimacionPensando()
+        self.interfaz.suscribir(self.animacion)
+        # La boca del oráculo sigue la envolvente del audio que se reproduce
+        self.tts.al_nivel = self.interfaz.nivel
+        self.orquestador = Orquestador(self.stt, self.tts, self.chat, self.interfaz)
         
         self.running = False
-        self.config_flujo = self._cargar_configuracion()
+        self.renderizador = None
+        self.puesto = None      # Puesto del lanzador prefork, si es uno de varios kioskos
+        # El plan se recompila entre sesiones si config_secuencia.json cambia
+        self.cargador = CargadorPlan(CONFIG_SECUENCIA)
+        self.cargador.al_cambiar.append(self.orquestador.actualizar_plan)
+        with perfil.medir('cargar configuración'):
+            self.cargador.cargar()
     
-    def _cargar_configuracion(self):
-        """Cargar la configuración de la secuencia de preguntas desde un archivo JSON"""
-        try:
-            with open('config_secuencia.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print("❌ Error: No se encuentra el archivo 'config_secuencia.json'")
-            return None
+    @property
+    def plan(self):
+        return self.cargador.plan
     
     def verificar_configuracion(self):
         """Verificar que todos los componentes estén listos"""
@@ -37,136 +61,327 @@ class AsistenteVoz:
         print("=" * 40)
         print(f"📂 Directorio base: {BASE_DIR}")
         
-        if not self.config_flujo:
+        if not self.plan:
             return False
             
         # Verificar TTS
-        if not self.tts.verificar_configuracion():
+        with perfil.medir('verificar piper'):
+            piper_ok = self.tts.verificar_configuracion()
+        if not piper_ok:
             return False
         
-        # Verificar STT
+        # Verificar STT (el modelo se mide dentro de initialize)
         if not self.stt.initialize():
             print("❌ No se pudo configurar Vosk")
             return False
         
         return True
     
-    def iniciar(self):
-        """Iniciar el asistente"""
+    def iniciar(self, kiosko=False, perfil_arranque=None, metricas_activas=False,
+                grabar=None, repetir=None, ventana=False, perfiles=None):
+        """Iniciar el asistente; False si no se pudo arrancar"""
         if not self.verificar_configuracion():
-            return
+            self._informar_arranque(perfil_arranque)
+            return False
         
-        if not self.stt.start_listening():
+        with perfil.medir('abrir micrófono'):
+            escuchando = self.stt.start_listening()
+        if not escuchando:
             print("❌ No se pudo iniciar la escucha")
-            return
+            self._informar_arranque(perfil_arranque)
+            return False
+        
+        if perfil_arranque is not None:
+            # Solo medir el arranque: no se atiende a nadie
+            self._informar_arranque(perfil_arranque)
+            self.detener()
+            return True
+        
+        self._configurar_metricas(forzar=metricas_activas)
+        self._configurar_interfaz(ventana)
+        if not repetir:
+            self._configurar_llm()
+            self._configurar_grabacion(grabar)
+            self._configurar_perfiles(perfiles)
         
         self.running = True
         print("🎯 Sistema listo (Ctrl+C para salir)")
         print("-" * 40)
         
         try:
-            self._bucle_principal()
+            if repetir:
+                self._repetir_grabacion(repetir)
+            elif kiosko:
+                self._bucle_kiosko()
+            else:
+                self._bucle_principal()
         except KeyboardInterrupt:
             print("\n👋 Deteniendo asistente...")
         finally:
             self.detener()
+        return True
             
+    def _configurar_metricas(self, forzar=False):
+        """Preparar las métricas de latencia; SIGUSR1 las activa/desactiva en caliente"""
+        conf = self.plan.metricas
+        ruta_jsonl, puerto = conf.get('ruta_jsonl'), conf.get('puerto')
+        if self.puesto:
+            # varios procesos no pueden compartir el log rotativo ni el puerto
+            ruta_jsonl = ruta_jsonl and self.puesto.archivo(ruta_jsonl)
+            puerto = puerto and puerto + self.puesto.indice
+        metricas.configurar(ruta_jsonl=ruta_jsonl, puerto=puerto,
+                            max_bytes=conf.get('max_bytes', 1_000_000),
+                            copias=conf.get('copias', 3))
+        if forzar or conf.get('activas'):
+            metricas.activar()
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, metricas.alternar)
+    
+    def _configurar_interfaz(self, ventana=False):
+        """Arrancar el tick de la interfaz y, si se pidió, la ventana del oráculo"""
+        conf = self.plan.interfaz
+        self.interfaz.fps = conf.get('fps', 10)
+        if ventana or conf.get('ventana'):
+            # pygame va en su propio proceso para no competir por el GIL con el pipeline
+            from utils.renderizador import Renderizador
+            self.renderizador = Renderizador()
+            self.interfaz.suscribir(self.renderizador)
+        self.interfaz.iniciar()
+    
+    def _configurar_llm(self):
+        """Plazo de cada lectura: pasado ese tiempo se dice la lectura local"""
+        conf = self.plan.llm
+        if not conf.get('presupuesto_s'):
+            return
+        self.chat.configurar_plazo(conf['presupuesto_s'], conf.get('percentil_cobertura', 90),
+                                   conf.get('cobertura_inicial_s', 2.0))
+        print(f"⏱️ Plazo de la lectura: {conf['presupuesto_s']} s")
+    
+    def _configurar_grabacion(self, directorio=None):
+        """Grabar las sesiones si se pidió por línea de comandos o en la configuración"""
+        conf = self.plan.grabacion
+        if directorio is None and not conf.get('activa'):
+            return
+        from pipeline.grabacion import Grabadora
+        directorio = directorio or conf.get('directorio', 'grabaciones')
+        if self.puesto:
+            directorio = os.path.join(directorio, self.puesto.nombre)
+        self.orquestador.grabar(Grabadora(directorio))
+        print(f"⏺️ Grabando sesiones en {directorio}/")
+    
+    def _configurar_perfiles(self, ruta=None):
+        """Recordar a los visitantes que vuelven si se pidió (es opcional: guarda datos personales)"""
+        conf = self.plan.perfiles
+        if ruta is None and not conf.get('activo'):
+            return
+        from pipeline.perfiles import AlmacenPerfiles
+        ruta = ruta or conf.get('ruta', 'perfiles.sqlite')
+        self.orquestador.perfiles = AlmacenPerfiles(ruta, conf.get('similitud', 0.65))
+        print(f"👤 Recordando visitantes en {ruta}")
+    
+    def _informar_arranque(self, ruta_json):
+        """Mostrar (y opcionalmente guardar) el perfil de arranque si se pidió"""
+        if ruta_json is None:
+            return
+        print(perfil.informe())
+        if ruta_json:
+            perfil.guardar_json(ruta_json)
+    
     def _bucle_principal(self):
-        """Bucle principal de escucha y respuesta"""
-        print(f"\n{formatear_mensaje('ai', self.config_flujo['bienvenida'])}")
-        self.tts.speak(self.config_flujo['bienvenida'])
+        """Ejecutar una sesión completa a través del orquestador"""
+        self.orquestador.ejecutar_sesion(self.plan)
         
-        datos_usuario = {}
-        
-        # Bucle para las preguntas secuenciales
-        for paso in self.config_flujo['preguntas_secuencia']:
-            pregunta = paso['pregunta']
-            variable = paso['variable']
-            
-            print(f"\n{formatear_mensaje('ai', pregunta)}")
-            self.tts.speak(pregunta)
+        print("-" * 40)
+        print(f"\n{formatear_mensaje('ai', 'Gracias por usar el asistente. Puedes detenerlo con Ctrl+C.')}")
+    
+    def _bucle_kiosko(self):
+        """Atender visitantes uno tras otro sin recargar modelos ni dispositivos"""
+        recursos = self._configurar_recursos()
+        vueltas = []
+        fin = None
+        while self.running:
+            # Los cambios en config_secuencia.json se aplican entre visitantes
+            plan = self.cargador.actualizar()
+            kiosko = plan.kiosko
+            timeout = kiosko.get('timeout_inactividad', 30)
             
-            respuesta_obtenida = None
-            while not respuesta_obtenida:
-                texto_completo, texto_parcial = self.stt.listen_once()
-                if texto_completo:
-                    respuesta_obtenida = texto_completo
-                    print(f"\n{formatear_mensaje('user', respuesta_obtenida)}")
-                elif texto_parcial:
-                    print(f"👂 Escuchando: {texto_parcial}", end='\r')
+            if fin is not None:
+                # Vuelta: desde que acaba una sesión hasta estar listos para la siguiente
+                vueltas.append((time.monotonic() - fin) * 1000)
+                print(f"⏱️ Vuelta a espera: {vueltas[-1]:.1f} ms "
+                      f"(media {sum(vueltas) / len(vueltas):.1f} ms en {len(vueltas)} sesiones)")
             
-            datos_usuario[variable] = respuesta_obtenida
+            print("\n✨ Modo espera: esperando al siguiente visitante...")
+            # Las frases fijas se sintetizan mientras se espera (y se reutilizan)
+            self.orquestador.iniciar()
+            self.orquestador.fijar(plan.textos_fijos())
+            activacion = self._esperar_visitante(kiosko, recursos)
+            if activacion is None:
+                break
+            print(f"\n🚪 Visitante detectado ({activacion})")
             
-        # Pregunta final para la elección del tema
-        tema_elegido = None
-        pregunta_tema = self.config_flujo['pregunta_tema']
-        print(f"\n{formatear_mensaje('ai', pregunta_tema)}")
-        self.tts.speak(pregunta_tema)
-        while not tema_elegido:
-
+            # Cada sesión usa un diálogo nuevo (datos_usuario vacío) y el
+            # reconocedor se reinicia al abrir cada turno de escucha
+            inicio = time.monotonic()
+            dialogo = self.orquestador.ejecutar_sesion(plan, timeout)
+            fin = time.monotonic()
             
-            texto_completo, texto_parcial = self.stt.listen_once()
-            if texto_completo:
-                texto_completo = texto_completo.lower()
-                
-                amor_keywords = ['amor', 'corazón', 'pareja', 'relación']
-                trabajo_keywords = ['trabajo', 'empleo', 'carrera', 'profesional']
-                finanzas_keywords = ['finanzas', 'dinero', 'riqueza', 'fortuna']
-                
-                if any(word in texto_completo for word in amor_keywords):
-                    tema_elegido = 'amor'
-                elif any(word in texto_completo for word in trabajo_keywords):
-                    tema_elegido = 'trabajo'
-                elif any(word in texto_completo for word in finanzas_keywords):
-                    tema_elegido = 'finanzas'
-                else:
-                    print(f"\n{formatear_mensaje('ai', 'No entendí el tema, por favor repite.')}")
-                    self.tts.speak("No entendí el tema, por favor repite.")
-            elif texto_parcial:
-                print(f"👂 Escuchando: {texto_parcial}", end='\r')
-
-        # --- CAMBIOS AQUI ---
-        # 1. Importar la biblioteca datetime para obtener la fecha y hora
-        from datetime import datetime
-
-        # 2. Obtener la fecha y hora actual
-        fecha_actual = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-        
-        # 3. Construir el mensaje final para el LLM, incluyendo la fecha
-        prompt_final = self.config_flujo['instrucciones_llm']
-        prompt_final = prompt_final.replace('{tema_elegido}', tema_elegido)
-        
-        # Agregar la fecha actual como el primer dato
-        datos_str = f"Fecha actual: {fecha_actual}\n"
-        for key, value in datos_usuario.items():
-            datos_str += f"{key.capitalize()}: {value}\n"
-        
-        prompt_final += "\n" + datos_str.strip()
-        
-        # Obtener respuesta del LLM
-        print("\n🔮 Buscando tu suerte...")
-        self.animacion.iniciar()
-        respuesta = self.chat.send_message(prompt_final)
-        self.animacion.detener()
-        
-        # Mostrar y reproducir respuesta
-        print(f"\r{formatear_mensaje('ai', respuesta)}")
-        print("🔊 Reproduciendo respuesta...")
-        self.tts.speak(respuesta)
+            estado = "abandonada" if dialogo.abandonado else "completa"
+            print("-" * 40)
+            print(f"⏱️ Sesión {estado}: {fin - inicio:.1f} s")
+            if recursos:
+                print(f"🧠 Memoria:\n{recursos.informe()}")
+            print(f"🔮 Lecturas:\n{self.chat.informe()}")
+            if self.orquestador.perfiles:
+                print(f"👤 Visitantes:\n{self.orquestador.perfiles.informe()}")
+    
+    def _esperar_visitante(self, kiosko, recursos):
+        """Esperar al siguiente visitante soltando memoria mientras no hay nadie"""
+        palabras = kiosko.get('palabras_activacion', [])
+        umbral_voz = kiosko.get('umbral_voz') if kiosko.get('activacion') == 'voz' else None
+        bloques = kiosko.get('bloques_voz', 2)
+        if not recursos:
+            return self.orquestador.esperar_visitante(palabras, umbral_voz, bloques)
         
-        print("-" * 40)
-        print(f"\n{formatear_mensaje('ai', 'Gracias por usar el asistente. Puedes detenerlo con Ctrl+C.')}")
+        while self.running:
+            if recursos.revisar():
+                # con algo soltado (el modelo, quizá) se vuelve a escuchar en el modo
+                # que toque; si no, la escucha sigue abierta y no se pierde nada de lo dicho
+                self.orquestador.terminar_espera()
+            if recursos.cargado('modelo vosk'):
+                activacion = self.orquestador.esperar_visitante(
+                    palabras, umbral_voz, bloques, limite=recursos.intervalo)
+            else:
+                # Sin modelo no hay palabra de activación: basta con oír voz cerca
+                activacion = self.orquestador.esperar_visitante(
+                    [], kiosko.get('umbral_voz', 1500), bloques, limite=recursos.intervalo)
+            if activacion is not None:
+                # Lo que se soltó vuelve mientras suena la bienvenida
+                recursos.precargar()
+                return activacion
+        self.orquestador.terminar_espera()
+        return None
+    
+    def _configurar_recursos(self):
+        """Presupuesto de memoria del kiosko: soltar los componentes pesados sin visitantes"""
+        conf = self.plan.recursos
+        if not conf.get('activo'):
+            return None
+        if self.puesto:
+            # el modelo es del lanzador: soltarlo aquí no libera nada y recargarlo lo duplicaría
+            print("⚠️ 'recursos' no se aplica en modo prefork: el modelo es compartido")
+            return None
+        from utils.recursos import GestorRecursos
+        recursos = GestorRecursos(conf.get('presupuesto_mb'), conf.get('inactividad_s', 600),
+                                  conf.get('revisar_cada_s', 30))
+        recursos.registrar('modelo vosk', self.stt.cargar_modelo, self.stt.liberar_modelo,
+                           lambda: self.stt.recognizer is not None)
+        recursos.registrar('frases fijas',
+                           lambda: self.orquestador.fijar(self.plan.textos_fijos()),
+                           self.orquestador.soltar_fijos,
+                           self.orquestador.hay_fijos)
+        self.orquestador.recursos = recursos
+        return recursos
+    
+    def _repetir_grabacion(self, ruta):
+        """Pasar otra vez por el pipeline las sesiones de una grabación"""
+        from pipeline.grabacion import cargar_sesiones
+        sesiones = cargar_sesiones(ruta)
+        print(f"🔁 {len(sesiones)} sesiones en {ruta}")
+        timeout = self.plan.kiosko.get('timeout_inactividad', 30)
+        distintas = 0
+        for grabada in sesiones:
+            if not self.running:
+                break
+            self.stt.cargar(grabada)
+            self.chat.cargar(grabada)
+            inicio = time.monotonic()
+            dialogo = self.orquestador.ejecutar_sesion(self.plan, timeout)
+            duracion = time.monotonic() - inicio
+            
+            iguales = (dialogo.datos_usuario == grabada.datos_usuario
+                       and dialogo.tema_elegido == grabada.tema_elegido
+                       and dialogo.abandonado == grabada.abandonada)
+            distintas += not iguales
+            print("-" * 40)
+            print(f"🔁 Sesión {grabada.numero} ({time.strftime('%d-%m-%Y %H:%M', time.localtime(grabada.fecha))}): "
+                  f"{duracion:.1f} s (grabada: {grabada.duracion:.1f} s) "
+                  f"{'✅ mismo resultado' if iguales else '⚠️ resultado distinto'}")
+            if not iguales:
+                print(f"   grabada: {grabada.datos_usuario} / {grabada.tema_elegido}")
+                print(f"   ahora:   {dialogo.datos_usuario} / {dialogo.tema_elegido}")
+            if self.chat.prompts_distintos:
+                print("   ⚠️ El prompt al LLM cambió respecto a la grabación")
+        print(f"\n🔁 Repetidas {len(sesiones)} sesiones, {distintas} con resultado distinto")
     
     def detener(self):
         """Detener el asistente"""
         self.running = False
+        self.orquestador.detener()
         self.stt.stop_listening()
-        self.animacion.detener()
+        self.tts.cerrar()
+        self.interfaz.detener()
+        if self.renderizador:
+            self.renderizador.cerrar()
+        if self.orquestador.perfiles:
+            self.orquestador.perfiles.cerrar()
+
+def _lanzar_puestos(args):
+    """Cargar los modelos una vez y atender un kiosko por puesto en procesos hijos"""
+    from utils.prefork import Lanzador
+    plan = CargadorPlan(CONFIG_SECUENCIA).cargar()
+    if not plan:
+        return
+    
+    def crear_asistente(puesto, stt, tts):
+        asistente = AsistenteVoz(stt=stt, tts=tts)
+        asistente.puesto = puesto
+        return asistente
+    
+    opciones = dict(metricas_activas=args.metricas, grabar=args.grabar, ventana=args.ventana,
+                    perfiles=args.perfiles)
+    Lanzador(plan, crear_asistente, opciones).ejecutar()
 
 def main():
     """Función principal"""
-    asistente = AsistenteVoz()
-    asistente.iniciar()
+    parser = argparse.ArgumentParser(description="Asistente de voz lector de la suerte")
+    parser.add_argument('--kiosko', action='store_true',
+                        help="atender visitantes en bucle sin reiniciar el proceso")
+    parser.add_argument('--profile-startup', nargs='?', const='', metavar='JSON',
+                        help="medir el arranque por etapas, mostrarlo y salir "
+                             "(opcionalmente guardarlo en JSON)")
+    parser.add_argument('--metricas', action='store_true',
+                        help="registrar la latencia de cada turno desde el inicio "
+                             "(también se puede alternar con SIGUSR1)")
+    parser.add_argument('--grabar', nargs='?', const='grabaciones', metavar='DIR',
+                        help="grabar cada sesión (audio, reconocimiento, LLM y tiempos) "
+                             "para poder repetirla")
+    parser.add_argument('--repetir', metavar='ARCHIVO',
+                        help="repetir las sesiones de una grabación en lugar de atender a nadie")
+    parser.add_argument('--maxima-velocidad', action='store_true',
+                        help="con --repetir, no esperar los tiempos grabados")
+    parser.add_argument('--perfiles', nargs='?', const='perfiles.sqlite', metavar='SQLITE',
+                        help="recordar a los visitantes que vuelven y confirmarlos con "
+                             "una sola pregunta")
+    parser.add_argument('--ventana', action='store_true',
+                        help="mostrar el oráculo animado (pygame) además de la consola")
+    parser.add_argument('--prefork', action='store_true',
+                        help="un kiosko por tarjeta de sonido (sección 'prefork' de la "
+                             "configuración) compartiendo el modelo de Vosk")
+    args = parser.parse_args()
+    
+    if args.prefork:
+        _lanzar_puestos(args)
+        return
+    
+    asistente = AsistenteVoz(repeticion=bool(args.repetir),
+                             tiempo_real=not args.maxima_velocidad)
+    asistente.iniciar(kiosko=args.kiosko, perfil_arranque=args.profile_startup,
+                      metricas_activas=args.metricas, grabar=args.grabar,
+                      repetir=args.repetir, ventana=args.ventana, perfiles=args.perfiles)
 
 if __name__ == "__main__":
+    # en el ejecutable congelado, los procesos que se lanzan con spawn (el
+    # oráculo) arrancan este mismo binario y esto los desvía a su función
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
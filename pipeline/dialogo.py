@@ -0,0 +1,231 @@
+"""
+Máquina de estados de una sesión de lectura de la suerte.
+
+Los pasos salen del plan compilado de config_secuencia.json; el diálogo no
+espera a nada por su cuenta, solo reacciona a los eventos que le llegan del
+pipeline.
+"""
+import time
+from datetime import datetime
+from utils import numerologia
+from utils.helpers import formatear_mensaje
+from utils.metricas import metricas
+from pipeline.validadores import SeguidorParcial
+from pipeline import lectura_local
+
+class Dialogo:
+    def __init__(self, plan, orquestador, sesion=0):
+        self.plan = plan
+        self.orq = orquestador
+        self.sesion = sesion
+        self.pasos = plan.pasos
+        self.no_entendido = plan.no_entendido
+        self.seguidor = None       # parciales del turno actual
+        self.candidato = None      # perfil con un nombre parecido, a confirmar con la fecha
+        self.confirmando = False
+        self.conocido = None       # el perfil, si la fecha que dijo el visitante coincide
+
+        self.indice = -1
+        self.datos_usuario = {}
+        self.tema_elegido = None
+        self.respuesta = None
+        self.esperando = None      # clave tras cuya reproducción hay que escuchar
+        self.generacion = None     # turno de escucha activo
+        self.terminado = False
+        self.abandonado = False
+
+    def comenzar(self):
+        self._siguiente_paso()
+
+    def procesar(self, evento):
+        """Reaccionar a un evento del pipeline"""
+        tipo = evento[0]
+        if tipo == 'reproducido':
+            self._al_reproducir(evento[1])
+        elif tipo == 'parcial':
+            if evento[1] == self.generacion:
+                self.orq.renovar_inactividad()
+                print(f"👂 Escuchando: {evento[2]}", end='\r')
+                self._al_recibir_parcial(evento[2])
+        elif tipo == 'final':
+            if evento[1] == self.generacion:
+                self._abrir_turno(evento[3])
+                self._al_reconocer(evento[2])
+        elif tipo == 'lectura':
+            self._al_recibir_lectura(evento[1])
+        elif tipo == 'inactividad':
+            if evento[1] == self.generacion:
+                self._al_abandonar()
+
+    # --- transiciones ---
+    def _siguiente_paso(self):
+        while True:
+            self.indice += 1
+            if self.indice >= len(self.pasos):
+                self.terminado = True
+                return
+
+            paso = self.pasos[self.indice]
+            if paso.tipo == 'preguntar' and paso.variable in self.datos_usuario:
+                continue    # ya lo contestó al confirmar un perfil
+            if paso.tipo == 'decir':
+                # No hace falta esperar: la reproducción va en cola
+                self._decir(paso.texto)
+                continue
+
+            if paso.tipo in ('preguntar', 'tema'):
+                self.esperando = (self.sesion, self.indice)
+                self._decir(paso.texto, clave=self.esperando)
+                self._precargar_siguiente()
+                return
+
+            if paso.tipo == 'lectura':
+                print("\n🔮 Buscando tu suerte...")
+                self.orq.interfaz.publicar('pensando')
+                # la lectura local se prepara ya: es la que se dice si el LLM no llega a tiempo
+                respaldo = lectura_local.generar(self.tema_elegido, self.datos_usuario)
+                self.orq.pedir_lectura(self._construir_prompt(), self.plan.max_tokens, respaldo)
+                return
+
+    def _al_reproducir(self, clave):
+        if clave == (self.sesion, 'lectura'):
+            metricas.cerrar_turno()
+            self.terminado = True
+        elif clave is not None and clave == self.esperando:
+            metricas.cerrar_turno()
+            self.esperando = None
+            self.generacion = self.orq.escuchar()
+            validador = (self.plan.validador_confirmacion if self.confirmando
+                         else self.pasos[self.indice].validador)
+            self.seguidor = SeguidorParcial(validador) if validador else None
+
+    def _al_recibir_parcial(self, texto):
+        """Cerrar el turno sin esperar a Vosk si el parcial ya es estable y válido"""
+        if not self.seguidor:
+            return
+        ahora = time.monotonic()
+        if self.seguidor.observar(texto, ahora) is not None:
+            self._abrir_turno((self.seguidor.desde, ahora))
+            self._al_reconocer(texto)
+
+    def _al_reconocer(self, texto):
+        self.generacion = None
+        self.seguidor = None
+        self.orq.dejar_de_escuchar()
+        print(f"\n{formatear_mensaje('user', texto)}")
+
+        paso = self.pasos[self.indice]
+        if self.confirmando:
+            self._al_confirmar(texto)
+        elif paso.tipo == 'preguntar':
+            self.datos_usuario[paso.variable] = texto
+            if paso.validador and paso.validador.tipo == 'nombre' and self._buscar_perfil(texto):
+                return
+            self._siguiente_paso()
+        elif paso.tipo == 'tema':
+            self.tema_elegido = paso.validador.validar(texto)
+            if self.tema_elegido:
+                self._siguiente_paso()
+            else:
+                self.esperando = (self.sesion, self.indice)
+                self._decir(self.no_entendido, clave=self.esperando)
+
+    def _buscar_perfil(self, nombre):
+        """Si el nombre se parece al de un visitante conocido, preguntarle cuándo nació.
+
+        La fecha guardada no se dice nunca: cualquiera puede decir un nombre en el kiosko.
+        """
+        perfiles = self.orq.perfiles
+        if not perfiles or self.candidato:
+            return False
+        self.candidato = perfiles.buscar(nombre)
+        if not self.candidato:
+            return False
+        self.confirmando = True
+        self.esperando = (self.sesion, 'confirmar')
+        self._decir(self.plan.plantilla_confirmacion.render(nombre=self.candidato.nombre),
+                    clave=self.esperando)
+        return True
+
+    def _al_confirmar(self, texto):
+        """Si nombre y fecha son los de un perfil se toman sus datos y se saltan las preguntas que quedan"""
+        self.confirmando = False
+        perfiles = self.orq.perfiles
+        nacimiento = numerologia.parsear_fecha(texto)
+        variable_nombre = self.pasos[self.indice].variable
+        nombre = self.datos_usuario[variable_nombre]
+        perfil = perfiles.buscar(nombre, nacimiento) if nacimiento else None
+        if not perfil:
+            # otra persona (o una fecha sin año): la respuesta vale para la pregunta de la fecha
+            perfiles.confirmado(False)
+            for paso in self.pasos:
+                if paso.validador and paso.validador.tipo == 'fecha':
+                    self.datos_usuario[paso.variable] = texto
+                    break
+            self._siguiente_paso()
+            return
+        omitidas = 0
+        while (self.indice + 1 < len(self.pasos)
+               and self.pasos[self.indice + 1].tipo == 'preguntar'):
+            self.indice += 1
+            omitidas += 1
+        self.conocido = perfil
+        self.datos_usuario.update(perfil.datos())
+        # el nombre bien escrito es el del perfil, no lo que entendió Vosk ("Lora")
+        self.datos_usuario[variable_nombre] = perfil.nombre
+        perfiles.confirmado(True, omitidas)
+        print(f"⏩ Visitante conocido ({perfil.visitas} visitas): "
+              f"{omitidas} preguntas omitidas")
+        self._siguiente_paso()
+
+    def _al_recibir_lectura(self, respuesta):
+        self.respuesta = respuesta
+
+        uso = self.orq.chat.ultimo_uso
+        if uso:
+            print(f"\n📊 Tokens: prompt {uso.get('prompt_tokens')}, "
+                  f"respuesta {uso.get('completion_tokens')} "
+                  f"(máx. {self.plan.max_tokens})")
+
+        print(f"\r{formatear_mensaje('ai', respuesta)}")
+        print("🔊 Reproduciendo respuesta...")
+        self.orq.decir(respuesta, clave=(self.sesion, 'lectura'))
+
+    def _al_abandonar(self):
+        """El visitante se fue sin contestar: cerrar la sesión"""
+        self.generacion = None
+        self.orq.dejar_de_escuchar()
+        print("\n⌛ Sin respuesta, volviendo al modo espera")
+        self.abandonado = True
+        self.terminado = True
+
+    # --- ayudas ---
+    def _abrir_turno(self, tiempos):
+        """Empezar a medir el turno: desde que el visitante calla hasta que suena la respuesta"""
+        if not metricas.activo or not tiempos:
+            return
+        paso = self.pasos[self.indice]
+        nombre = 'confirmacion' if self.confirmando else paso.variable or paso.tipo
+        fin_habla, vosk_final = tiempos
+        metricas.abrir_turno(f"{self.sesion}:{nombre}",
+                             fin_habla=fin_habla, vosk_final=vosk_final)
+
+    def _decir(self, texto, clave=None):
+        print(f"\n{formatear_mensaje('ai', texto)}")
+        self.orq.decir(texto, clave=clave)
+
+    def _precargar_siguiente(self):
+        """Sintetizar el siguiente texto fijo mientras se escucha la respuesta"""
+        paso = self.pasos[self.indice]
+        if paso.tipo == 'tema':
+            self.orq.preparar(self.no_entendido)
+        for siguiente in self.pasos[self.indice + 1:]:
+            if siguiente.texto:
+                self.orq.preparar(siguiente.texto)
+                break
+
+    def _construir_prompt(self):
+        # Los cálculos numerológicos se hacen aquí y al LLM solo le llega el resumen
+        fecha_actual = datetime.now().strftime("%d-%m-%Y")
+        prompt_final = self.orq.prompt_base(self.plan, self.tema_elegido, fecha_actual)
+        return prompt_final + "\n" + numerologia.resumen(self.datos_usuario)
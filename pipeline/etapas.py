@@ -0,0 +1,236 @@
+"""
+Etapas del pipeline de voz.
+
+Cada etapa es un hilo que bloquea en su cola de entrada (acotada) y pasa el
+resultado a la siguiente, así la captura, el reconocimiento, el LLM y la
+síntesis/reproducción avanzan a la vez sin esperas activas.
+"""
+import queue
+import threading
+import time
+from audio.nivel import rms_pcm16
+from utils.metricas import metricas
+
+FIN = object()  # marca para detener una etapa
+
+class Etapa:
+    """Hilo que consume una cola acotada y procesa cada elemento"""
+    def __init__(self, nombre, entrada=None, tam_cola=8):
+        self.nombre = nombre
+        self.entrada = entrada if entrada is not None else queue.Queue(maxsize=tam_cola)
+        self.hilo = None
+
+    def iniciar(self):
+        self.hilo = threading.Thread(target=self._ejecutar, name=self.nombre, daemon=True)
+        self.hilo.start()
+
+    def enviar(self, item):
+        self.entrada.put(item)
+
+    def detener(self):
+        if self.hilo:
+            self.entrada.put(FIN)
+            self.hilo.join()
+            self.hilo = None
+
+    def _ejecutar(self):
+        while True:
+            item = self.entrada.get()
+            if item is FIN:
+                break
+            try:
+                self.procesar(item)
+            except Exception as e:
+                print(f"Error en etapa {self.nombre}: {e}")
+
+    def procesar(self, item):
+        raise NotImplementedError
+
+class EtapaCaptura:
+    """Lee bloques del micrófono mientras el diálogo está escuchando"""
+    def __init__(self, stt, salida):
+        self.stt = stt
+        self.salida = salida
+        self.escuchando = threading.Event()
+        self.generacion = 0
+        self.activa = False
+        self.hilo = None
+        self.grabadora = None
+
+    def iniciar(self):
+        self.activa = True
+        self.hilo = threading.Thread(target=self._ejecutar, name="captura", daemon=True)
+        self.hilo.start()
+
+    def escuchar(self, generacion):
+        """Empezar un turno de escucha nuevo"""
+        self.generacion = generacion
+        self.escuchando.set()
+
+    def pausar(self):
+        self.escuchando.clear()
+
+    def detener(self):
+        self.activa = False
+        self.escuchando.set()
+        if self.hilo:
+            self.hilo.join()
+            self.hilo = None
+
+    def _ejecutar(self):
+        enviada = None
+        while self.activa:
+            self.escuchando.wait()
+            if not self.activa:
+                break
+
+            generacion = self.generacion
+            if generacion != enviada:
+                # Turno nuevo: tirar el eco acumulado y reiniciar el reconocedor
+                self.stt.descartar_pendiente()
+                self.salida.put((generacion, None))
+                enviada = generacion
+
+            data = self.stt.leer_bloque()
+            if data and self.escuchando.is_set():
+                if self.grabadora:
+                    self.grabadora.audio(generacion, data)
+                self.salida.put((generacion, data))
+
+class EtapaReconocimiento(Etapa):
+    """Pasa los bloques de audio a Vosk y publica resultados parciales y finales"""
+    def __init__(self, stt, entrada, eventos):
+        super().__init__("reconocimiento", entrada=entrada)
+        self.stt = stt
+        self.eventos = eventos
+        # Detección de voz por energía (solo en modo espera del kiosko)
+        self.umbral_voz = None
+        self.bloques_voz = 2
+        self._bloques_altos = 0
+
+    def configurar_vad(self, umbral, bloques=2):
+        """Activar (o desactivar con umbral=None) el aviso de voz por energía"""
+        self.umbral_voz = umbral
+        self.bloques_voz = bloques
+
+    def procesar(self, item):
+        generacion, data = item
+        if data is None:
+            self.stt.reiniciar()
+            self._bloques_altos = 0
+            return
+
+        if self.umbral_voz is not None:
+            if rms_pcm16(data) >= self.umbral_voz:
+                self._bloques_altos += 1
+                if self._bloques_altos == self.bloques_voz:
+                    self.eventos.put(('voz', generacion))
+            else:
+                self._bloques_altos = 0
+
+        texto, parcial = self.stt.procesar_bloque(data)
+        if texto:
+            self.eventos.put(('final', generacion, texto, self.stt.tiempos_final))
+        elif parcial:
+            self.eventos.put(('parcial', generacion, parcial))
+
+class Vigilante:
+    """Avisa con un evento cuando un turno de escucha pasa demasiado tiempo sin voz"""
+    def __init__(self, eventos):
+        self.eventos = eventos
+        self.condicion = threading.Condition()
+        self.limite = None
+        self.generacion = None
+        self.activo = False
+        self.hilo = None
+
+    def iniciar(self):
+        self.activo = True
+        self.hilo = threading.Thread(target=self._ejecutar, name="vigilante", daemon=True)
+        self.hilo.start()
+
+    def armar(self, generacion, segundos):
+        """Empezar (o renovar) la cuenta atrás de un turno"""
+        with self.condicion:
+            self.generacion = generacion
+            self.limite = time.monotonic() + segundos
+            self.condicion.notify()
+
+    def desarmar(self):
+        with self.condicion:
+            self.limite = None
+            self.condicion.notify()
+
+    def detener(self):
+        with self.condicion:
+            self.activo = False
+            self.condicion.notify()
+        if self.hilo:
+            self.hilo.join()
+            self.hilo = None
+
+    def _ejecutar(self):
+        while True:
+            with self.condicion:
+                while self.activo and (self.limite is None or self.limite > time.monotonic()):
+                    espera = None if self.limite is None else self.limite - time.monotonic()
+                    self.condicion.wait(espera)
+                if not self.activo:
+                    return
+                self.limite = None
+                generacion = self.generacion
+            self.eventos.put(('inactividad', generacion))
+
+class EtapaLLM(Etapa):
+    """Envía el prompt final al LLM sin bloquear el resto del pipeline"""
+    def __init__(self, chat, eventos):
+        super().__init__("llm", tam_cola=1)
+        self.chat = chat
+        self.eventos = eventos
+
+    def procesar(self, item):
+        prompt, max_tokens, respaldo = item
+        respuesta = self.chat.send_message(prompt, max_tokens=max_tokens, respaldo=respaldo)
+        self.eventos.put(('lectura', respuesta))
+
+class EtapaSintesis(Etapa):
+    """Genera los WAV con Piper; el resultado queda en un Future"""
+    def __init__(self, tts):
+        super().__init__("sintesis")
+        self.tts = tts
+
+    def procesar(self, item):
+        texto, futuro = item
+        futuro.texto = texto
+        try:
+            futuro.sintesis_inicio = time.monotonic()
+            archivo = self.tts.sintetizar(texto)
+            futuro.sintesis_fin = time.monotonic()
+            futuro.set_result(archivo)
+        except Exception as e:
+            futuro.set_result(None)
+            raise e
+
+class EtapaReproduccion(Etapa):
+    """Reproduce en orden los WAV y avisa al diálogo al terminar cada uno"""
+    def __init__(self, tts, eventos, interfaz):
+        super().__init__("reproduccion")
+        self.tts = tts
+        self.eventos = eventos
+        self.interfaz = interfaz
+
+    def procesar(self, item):
+        clave, futuro, borrar = item
+        try:
+            archivo = futuro.result()
+            # un WAV fijo se sintetiza una vez y suena en muchos turnos: su síntesis
+            # solo cuenta en el turno durante el que se hizo
+            fin = getattr(futuro, 'sintesis_fin', None)
+            if fin is not None and metricas.en_turno(fin):
+                metricas.marcar('sintesis_inicio', futuro.sintesis_inicio)
+                metricas.marcar('sintesis_fin', fin)
+            if archivo:
+                self.interfaz.publicar('hablando', texto=getattr(futuro, 'texto', ''))
+                self.tts.reproducir(archivo, borrar=borrar)
+        finally:
+            self.eventos.put(('reproducido', clave))
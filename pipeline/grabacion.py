@@ -0,0 +1,233 @@
+"""
+Grabación de sesiones y repetición determinista.
+
+Cada sesión guarda el audio del micrófono por turno de escucha, lo que
+reconoció Vosk, la petición y la respuesta del LLM y los tiempos de todo
+ello, para poder repetirla luego por el mismo pipeline.
+
+Formato: un archivo por proceso y día (`AAAAMMDD-HHMMSS-<pid>.ovrec`) al que
+solo se añaden registros. Empieza con `MAGIA` y cada registro es un bloque
+zlib precedido de su longitud (4 bytes); dentro va una cabecera JSON de una
+línea y, en el caso del audio, el PCM. Cada registro se vuelca al sistema
+en cuanto se escribe y ningún otro proceso escribe detrás, así que si el
+proceso muere a mitad de una escritura solo se pierde ese último registro.
+"""
+import os
+import json
+import time
+import zlib
+import struct
+import threading
+from datetime import datetime
+from utils.metricas import metricas
+
+MAGIA = b'OVREC1\n'
+_LONGITUD = struct.Struct('<I')
+
+class Grabadora:
+    """Escribe los registros de la sesión en curso (desde cualquier hilo)"""
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.archivo = None
+        self.ruta = None
+        self.dia = None
+        self.lock = threading.Lock()
+        self.inicio = None      # monotonic del inicio de la sesión; None = no se graba
+        self.turnos = {}        # generación -> instante en que empezó a escuchar
+
+    def abrir_sesion(self, sesion):
+        ahora = datetime.now()
+        with self.lock:
+            if ahora.strftime('%Y%m%d') != self.dia:
+                # nunca se añade detrás de otro proceso: un registro suyo a medias
+                # dejaría ilegible todo lo que viniera después
+                self._cerrar_archivo()
+                os.makedirs(self.directorio, exist_ok=True)
+                nombre = f"{ahora.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.ovrec"
+                self.ruta = os.path.join(self.directorio, nombre)
+                self.archivo = open(self.ruta, 'xb')
+                self.archivo.write(MAGIA)
+                self.dia = ahora.strftime('%Y%m%d')
+            self.inicio = time.monotonic()
+            self.turnos = {}
+        self.registrar('sesion', sesion=sesion, fecha=time.time())
+
+    def escuchar(self, generacion):
+        self.turnos[generacion] = time.monotonic()
+        self.registrar('escuchar', gen=generacion)
+
+    def audio(self, generacion, data):
+        """Bloque del micrófono; su instante se guarda relativo al inicio del turno"""
+        inicio = self.turnos.get(generacion)
+        if inicio is not None:
+            self.registrar('audio', data, gen=generacion,
+                           dt=round(time.monotonic() - inicio, 4))
+
+    def registrar(self, tipo, datos=b'', **campos):
+        inicio = self.inicio
+        if inicio is None:
+            return
+        campos['tipo'] = tipo
+        campos['t'] = round(time.monotonic() - inicio, 4)
+        cabecera = json.dumps(campos, ensure_ascii=False).encode('utf-8')
+        bloque = zlib.compress(cabecera + b'\n' + datos)
+        with self.lock:
+            if self.archivo:
+                self.archivo.write(_LONGITUD.pack(len(bloque)) + bloque)
+                self.archivo.flush()
+
+    def cerrar_sesion(self, **campos):
+        self.registrar('fin', **campos)
+        with self.lock:
+            self.inicio = None
+            self.turnos = {}
+
+    def cerrar(self):
+        with self.lock:
+            self.inicio = None
+            self._cerrar_archivo()
+
+    def _cerrar_archivo(self):
+        if self.archivo:
+            self.archivo.close()
+        self.archivo = None
+        self.ruta = None
+        self.dia = None
+
+def leer_registros(ruta):
+    """Recorrer los registros de un archivo: (cabecera, datos)"""
+    with open(ruta, 'rb') as f:
+        if f.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f"{ruta} no es una grabación de sesiones")
+        while True:
+            longitud = f.read(_LONGITUD.size)
+            if len(longitud) < _LONGITUD.size:
+                return
+            bloque = f.read(_LONGITUD.unpack(longitud)[0])
+            try:
+                crudo = zlib.decompress(bloque)
+            except zlib.error:
+                return      # el proceso murió escribiendo el último registro
+            cabecera, _, datos = crudo.partition(b'\n')
+            yield json.loads(cabecera), datos
+
+class SesionGrabada:
+    def __init__(self, numero, fecha):
+        self.numero = numero
+        self.fecha = fecha
+        self.turnos = []        # por turno de escucha: [(dt, pcm), ...]
+        self.finales = []       # textos finales de Vosk, en orden
+        self.lecturas = []      # {'prompt', 'max_tokens', 'respuesta', 'uso', 'demora'}
+        self.datos_usuario = {}
+        self.tema_elegido = None
+        self.abandonada = False
+        self.duracion = None
+
+def cargar_sesiones(ruta):
+    """Agrupar los registros de un archivo por sesión (las incompletas se descartan)"""
+    sesiones = []
+    actual = None
+    turnos = {}
+    peticion = None
+    for cabecera, datos in leer_registros(ruta):
+        tipo = cabecera['tipo']
+        if tipo == 'sesion':
+            actual = SesionGrabada(cabecera['sesion'], cabecera['fecha'])
+            turnos = {}
+        elif actual is None:
+            continue
+        elif tipo == 'escuchar':
+            turnos[cabecera['gen']] = []
+            actual.turnos.append(turnos[cabecera['gen']])
+        elif tipo == 'audio' and cabecera['gen'] in turnos:
+            turnos[cabecera['gen']].append((cabecera['dt'], datos))
+        elif tipo == 'final':
+            actual.finales.append(cabecera['texto'])
+        elif tipo == 'llm':
+            peticion = cabecera
+        elif tipo == 'lectura' and peticion:
+            actual.lecturas.append({'prompt': peticion['prompt'],
+                                    'max_tokens': peticion['max_tokens'],
+                                    'respuesta': cabecera['respuesta'],
+                                    'uso': cabecera.get('uso'),
+                                    'demora': cabecera['t'] - peticion['t']})
+            peticion = None
+        elif tipo == 'fin':
+            actual.datos_usuario = cabecera.get('datos_usuario', {})
+            actual.tema_elegido = cabecera.get('tema_elegido')
+            actual.abandonada = cabecera.get('abandonada', False)
+            actual.duracion = cabecera['t']
+            sesiones.append(actual)
+            actual = None
+    return sesiones
+
+# --- repetición ---
+class MicrofonoGrabado:
+    """Envuelve un VoskSTT y sustituye su micrófono por el audio grabado.
+
+    Cada turno de escucha nuevo recibe el audio del siguiente turno de la
+    grabación; con `tiempo_real` se entrega al ritmo en que se capturó.
+    Cuando se acaba, da silencio al ritmo de un micrófono de verdad.
+    """
+    def __init__(self, stt, tiempo_real=True, frecuencia=16000):
+        self.stt = stt
+        self.tiempo_real = tiempo_real
+        self.frecuencia = frecuencia
+        self.turnos = []
+        self.bloques = []
+        self.inicio_turno = None
+
+    def __getattr__(self, nombre):
+        return getattr(self.stt, nombre)
+
+    def cargar(self, sesion):
+        self.turnos = list(sesion.turnos)
+        self.bloques = []
+
+    def start_listening(self):
+        return True
+
+    def stop_listening(self):
+        pass
+
+    def descartar_pendiente(self):
+        self.bloques = list(self.turnos.pop(0)) if self.turnos else []
+        self.bloques.reverse()
+        self.inicio_turno = time.monotonic()
+
+    def leer_bloque(self, frames=4000):
+        if self.bloques:
+            dt, data = self.bloques.pop()
+            espera = self.inicio_turno + dt - time.monotonic() if self.tiempo_real else 0
+        else:
+            data = bytes(2 * frames)
+            espera = frames / self.frecuencia
+        if espera > 0:
+            time.sleep(espera)
+        return data
+
+class ChatGrabado:
+    """Devuelve las lecturas grabadas en lugar de llamar al LLM"""
+    def __init__(self, tiempo_real=True):
+        self.tiempo_real = tiempo_real
+        self.lecturas = []
+        self.ultimo_uso = None
+        self.prompts_distintos = 0
+
+    def cargar(self, sesion):
+        self.lecturas = list(sesion.lecturas)
+        self.prompts_distintos = 0
+
+    def send_message(self, mensaje, max_tokens=1000, respaldo=None):
+        metricas.marcar('llm_enviado')
+        if not self.lecturas:
+            print("⚠️ La grabación no tiene más lecturas")
+            return respaldo
+        lectura = self.lecturas.pop(0)
+        if mensaje != lectura['prompt']:
+            self.prompts_distintos += 1
+        if self.tiempo_real:
+            time.sleep(lectura['demora'])
+        metricas.marcar('ultimo_token')
+        self.ultimo_uso = lectura['uso']
+        return lectura['respuesta']
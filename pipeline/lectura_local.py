@@ -0,0 +1,92 @@
+"""
+Lectura de la suerte hecha en local, sin LLM.
+
+Se usa cuando el LLM falla o no termina a tiempo: con los números ya
+calculados (`utils/numerologia.py`) y el tema elegido se arma un párrafo a
+partir de frases de plantilla. La elección de frases depende del visitante
+y del día, así que la misma persona oye lo mismo si pregunta dos veces hoy.
+"""
+import random
+from datetime import date
+from utils import numerologia
+from utils.texto import nombre_limpio
+
+SIGNIFICADOS = {
+    1: "el comienzo y la iniciativa propia",
+    2: "la cooperación y la paciencia",
+    3: "la expresión y la alegría compartida",
+    4: "el orden y el esfuerzo constante",
+    5: "el cambio y la libertad",
+    6: "el cuidado y la responsabilidad con los tuyos",
+    7: "la reflexión y la búsqueda interior",
+    8: "la fuerza material y la ambición bien dirigida",
+    9: "el cierre de ciclos y la generosidad",
+    11: "la intuición y la inspiración",
+    22: "la capacidad de construir algo duradero",
+    33: "la entrega y la guía de los demás",
+}
+
+# tema -> (cómo se nombra, consejos)
+TEMAS = {
+    'amor': ("en el amor", (
+        "una conversación sincera puede acercarte a quien ya ocupa tus pensamientos",
+        "conviene escuchar más de lo que hablas",
+        "un gesto pequeño tendrá más valor que una gran promesa",
+    )),
+    'trabajo': ("en el trabajo", (
+        "una propuesta que parece menor puede abrirte una puerta importante",
+        "tu constancia será reconocida si la haces visible",
+        "conviene terminar lo pendiente antes de empezar algo nuevo",
+    )),
+    'finanzas': ("en tus finanzas", (
+        "la prudencia con los gastos de estas semanas te dará tranquilidad",
+        "una decisión meditada valdrá más que una oportunidad rápida",
+        "ordenar tus cuentas te mostrará recursos que no sabías que tenías",
+    )),
+}
+CONSEJOS_GENERALES = (
+    "la paciencia te mostrará el momento adecuado para actuar",
+    "lo que siembres ahora dará fruto antes de lo que esperas",
+)
+
+# (con nombre, sin nombre)
+APERTURAS = (
+    ("{nombre}, los números de tu nacimiento hablan con claridad.",
+     "Los números de tu nacimiento hablan con claridad."),
+    ("Escucha bien, {nombre}, porque tus números tienen algo que decirte.",
+     "Escucha bien, porque tus números tienen algo que decirte."),
+    ("{nombre}, he consultado tus números y las estrellas.",
+     "He consultado tus números y las estrellas."),
+)
+CIERRES = (
+    "Confía en lo que sientes y los números harán el resto.",
+    "Recuerda que los números señalan el camino, pero los pasos son tuyos.",
+    "Guarda estas palabras y vuelve a ellas cuando dudes.",
+)
+
+def generar(tema, datos_usuario, hoy=None):
+    """Un párrafo de lectura para `tema` con los datos que dio el visitante"""
+    hoy = hoy or date.today()
+    calculo = numerologia.calcular(datos_usuario, hoy)
+    nombre = nombre_limpio(datos_usuario.get('nombre', ''))
+    azar = random.Random(f"{nombre}|{calculo.get('nacimiento')}|{hoy}")
+    como, consejos = TEMAS.get(tema, (f"en cuanto a {tema}" if tema else "en lo que buscas",
+                                      CONSEJOS_GENERALES))
+
+    con_nombre, sin_nombre = azar.choice(APERTURAS)
+    frases = [con_nombre.format(nombre=nombre) if nombre else sin_nombre]
+    if 'nacimiento' in calculo:
+        frases.append(f"Tu camino de vida es el {calculo['camino_de_vida']}, que señala "
+                      f"{SIGNIFICADOS[calculo['camino_de_vida']]}, y tu signo "
+                      f"{calculo['signo']} refuerza esa tendencia.")
+        frases.append(f"Este es para ti un año personal {calculo['anio_personal']}, que favorece "
+                      f"{SIGNIFICADOS[calculo['anio_personal']]}, y {como} eso significa que "
+                      f"{azar.choice(consejos)}.")
+        dia = calculo['dia_personal']
+        frases.append(f"Hoy vives un día personal {dia}, marcado por {SIGNIFICADOS[dia]}.")
+    else:
+        dia = calculo['dia_universal']
+        frases.append(f"Hoy el día universal es el {dia}, que trae {SIGNIFICADOS[dia]}, "
+                      f"y {como} eso significa que {azar.choice(consejos)}.")
+    frases.append(azar.choice(CIERRES))
+    return ' '.join(frases)
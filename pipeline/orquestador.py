@@ -0,0 +1,262 @@
+"""
+Orquestador del pipeline: conecta las etapas con colas acotadas y hace
+avanzar el diálogo a partir de los eventos que publican.
+"""
+import os
+import time
+import queue
+from concurrent.futures import Future
+from pipeline.etapas import (EtapaCaptura, EtapaReconocimiento, EtapaLLM,
+                             EtapaSintesis, EtapaReproduccion, Vigilante)
+from pipeline.dialogo import Dialogo
+from utils.texto import Coincidencias
+
+class Orquestador:
+    def __init__(self, stt, tts, chat, interfaz):
+        self.stt = stt
+        self.tts = tts
+        self.chat = chat
+        self.interfaz = interfaz    # BusInterfaz: estado para la consola y el sprite
+
+        self.eventos = queue.Queue(maxsize=64)
+        cola_audio = queue.Queue(maxsize=32)
+
+        self.captura = EtapaCaptura(stt, cola_audio)
+        self.reconocimiento = EtapaReconocimiento(stt, cola_audio, self.eventos)
+        self.llm = EtapaLLM(chat, self.eventos)
+        self.sintesis = EtapaSintesis(tts)
+        self.reproduccion = EtapaReproduccion(tts, self.eventos, interfaz)
+        self.vigilante = Vigilante(self.eventos)
+        self.etapas = [self.vigilante, self.reproduccion, self.sintesis, self.llm,
+                       self.reconocimiento, self.captura]
+
+        self.generacion = 0
+        self._espera = None     # turno de escucha del modo espera, si sigue abierto
+        self.sesion = 0
+        self.timeout_inactividad = None
+        self._preparados = {}   # texto -> Future con la ruta del WAV
+        self._fijos = {}        # textos fijos del plan: se sintetizan una vez y se reutilizan
+        self._compartidos = {}  # texto -> WAV ya sintetizado por el lanzador prefork (no se borra)
+        self._prompts = {}      # (tema, fecha) -> instrucciones ya rellenadas
+        self.grabadora = None   # Grabadora si se graban las sesiones
+        self.recursos = None    # GestorRecursos si hay presupuesto de memoria
+        self.perfiles = None    # AlmacenPerfiles si se recuerda a los visitantes
+        self.iniciado = False
+
+    def iniciar(self):
+        if self.iniciado:
+            return
+        for etapa in self.etapas:
+            etapa.iniciar()
+        self.iniciado = True
+
+    def detener(self):
+        if not self.iniciado:
+            return
+        self._espera = None
+        self.captura.pausar()
+        for etapa in reversed(self.etapas):
+            etapa.detener()
+        self._descartar_preparados()
+        self.soltar_fijos()
+        if self.grabadora:
+            self.grabadora.cerrar()
+        self.iniciado = False
+
+    def grabar(self, grabadora):
+        """Guardar cada sesión (audio, reconocimiento, LLM y tiempos) para repetirla"""
+        self.grabadora = grabadora
+        self.captura.grabadora = grabadora
+
+    def actualizar_plan(self, viejo, nuevo):
+        """Aplicar un plan nuevo: solo se tira lo que cambió"""
+        vigentes = set(nuevo.textos_fijos())
+        self._descartar_fijos([texto for texto in self._fijos if texto not in vigentes])
+        if viejo is None or viejo.plantilla_llm != nuevo.plantilla_llm:
+            self._prompts = {}
+        if self.iniciado:
+            self.fijar(nuevo.textos_fijos())
+
+    def ejecutar_sesion(self, plan, timeout_inactividad=None):
+        """Ejecutar una sesión completa; devuelve el diálogo terminado"""
+        self.iniciar()
+        if self.recursos:
+            self.recursos.usar('frases fijas')
+        self.fijar(plan.textos_fijos())
+        self.sesion += 1
+        self.timeout_inactividad = timeout_inactividad
+        dialogo = Dialogo(plan, self, self.sesion)
+        if self.grabadora:
+            self.grabadora.abrir_sesion(self.sesion)
+        dialogo.comenzar()
+        while not dialogo.terminado:
+            evento = self.eventos.get()
+            if self.grabadora:
+                self._grabar_evento(evento)
+            dialogo.procesar(evento)
+        if self.grabadora:
+            self.grabadora.cerrar_sesion(datos_usuario=dialogo.datos_usuario,
+                                         tema_elegido=dialogo.tema_elegido,
+                                         abandonada=dialogo.abandonado)
+        if self.perfiles and not dialogo.abandonado:
+            self.perfiles.guardar(dialogo.datos_usuario, dialogo.conocido)
+        self._descartar_preparados()
+        self.timeout_inactividad = None
+        self.interfaz.publicar('esperando')
+        return dialogo
+
+    def esperar_visitante(self, palabras_activacion, umbral_voz=None, bloques_voz=2, limite=None):
+        """Modo espera: bloquear hasta oír una palabra de activación (o voz, si hay umbral).
+
+        Con `limite` (segundos) devuelve None si en ese tiempo no llega nadie y
+        la escucha sigue abierta: la siguiente llamada continúa el mismo turno, así
+        que una palabra dicha justo en el límite no se pierde. Para empezar otro
+        turno (p. ej. con otras palabras) hay que llamar antes a `terminar_espera`.
+        """
+        self.iniciar()
+        if self._espera is None:
+            self.interfaz.publicar('esperando')
+            self.reconocimiento.configurar_vad(umbral_voz, bloques_voz)
+            self._espera = self._abrir_escucha()
+        generacion = self._espera
+        activacion = Coincidencias({'activacion': palabras_activacion})
+        fin = time.monotonic() + limite if limite else None
+        seguir = False
+        try:
+            while True:
+                try:
+                    evento = self.eventos.get(timeout=fin - time.monotonic() if fin else None)
+                except queue.Empty:
+                    seguir = True
+                    return None
+                if evento[0] not in ('voz', 'parcial', 'final') or evento[1] != generacion:
+                    continue
+                if evento[0] == 'voz':
+                    return 'voz'
+                if activacion.buscar(evento[2]):
+                    return evento[2]
+        finally:
+            if not seguir:
+                self.terminar_espera()
+
+    def terminar_espera(self):
+        """Cerrar el turno de escucha del modo espera, si hay uno abierto"""
+        if self._espera is None:
+            return
+        self._espera = None
+        self.dejar_de_escuchar()
+        self.reconocimiento.configurar_vad(None)
+
+    def fijar(self, textos):
+        """Sintetizar los textos fijos del plan y conservarlos entre sesiones"""
+        for texto in textos:
+            futuro = self._fijos.get(texto)
+            if futuro is not None and not (futuro.done() and futuro.result() is None):
+                continue
+            futuro = self._preparados.pop(texto, None)
+            compartido = self._compartidos.get(texto)
+            if futuro is None and compartido and os.path.exists(compartido):
+                futuro = Future()
+                futuro.compartido = True
+                futuro.set_result(compartido)
+            elif futuro is None:
+                futuro = Future()
+                self.sintesis.enviar((texto, futuro))
+            self._fijos[texto] = futuro
+
+    def compartir_fijos(self, wavs):
+        """Usar los WAV de frases fijas que otro proceso ya sintetizó (texto -> ruta)"""
+        self._compartidos = dict(wavs)
+
+    def hay_fijos(self):
+        return bool(self._fijos)
+
+    def soltar_fijos(self):
+        """Borrar los WAV de las frases fijas (se vuelven a sintetizar con fijar)"""
+        self._descartar_fijos(list(self._fijos))
+
+    def prompt_base(self, plan, tema, fecha):
+        """Instrucciones del LLM para un tema y una fecha (se rellenan una vez por día)"""
+        clave = (tema, fecha)
+        prompt = self._prompts.get(clave)
+        if prompt is None:
+            prompt = plan.plantilla_llm.render(tema_elegido=tema, fecha_actual=fecha)
+            self._prompts[clave] = prompt
+        return prompt
+
+    # --- acciones que pide el diálogo ---
+    def preparar(self, texto):
+        """Encolar la síntesis de un texto (si no estaba ya encolada)"""
+        futuro = self._fijos.get(texto) or self._preparados.get(texto)
+        if futuro is None:
+            futuro = Future()
+            self._preparados[texto] = futuro
+            self.sintesis.enviar((texto, futuro))
+        return futuro
+
+    def decir(self, texto, clave=None):
+        """Reproducir un texto en cuanto termine lo que ya está en cola"""
+        fijo = texto in self._fijos
+        futuro = self.preparar(texto)
+        if not fijo:
+            # El WAV se borra al reproducirlo: no se puede reutilizar
+            del self._preparados[texto]
+        self.reproduccion.enviar((clave, futuro, not fijo))
+
+    def escuchar(self):
+        """Abrir un turno de escucha del diálogo; devuelve su número"""
+        if self.recursos:
+            # Si el modelo se soltó mientras no había nadie, aquí se espera a que vuelva
+            self.recursos.usar('modelo vosk')
+        self.interfaz.publicar('escuchando')
+        return self._abrir_escucha()
+
+    def _abrir_escucha(self):
+        self.generacion += 1
+        if self.grabadora:
+            self.grabadora.escuchar(self.generacion)
+        self.captura.escuchar(self.generacion)
+        self.renovar_inactividad()
+        return self.generacion
+
+    def renovar_inactividad(self):
+        """Reiniciar la cuenta atrás de inactividad del turno actual"""
+        if self.timeout_inactividad:
+            self.vigilante.armar(self.generacion, self.timeout_inactividad)
+
+    def dejar_de_escuchar(self):
+        self.captura.pausar()
+        self.vigilante.desarmar()
+
+    def pedir_lectura(self, prompt, max_tokens, respaldo=None):
+        if self.grabadora:
+            self.grabadora.registrar('llm', prompt=prompt, max_tokens=max_tokens)
+        self.llm.enviar((prompt, max_tokens, respaldo))
+
+    def _grabar_evento(self, evento):
+        tipo = evento[0]
+        if tipo in ('parcial', 'final'):
+            self.grabadora.registrar(tipo, gen=evento[1], texto=evento[2])
+        elif tipo == 'lectura':
+            self.grabadora.registrar('lectura', respuesta=evento[1], uso=self.chat.ultimo_uso)
+        elif tipo == 'reproducido':
+            self.grabadora.registrar('reproducido', clave=evento[1])
+        elif tipo == 'inactividad':
+            self.grabadora.registrar('inactividad', gen=evento[1])
+
+    def _descartar_preparados(self):
+        """Borrar los WAV precargados que al final no se reprodujeron"""
+        for futuro in self._preparados.values():
+            futuro.add_done_callback(_borrar_wav)
+        self._preparados = {}
+
+    def _descartar_fijos(self, textos):
+        for texto in textos:
+            futuro = self._fijos.pop(texto)
+            if not getattr(futuro, 'compartido', False):
+                futuro.add_done_callback(_borrar_wav)
+
+def _borrar_wav(futuro):
+    archivo = futuro.result()
+    if archivo and os.path.exists(archivo):
+        os.remove(archivo)
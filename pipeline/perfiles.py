@@ -0,0 +1,185 @@
+"""
+Perfiles de los visitantes que vuelven.
+
+Al terminar una sesión se guarda el nombre y la fecha de nacimiento del
+visitante en una base SQLite local. En la siguiente visita, en cuanto dice
+su nombre, se busca un perfil parecido y se le pregunta cuándo nació (nunca
+se dice en voz alta la fecha guardada: el kiosko es público). Si la fecha
+coincide con la de un perfil de ese nombre, el resto de preguntas se omiten.
+
+Vosk no siempre escribe igual un mismo nombre (Yésica / Jessica, Sara /
+Zara, Laura / Lora), así que la búsqueda usa una clave fonética aproximada
+del español, indexada, y si no hay ninguna igual compara con todas las de
+longitud parecida y se queda con la más parecida. Un parecido de más no
+cuesta nada: sin la fecha de nacimiento no se reconoce a nadie.
+"""
+import re
+import math
+import time
+import sqlite3
+import difflib
+import threading
+from datetime import date
+from utils import numerologia
+from utils.texto import normalizar, nombre_limpio
+
+MESES = ('enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+         'septiembre', 'octubre', 'noviembre', 'diciembre')
+
+# Se aplican en orden sobre el nombre ya normalizado
+_FONETICA = (
+    (r'[^a-zñ]', ''),
+    (r'^j', 'y'),       # Jessica / Yésica
+    (r'qu', 'k'), (r'ch', 'C'), (r'h', ''),
+    (r'c(?=[ei])', 's'), (r'c', 'k'), (r'z', 's'), (r'[vw]', 'b'),
+    (r'g(?=[ei])', 'j'), (r'll', 'y'), (r'x', 'ks'),
+    (r'y$', 'i'), (r'(.)\1+', r'\1'),
+)
+_FONETICA = tuple((re.compile(patron), sustituto) for patron, sustituto in _FONETICA)
+
+def clave_fonetica(nombre):
+    clave = normalizar(nombre)
+    for patron, sustituto in _FONETICA:
+        clave = patron.sub(sustituto, clave)
+    return clave
+
+def _longitudes(n, similitud):
+    """Longitudes de clave que pueden dar un parecido >= `similitud` con una de `n` letras.
+
+    El parecido de difflib es 2·M / (n + m) y M no pasa de la más corta.
+    """
+    return math.ceil(n * similitud / (2 - similitud)), math.floor(n * (2 - similitud) / similitud)
+
+def fecha_hablada(nacimiento):
+    return f"{nacimiento.day} de {MESES[nacimiento.month - 1]} de {nacimiento.year}"
+
+class Perfil:
+    def __init__(self, id, nombre, nacimiento, visitas):
+        self.id = id
+        self.nombre = nombre
+        self.nacimiento = nacimiento
+        self.visitas = visitas
+
+    def datos(self, hoy=None):
+        """Las respuestas que se omiten, como si las hubiera dicho hoy"""
+        hoy = hoy or date.today()
+        edad = hoy.year - self.nacimiento.year - (
+            (hoy.month, hoy.day) < (self.nacimiento.month, self.nacimiento.day))
+        return {'edad': str(edad), 'fecha de nacimiento': fecha_hablada(self.nacimiento)}
+
+class AlmacenPerfiles:
+    def __init__(self, ruta, similitud=0.65):
+        self.ruta = ruta
+        self.similitud = similitud
+        # lo usan el hilo del diálogo y el principal; sqlite3 serializa con el lock
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conexion:
+            # la restricción única crea el índice (clave, nacimiento) que usan las búsquedas
+            self.conexion.execute("""
+                CREATE TABLE IF NOT EXISTS perfiles (
+                    id INTEGER PRIMARY KEY,
+                    clave TEXT NOT NULL,
+                    nombre TEXT NOT NULL,
+                    nacimiento TEXT NOT NULL,
+                    visitas INTEGER NOT NULL DEFAULT 1,
+                    ultima_visita REAL NOT NULL,
+                    UNIQUE (clave, nacimiento)
+                )""")
+        self.busquedas = []     # ms de cada búsqueda
+        self.encontrados = 0
+        self.confirmados = 0
+        self.rechazados = 0
+        self.omitidas = 0       # preguntas que no hubo que hacer
+
+    def buscar(self, texto, nacimiento=None):
+        """El perfil más parecido al nombre dicho (y nacido en `nacimiento`, si se da), o None"""
+        t0 = time.perf_counter()
+        try:
+            nombre = nombre_limpio(texto)
+            if not nombre:
+                return None
+            clave = clave_fonetica(nombre)
+            consulta = ("SELECT id, clave, nombre, nacimiento, visitas FROM perfiles "
+                        "WHERE {} ORDER BY ultima_visita DESC")
+            filtro, valores = "", ()
+            if nacimiento:
+                filtro, valores = " AND nacimiento = ?", (nacimiento.isoformat(),)
+            with self.lock:
+                filas = self.conexion.execute(consulta.format("clave = ?" + filtro),
+                                              (clave,) + valores).fetchall()
+                if not filas:
+                    # sin coincidencia exacta: todas las claves que por longitud aún pueden
+                    # llegar al parecido pedido (un fallo en la primera letra no las descarta)
+                    corta, larga = _longitudes(len(clave), self.similitud)
+                    filas = self.conexion.execute(
+                        consulta.format("length(clave) BETWEEN ? AND ?" + filtro),
+                        (corta, larga) + valores).fetchall()
+            mejor, parecido = None, self.similitud
+            comparador = difflib.SequenceMatcher(b=clave)
+            for fila in filas:
+                comparador.set_seq1(fila[1])
+                if comparador.quick_ratio() < parecido:
+                    continue
+                ratio = comparador.ratio()
+                if ratio > parecido or (mejor is None and ratio == parecido):
+                    mejor, parecido = fila, ratio
+            if mejor is None:
+                return None
+            if nacimiento is None:
+                self.encontrados += 1
+            return Perfil(mejor[0], mejor[2], date.fromisoformat(mejor[3]), mejor[4])
+        finally:
+            self.busquedas.append((time.perf_counter() - t0) * 1000)
+
+    def guardar(self, datos_usuario, perfil=None):
+        """Crear o actualizar el perfil de una sesión completa; False si faltan datos.
+
+        Si el visitante confirmó un `perfil`, se actualiza ese aunque Vosk haya
+        escrito el nombre de otra forma esta vez.
+        """
+        if perfil:
+            with self.lock, self.conexion:
+                self.conexion.execute("UPDATE perfiles SET visitas = visitas + 1, "
+                                      "ultima_visita = ? WHERE id = ?", (time.time(), perfil.id))
+            return True
+        nombre = nombre_limpio(datos_usuario.get('nombre', ''))
+        edad = numerologia.parsear_numero(datos_usuario.get('edad', ''))
+        nacimiento = numerologia.parsear_fecha(datos_usuario.get('fecha de nacimiento', ''),
+                                               edad=edad)
+        if not nombre or not nacimiento:
+            return False
+        with self.lock, self.conexion:
+            self.conexion.execute("""
+                INSERT INTO perfiles (clave, nombre, nacimiento, ultima_visita)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (clave, nacimiento) DO UPDATE SET
+                    visitas = visitas + 1, nombre = excluded.nombre,
+                    ultima_visita = excluded.ultima_visita
+            """, (clave_fonetica(nombre), nombre, nacimiento.isoformat(), time.time()))
+        return True
+
+    def confirmado(self, si, omitidas=0):
+        if si:
+            self.confirmados += 1
+            self.omitidas += omitidas
+        else:
+            self.rechazados += 1
+
+    def informe(self):
+        # la pregunta de la fecha solo es un turno de más si se confirma: si no, su
+        # respuesta vale para la pregunta de la fecha de siempre
+        lineas = [f"   conocidos {self.encontrados}, confirmados {self.confirmados}, "
+                  f"rechazados {self.rechazados}",
+                  f"   preguntas omitidas {self.omitidas}, turnos ahorrados "
+                  f"{self.omitidas - self.confirmados} (descontando las preguntas de "
+                  f"confirmación de los conocidos)"]
+        if self.busquedas:
+            ordenadas = sorted(self.busquedas)
+            lineas.append(f"   búsqueda: media {sum(ordenadas) / len(ordenadas):.2f} ms, "
+                          f"máx {ordenadas[-1]:.2f} ms ({len(ordenadas)})")
+        return '\n'.join(lineas)
+
+    def cerrar(self):
+        with self.lock:
+            self.conexion.close()
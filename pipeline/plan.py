@@ -0,0 +1,309 @@
+"""
+Plan de diálogo compilado a partir de config_secuencia.json.
+
+El JSON se valida una sola vez al cargarlo y se convierte en un objeto
+inmutable con los pasos, los validadores y las plantillas ya preparados.
+`CargadorPlan` vigila la fecha de modificación del archivo y cambia el
+plan entre sesiones sin reiniciar el proceso.
+"""
+import os
+import re
+import json
+from dataclasses import dataclass
+from types import MappingProxyType
+from pipeline.validadores import Validador
+
+CAMPOS_PROMPT = {'tema_elegido', 'fecha_actual'}
+CAMPOS_CONFIRMACION = {'nombre'}
+CONFIRMACION = "Creo que ya nos conocemos, {nombre}. ¿Cuándo naciste? Dime tu día, mes y año."
+TIPOS_VALIDADOR = {'nombre', 'numero', 'fecha'}
+
+class ErrorConfiguracion(Exception):
+    """La configuración del diálogo no es válida"""
+
+class Plantilla:
+    """Texto con campos {nombre}, partido en segmentos al compilarlo"""
+    _CAMPO = re.compile(r'\{(\w+)\}')
+
+    def __init__(self, texto):
+        self.texto = texto
+        partes = self._CAMPO.split(texto)
+        # partes alterna texto fijo y nombres de campo: fijo, campo, fijo, ...
+        self.segmentos = tuple(partes)
+        self.campos = frozenset(partes[1::2])
+
+    def render(self, **valores):
+        partes = list(self.segmentos)
+        for i in range(1, len(partes), 2):
+            partes[i] = str(valores[partes[i]])
+        return ''.join(partes)
+
+    def __eq__(self, otra):
+        return isinstance(otra, Plantilla) and self.texto == otra.texto
+
+    def __hash__(self):
+        return hash(self.texto)
+
+@dataclass(frozen=True)
+class Paso:
+    tipo: str                  # decir, preguntar, tema o lectura
+    texto: str = None
+    variable: str = None
+    validador: Validador = None
+
+@dataclass(frozen=True)
+class PlanDialogo:
+    pasos: tuple
+    no_entendido: str
+    plantilla_llm: Plantilla
+    max_tokens: int
+    kiosko: MappingProxyType
+    metricas: MappingProxyType
+    grabacion: MappingProxyType
+    recursos: MappingProxyType
+    interfaz: MappingProxyType
+    perfiles: MappingProxyType
+    llm: MappingProxyType           # plazo de la lectura y segunda petición
+    prefork: MappingProxyType       # un kiosko por tarjeta de sonido (utils/prefork.py)
+    plantilla_confirmacion: Plantilla   # "¿cuándo naciste?" a un visitante que parece volver
+    validador_confirmacion: Validador   # el de las fechas
+
+    def textos_fijos(self):
+        """Todo lo que el asistente dice con texto fijo (se puede sintetizar por adelantado)"""
+        textos = [paso.texto for paso in self.pasos if paso.texto]
+        textos.append(self.no_entendido)
+        return tuple(dict.fromkeys(textos))
+
+def _congelar(valor):
+    """Copia inmutable de un valor JSON"""
+    if isinstance(valor, dict):
+        return MappingProxyType({k: _congelar(v) for k, v in valor.items()})
+    if isinstance(valor, list):
+        return tuple(_congelar(v) for v in valor)
+    return valor
+
+def _texto(config, clave, errores):
+    valor = config.get(clave)
+    if not isinstance(valor, str) or not valor.strip():
+        errores.append(f"'{clave}' debe ser un texto no vacío")
+        return ''
+    return valor
+
+def compilar(config):
+    """Validar el JSON y construir el plan; lanza ErrorConfiguracion con todos los fallos"""
+    errores = []
+    if not isinstance(config, dict):
+        raise ErrorConfiguracion("la configuración debe ser un objeto JSON")
+
+    estabilidad = config.get('estabilidad_parcial', {})
+    if not isinstance(estabilidad, dict) or not all(
+            isinstance(v, int) and v >= 1 for v in estabilidad.values()):
+        errores.append("'estabilidad_parcial' debe asociar cada validador a un entero >= 1")
+        estabilidad = {}
+
+    temas = config.get('temas')
+    if (not isinstance(temas, dict) or not temas
+            or not all(isinstance(p, list) and p and all(isinstance(x, str) for x in p)
+                       for p in temas.values())):
+        errores.append("'temas' debe asociar cada tema a una lista no vacía de palabras")
+        temas = {}
+
+    pasos = [Paso('decir', _texto(config, 'bienvenida', errores))]
+
+    preguntas = config.get('preguntas_secuencia')
+    if not isinstance(preguntas, list) or not preguntas:
+        errores.append("'preguntas_secuencia' debe ser una lista no vacía")
+        preguntas = []
+    variables = set()
+    for n, pregunta in enumerate(preguntas, 1):
+        if not isinstance(pregunta, dict):
+            errores.append(f"pregunta {n}: debe ser un objeto")
+            continue
+        texto = pregunta.get('pregunta')
+        variable = pregunta.get('variable')
+        tipo = pregunta.get('validador')
+        if not isinstance(texto, str) or not texto.strip():
+            errores.append(f"pregunta {n}: falta 'pregunta'")
+        if not isinstance(variable, str) or not variable.strip():
+            errores.append(f"pregunta {n}: falta 'variable'")
+        elif variable in variables:
+            errores.append(f"pregunta {n}: la variable '{variable}' está repetida")
+        variables.add(variable)
+        if tipo is not None and tipo not in TIPOS_VALIDADOR:
+            errores.append(f"pregunta {n}: validador '{tipo}' desconocido "
+                           f"(válidos: {', '.join(sorted(TIPOS_VALIDADOR))})")
+            tipo = None
+        validador = Validador(tipo, estabilidad.get(tipo)) if tipo else None
+        pasos.append(Paso('preguntar', texto, variable, validador))
+
+    pasos.append(Paso('tema', _texto(config, 'pregunta_tema', errores), None,
+                      Validador('tema', estabilidad.get('tema'), temas=temas)))
+    pasos.append(Paso('lectura'))
+
+    instrucciones = _texto(config, 'instrucciones_llm', errores)
+    plantilla = Plantilla(instrucciones)
+    desconocidos = plantilla.campos - CAMPOS_PROMPT
+    if desconocidos:
+        errores.append(f"'instrucciones_llm' usa campos desconocidos: {', '.join(sorted(desconocidos))}")
+
+    max_tokens = config.get('max_tokens_lectura', 1000)
+    if not isinstance(max_tokens, int) or max_tokens <= 0:
+        errores.append("'max_tokens_lectura' debe ser un entero positivo")
+
+    kiosko = config.get('kiosko', {})
+    if not isinstance(kiosko, dict):
+        errores.append("'kiosko' debe ser un objeto")
+        kiosko = {}
+    elif kiosko.get('activacion', 'palabra') not in ('palabra', 'voz'):
+        errores.append("'kiosko.activacion' debe ser 'palabra' o 'voz'")
+
+    metricas = config.get('metricas', {})
+    if not isinstance(metricas, dict):
+        errores.append("'metricas' debe ser un objeto")
+        metricas = {}
+
+    grabacion = config.get('grabacion', {})
+    if not isinstance(grabacion, dict):
+        errores.append("'grabacion' debe ser un objeto")
+        grabacion = {}
+
+    recursos = config.get('recursos', {})
+    if not isinstance(recursos, dict):
+        errores.append("'recursos' debe ser un objeto")
+        recursos = {}
+    elif not all(isinstance(recursos.get(clave, 1), (int, float)) and recursos.get(clave, 1) > 0
+                 for clave in ('presupuesto_mb', 'inactividad_s', 'revisar_cada_s')):
+        errores.append("'recursos': presupuesto_mb, inactividad_s y revisar_cada_s deben ser números positivos")
+
+    interfaz = config.get('interfaz', {})
+    if not isinstance(interfaz, dict):
+        errores.append("'interfaz' debe ser un objeto")
+        interfaz = {}
+    elif not isinstance(interfaz.get('fps', 10), (int, float)) or interfaz.get('fps', 10) <= 0:
+        errores.append("'interfaz.fps' debe ser un número positivo")
+
+    perfiles = config.get('perfiles', {})
+    confirmacion = Plantilla(CONFIRMACION)
+    if not isinstance(perfiles, dict):
+        errores.append("'perfiles' debe ser un objeto")
+        perfiles = {}
+    else:
+        similitud = perfiles.get('similitud', 0.65)
+        if not isinstance(similitud, (int, float)) or not 0 < similitud <= 1:
+            errores.append("'perfiles.similitud' debe estar entre 0 y 1")
+        if 'pregunta' in perfiles:
+            confirmacion = Plantilla(_texto(perfiles, 'pregunta', errores))
+            desconocidos = confirmacion.campos - CAMPOS_CONFIRMACION
+            if desconocidos:
+                errores.append(f"'perfiles.pregunta' usa campos desconocidos: "
+                               f"{', '.join(sorted(desconocidos))}")
+
+    llm = config.get('llm', {})
+    if not isinstance(llm, dict):
+        errores.append("'llm' debe ser un objeto")
+        llm = {}
+    else:
+        if not all(isinstance(llm.get(clave, 1), (int, float)) and llm.get(clave, 1) > 0
+                   for clave in ('presupuesto_s', 'cobertura_inicial_s')):
+            errores.append("'llm': presupuesto_s y cobertura_inicial_s deben ser números positivos")
+        percentil = llm.get('percentil_cobertura', 90)
+        if not isinstance(percentil, (int, float)) or not 0 < percentil < 100:
+            errores.append("'llm.percentil_cobertura' debe estar entre 0 y 100")
+
+    prefork = config.get('prefork', {})
+    if not isinstance(prefork, dict):
+        errores.append("'prefork' debe ser un objeto")
+        prefork = {}
+    else:
+        if not all(isinstance(prefork.get(clave, 1), (int, float)) and prefork.get(clave, 1) > 0
+                   for clave in ('revisar_cada_s', 'colgado_s', 'sin_audio_s', 'informe_cada_s')):
+            errores.append("'prefork': revisar_cada_s, colgado_s, sin_audio_s e informe_cada_s "
+                           "deben ser números positivos")
+        puestos = prefork.get('puestos', [])
+        nombres = set()
+        if not isinstance(puestos, list):
+            errores.append("'prefork.puestos' debe ser una lista")
+            puestos = []
+        for n, puesto in enumerate(puestos, 1):
+            if not isinstance(puesto, dict):
+                errores.append(f"puesto {n}: debe ser un objeto")
+                continue
+            nombre = puesto.get('nombre')
+            if not isinstance(nombre, str) or not nombre.strip():
+                errores.append(f"puesto {n}: falta 'nombre'")
+            elif nombre in nombres:
+                errores.append(f"puesto {n}: el nombre '{nombre}' está repetido")
+            nombres.add(nombre)
+            for clave in ('entrada', 'salida'):
+                dispositivo = puesto.get(clave)
+                if dispositivo is not None and not isinstance(dispositivo, (int, str)):
+                    errores.append(f"puesto {n}: '{clave}' debe ser un índice o un nombre de dispositivo")
+
+    if errores:
+        raise ErrorConfiguracion('; '.join(errores))
+
+    return PlanDialogo(
+        pasos=tuple(pasos),
+        no_entendido=config.get('mensaje_no_entendido', "No entendí el tema, por favor repite."),
+        plantilla_llm=plantilla,
+        max_tokens=max_tokens,
+        kiosko=_congelar(kiosko),
+        metricas=_congelar(metricas),
+        grabacion=_congelar(grabacion),
+        recursos=_congelar(recursos),
+        interfaz=_congelar(interfaz),
+        perfiles=_congelar(perfiles),
+        llm=_congelar(llm),
+        prefork=_congelar(prefork),
+        plantilla_confirmacion=confirmacion,
+        validador_confirmacion=Validador('fecha', estabilidad.get('fecha')),
+    )
+
+def cargar(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        try:
+            config = json.load(f)
+        except ValueError as e:
+            raise ErrorConfiguracion(f"JSON inválido: {e}")
+    return compilar(config)
+
+class CargadorPlan:
+    """Mantiene el plan actual y lo recompila si el archivo cambia en disco"""
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.plan = None
+        self.mtime = None
+        self.al_cambiar = []    # funciones (plan_viejo, plan_nuevo)
+
+    def cargar(self):
+        """Carga inicial; devuelve el plan o None si no se pudo cargar"""
+        try:
+            self.mtime = os.stat(self.ruta).st_mtime_ns
+            self.plan = cargar(self.ruta)
+        except FileNotFoundError:
+            print(f"❌ Error: No se encuentra el archivo '{self.ruta}'")
+        except ErrorConfiguracion as e:
+            print(f"❌ Error en '{self.ruta}': {e}")
+        return self.plan
+
+    def actualizar(self):
+        """Recompilar si el archivo cambió; si el nuevo no es válido se mantiene el anterior"""
+        try:
+            mtime = os.stat(self.ruta).st_mtime_ns
+        except FileNotFoundError:
+            return self.plan
+        if mtime == self.mtime:
+            return self.plan
+
+        self.mtime = mtime
+        try:
+            nuevo = cargar(self.ruta)
+        except (OSError, ErrorConfiguracion) as e:
+            print(f"⚠️ Configuración modificada pero no válida, se mantiene la anterior: {e}")
+            return self.plan
+
+        viejo, self.plan = self.plan, nuevo
+        print("🔄 Configuración recargada")
+        for funcion in self.al_cambiar:
+            funcion(viejo, nuevo)
+        return self.plan
@@ -0,0 +1,104 @@
+"""
+Validadores de respuestas por pregunta.
+
+Se aplican a los resultados parciales de Vosk: si un parcial es válido y se
+mantiene igual durante `estabilidad` bloques seguidos, el turno se da por
+terminado sin esperar al final de frase de Vosk.
+"""
+import re
+from datetime import date
+from utils import numerologia
+from utils.texto import normalizar, Coincidencias, RELLENO_NOMBRE
+
+# Bloques seguidos con el mismo parcial válido antes de cerrar el turno
+ESTABILIDAD = {'nombre': 3, 'numero': 2, 'fecha': 3, 'tema': 1}
+
+# Un parcial que acaba en una de estas palabras está a mitad del número: "mil
+# novecientos" (noventa), "dos mil" (diez), "treinta y" (dos)... Las decenas no
+# están: "treinta" ya es un número, aunque aún le pueda seguir "y dos"
+CONTINUABLES = (set(numerologia.CENTENAS) - {'cien'}) | {'mil', 'y', 'de', 'del'}
+
+# Nadie nace hace más de esto (la misma cota que la edad)
+ANIOS_MAXIMOS = 120
+
+def validar_nombre(texto):
+    palabras = [p for p in normalizar(texto).split() if p not in RELLENO_NOMBRE]
+    return texto if palabras else None
+
+def _palabras(texto):
+    return re.findall(r'[a-zñ]+|\d+', normalizar(texto))
+
+def _incompleto(texto):
+    """¿El visitante está todavía a mitad del número?"""
+    palabras = _palabras(texto)
+    return not palabras or palabras[-1] in CONTINUABLES
+
+def _decena_abierta(texto, validar):
+    """¿Acaba en una decena a la que aún le puede seguir "y <unidad>" con un valor válido?
+
+    "mil novecientos noventa" puede ser 1991; "treinta de febrero", no.
+    """
+    palabras = _palabras(texto)
+    return (bool(palabras) and palabras[-1] in numerologia.DECENAS
+            and validar(texto + ' y uno') is not None)
+
+def validar_numero(texto):
+    if _incompleto(texto):
+        return None
+    edad = numerologia.parsear_numero(texto)
+    return texto if edad is not None and 0 < edad < ANIOS_MAXIMOS else None
+
+def validar_fecha(texto):
+    # Solo cuenta como completa si trae año explícito y no se está terminando de decir
+    if _incompleto(texto):
+        return None
+    hoy = date.today()
+    nacimiento = numerologia.parsear_fecha(texto, hoy=hoy)
+    if nacimiento and hoy.year - ANIOS_MAXIMOS <= nacimiento.year and nacimiento <= hoy:
+        return texto
+    return None
+
+class Validador:
+    def __init__(self, tipo, estabilidad=None, temas=None):
+        self.tipo = tipo
+        self.estabilidad = estabilidad or ESTABILIDAD.get(tipo, 2)
+        if tipo == 'tema':
+            self.coincidencias = Coincidencias(temas or {})
+            self._validar = self.coincidencias.buscar
+        else:
+            self._validar = {
+                'nombre': validar_nombre,
+                'numero': validar_numero,
+                'fecha': validar_fecha,
+            }[tipo]
+
+    def validar(self, texto, estable=False):
+        """Valor de la respuesta si es válida (el tema elegido, en el caso del tema) o None.
+
+        Un número que acaba en una decena abierta ("... noventa") solo se da por
+        bueno si es `estable`: si el visitante iba a decir "y dos" ya lo habría dicho.
+        """
+        valor = self._validar(texto)
+        if (valor is not None and not estable and self.tipo in ('numero', 'fecha')
+                and _decena_abierta(texto, self._validar)):
+            return None
+        return valor
+
+class SeguidorParcial:
+    """Cuenta cuántos parciales seguidos llegan iguales y válidos"""
+    def __init__(self, validador):
+        self.validador = validador
+        self.ultimo = None
+        self.repeticiones = 0
+        self.desde = None
+
+    def observar(self, texto, instante):
+        """Devolver el valor si el parcial ya es estable y válido"""
+        if texto != self.ultimo:
+            self.ultimo = texto
+            self.repeticiones = 0
+            self.desde = instante
+        self.repeticiones += 1
+        if self.repeticiones < self.validador.estabilidad:
+            return None
+        return self.validador.validar(texto, estable=True)
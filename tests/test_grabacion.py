@@ -0,0 +1,60 @@
+import os
+import pytest
+from pipeline.grabacion import Grabadora, leer_registros, cargar_sesiones, MAGIA
+
+def grabar_sesion(grabadora, numero):
+    grabadora.abrir_sesion(numero)
+    grabadora.escuchar(1)
+    grabadora.audio(1, b'\x01\x02' * 100)
+    grabadora.audio(1, b'\x03\x04' * 100)
+    grabadora.audio(7, b'\xff')          # de un turno que no se abrió: no se guarda
+    grabadora.registrar('final', gen=1, texto="me llamo laura")
+    grabadora.registrar('llm', prompt="Lee la suerte", max_tokens=300)
+    grabadora.registrar('lectura', respuesta="Te irá bien", uso={'total_tokens': 42})
+    grabadora.cerrar_sesion(datos_usuario={'nombre': "me llamo laura"},
+                            tema_elegido='amor', abandonada=False)
+
+def test_ida_y_vuelta(tmp_path):
+    grabadora = Grabadora(str(tmp_path))
+    grabar_sesion(grabadora, 1)
+    grabar_sesion(grabadora, 2)
+    ruta = grabadora.ruta
+    grabadora.cerrar()
+    assert ruta.endswith(f"-{os.getpid()}.ovrec")
+
+    sesiones = cargar_sesiones(ruta)
+    assert [sesion.numero for sesion in sesiones] == [1, 2]
+    sesion = sesiones[0]
+    assert len(sesion.turnos) == 1
+    assert [pcm for _, pcm in sesion.turnos[0]] == [b'\x01\x02' * 100, b'\x03\x04' * 100]
+    assert sesion.finales == ["me llamo laura"]
+    assert sesion.lecturas[0]['prompt'] == "Lee la suerte"
+    assert sesion.lecturas[0]['respuesta'] == "Te irá bien"
+    assert sesion.lecturas[0]['uso'] == {'total_tokens': 42}
+    assert sesion.datos_usuario == {'nombre': "me llamo laura"}
+    assert sesion.tema_elegido == 'amor' and not sesion.abandonada
+
+def test_sin_sesion_abierta_no_se_graba(tmp_path):
+    grabadora = Grabadora(str(tmp_path))
+    grabadora.registrar('final', texto="hola")
+    assert grabadora.ruta is None and not os.listdir(tmp_path)
+
+def test_registro_cortado_a_medias(tmp_path):
+    grabadora = Grabadora(str(tmp_path))
+    grabar_sesion(grabadora, 1)
+    grabar_sesion(grabadora, 2)
+    ruta = grabadora.ruta
+    grabadora.cerrar()
+    # el proceso muere escribiendo el último registro (el 'fin' de la sesión 2)
+    with open(ruta, 'r+b') as f:
+        f.truncate(os.path.getsize(ruta) - 5)
+
+    tipos = [cabecera['tipo'] for cabecera, _ in leer_registros(ruta)]
+    assert tipos[-1] == 'lectura'
+    assert [sesion.numero for sesion in cargar_sesiones(ruta)] == [1]
+
+def test_archivo_ajeno(tmp_path):
+    ruta = tmp_path / 'otro.ovrec'
+    ruta.write_bytes(b'RIFF' + MAGIA)
+    with pytest.raises(ValueError):
+        list(leer_registros(str(ruta)))
@@ -0,0 +1,75 @@
+from datetime import date
+import pytest
+from utils import numerologia
+
+HOY = date(2026, 10, 19)
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("treinta y dos", 32),
+    ("tengo treinta y dos años", 32),
+    ("veintiún", 21),
+    ("cien", 100),
+    ("ciento uno", 101),
+    ("mil novecientos noventa y dos", 1992),
+    ("dos mil veinticuatro", 2024),
+    ("45", 45),
+    ("no sé", None),
+])
+def test_parsear_numero(texto, esperado):
+    assert numerologia.parsear_numero(texto) == esperado
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("quince de marzo de mil novecientos noventa", date(1990, 3, 15)),
+    ("doce de marzo de mil novecientos noventa y dos", date(1992, 3, 12)),
+    ("nací el primero de enero del dos mil cinco", date(2005, 1, 1)),
+    ("veintinueve de febrero de dos mil", date(2000, 2, 29)),
+    ("15 3 1990", date(1990, 3, 15)),
+])
+def test_parsear_fecha_completa(texto, esperado):
+    assert numerologia.parsear_fecha(texto, hoy=HOY) == esperado
+
+@pytest.mark.parametrize("texto, esperado", [
+    # año con dos cifras, con y sin nombre de mes
+    ("doce de marzo del noventa", date(1990, 3, 12)),
+    ("quince del cinco del noventa", date(1990, 5, 15)),
+    ("tres del cuatro del diez", date(2010, 4, 3)),
+])
+def test_parsear_fecha_anio_corto(texto, esperado):
+    assert numerologia.parsear_fecha(texto, hoy=HOY) == esperado
+
+@pytest.mark.parametrize("texto", [
+    "treinta y uno de febrero de mil novecientos noventa",
+    "veintinueve de febrero de mil novecientos",
+    "quince del trece del noventa",
+    "del noventa",
+    "no me acuerdo",
+])
+def test_parsear_fecha_invalida(texto):
+    assert numerologia.parsear_fecha(texto, hoy=HOY) is None
+
+def test_parsear_fecha_sin_anio_usa_la_edad():
+    assert numerologia.parsear_fecha("doce de marzo", hoy=HOY) is None
+    assert numerologia.parsear_fecha("doce de marzo", hoy=HOY, edad=30) == date(1996, 3, 12)
+    # el cumpleaños de este año aún no ha llegado
+    assert numerologia.parsear_fecha("dos de diciembre", hoy=HOY, edad=30) == date(1995, 12, 2)
+
+def test_calcular():
+    calculo = numerologia.calcular({'edad': 'treinta y cuatro',
+                                    'fecha de nacimiento': 'quince de marzo de mil novecientos noventa'},
+                                   hoy=HOY)
+    assert calculo['nacimiento'] == date(1990, 3, 15)
+    assert calculo['camino_de_vida'] == 1     # 6 + 3 + 1 (1990 -> 19 -> 10 -> 1)
+    assert calculo['signo'] == 'Piscis'
+    assert calculo['anio_personal'] == 1      # 6 + 3 + 1 (2026 -> 10 -> 1)
+    assert calculo['dia_universal'] == 3      # 1+9+1+0+2+0+2+6 = 21 -> 3
+
+def test_numeros_maestros():
+    assert numerologia.reducir(29) == 11
+    assert numerologia.reducir(22) == 22
+    assert numerologia.reducir(1990) == 1
+
+def test_resumen_con_el_nombre_limpio():
+    resumen = numerologia.resumen({'nombre': 'me llamo laura', 'edad': 'treinta y seis',
+                                   'fecha de nacimiento': 'doce de marzo del noventa'}, hoy=HOY)
+    assert resumen.splitlines()[0] == "Nombre: Laura"
+    assert "me llamo" not in resumen
@@ -0,0 +1,96 @@
+import os
+import pytest
+from utils import paquete
+from utils.paquete import PaqueteRecursos, crear, MARCA
+
+def recursos(base, texto="hola"):
+    """Un directorio de modelo con un archivo, un ejecutable y un enlace"""
+    modelo = base / 'modelo'
+    (modelo / 'conf').mkdir(parents=True)
+    (modelo / 'conf' / 'modelo.conf').write_text(texto)
+    (modelo / 'binario').write_bytes(b'\x7fELF' + bytes(range(256)))
+    (modelo / 'binario').chmod(0o755)
+    os.symlink('conf/modelo.conf', modelo / 'enlace.conf')
+    return base
+
+def test_indice(tmp_path):
+    base = recursos(tmp_path / 'origen')
+    crear(str(tmp_path / 'r.ovpak'), ['modelo'], base=str(base))
+    abierto = PaqueteRecursos(str(tmp_path / 'r.ovpak'), cache=str(tmp_path / 'cache'))
+    try:
+        entradas = {entrada['ruta']: entrada for entrada in abierto.entradas}
+        assert set(entradas) == {'modelo/binario', 'modelo/conf/modelo.conf', 'modelo/enlace.conf'}
+        assert entradas['modelo/conf/modelo.conf']['tamano'] == 4
+        assert entradas['modelo/binario']['modo'] == 0o755
+        assert entradas['modelo/enlace.conf']['enlace'] == 'conf/modelo.conf'
+        assert abierto.cache == str(tmp_path / 'cache' / abierto.hash)
+    finally:
+        abierto.cerrar()
+
+def test_extraccion(tmp_path):
+    base = recursos(tmp_path / 'origen')
+    crear(str(tmp_path / 'r.ovpak'), ['modelo'], base=str(base))
+    abierto = PaqueteRecursos(str(tmp_path / 'r.ovpak'), cache=str(tmp_path / 'cache'))
+    try:
+        destino = abierto.directorio('modelo')
+        assert open(os.path.join(destino, 'conf', 'modelo.conf')).read() == "hola"
+        with open(os.path.join(destino, 'binario'), 'rb') as f:
+            assert f.read() == (base / 'modelo' / 'binario').read_bytes()
+        assert os.access(os.path.join(destino, 'binario'), os.X_OK)
+        assert os.readlink(os.path.join(destino, 'enlace.conf')) == 'conf/modelo.conf'
+        # la segunda vez ya está en la caché y no se vuelve a extraer
+        os.remove(os.path.join(destino, 'binario'))
+        assert abierto.directorio('modelo') == destino
+        assert not os.path.exists(os.path.join(destino, 'binario'))
+        with pytest.raises(KeyError):
+            abierto.directorio('piper')
+    finally:
+        abierto.cerrar()
+
+def test_archivo_danado(tmp_path):
+    base = recursos(tmp_path / 'origen')
+    ruta = tmp_path / 'r.ovpak'
+    crear(str(ruta), ['modelo'], base=str(base))
+    contenido = bytearray(ruta.read_bytes())
+    contenido[-1] ^= 0xff
+    ruta.write_bytes(bytes(contenido))
+    abierto = PaqueteRecursos(str(ruta), cache=str(tmp_path / 'cache'))
+    try:
+        with pytest.raises(ValueError, match="dañado"):
+            abierto.directorio('modelo')
+        assert not os.path.exists(os.path.join(abierto.cache, 'modelo'))
+    finally:
+        abierto.cerrar()
+
+def test_no_es_un_paquete(tmp_path):
+    ruta = tmp_path / 'r.ovpak'
+    ruta.write_bytes(b'\0' * 64)
+    with pytest.raises(ValueError):
+        PaqueteRecursos(str(ruta), cache=str(tmp_path / 'cache'))
+
+@pytest.mark.skipif(paquete.fcntl is None, reason="sin flock no se limpia nada")
+def test_limpia_solo_las_caches_viejas_sin_uso(tmp_path):
+    cache = str(tmp_path / 'cache')
+    for n in (1, 2, 3):
+        base = recursos(tmp_path / f'origen{n}', texto=f"versión {n}")
+        crear(str(tmp_path / f'r{n}.ovpak'), ['modelo'], base=str(base))
+    v1 = PaqueteRecursos(str(tmp_path / 'r1.ovpak'), cache=cache)
+    v1.directorio('modelo')
+    v1.cerrar()
+    # otra instancia sigue con el paquete 2 abierto
+    v2 = PaqueteRecursos(str(tmp_path / 'r2.ovpak'), cache=cache)
+    v2.directorio('modelo')
+    ajeno = tmp_path / 'cache' / 'del-usuario'
+    ajeno.mkdir()
+    (ajeno / 'notas.txt').write_text("no es mío")
+
+    v3 = PaqueteRecursos(str(tmp_path / 'r3.ovpak'), cache=cache)
+    try:
+        v3.directorio('modelo')
+        assert not os.path.exists(v1.cache)
+        assert os.path.isfile(os.path.join(v2.cache, MARCA))
+        assert os.path.isdir(os.path.join(v2.cache, 'modelo'))
+        assert (ajeno / 'notas.txt').exists()
+    finally:
+        v2.cerrar()
+        v3.cerrar()
@@ -0,0 +1,36 @@
+from datetime import date
+from pipeline.perfiles import AlmacenPerfiles, clave_fonetica
+
+def almacen(*visitantes):
+    perfiles = AlmacenPerfiles(':memory:')
+    for nombre, fecha in visitantes:
+        assert perfiles.guardar({'nombre': nombre, 'fecha de nacimiento': fecha})
+    return perfiles
+
+def test_misma_clave_fonetica():
+    assert clave_fonetica('Yésica') == clave_fonetica('Jessica')
+    assert clave_fonetica('Sara') == clave_fonetica('Zara')
+
+def test_encuentra_el_nombre_exacto():
+    perfil = almacen(('Laura', 'doce de marzo de mil novecientos noventa')).buscar('me llamo Laura')
+    assert perfil.nombre == 'Laura'
+    assert perfil.nacimiento == date(1990, 3, 12)
+
+def test_encuentra_un_nombre_mal_reconocido():
+    perfiles = almacen(('Laura', 'doce de marzo de mil novecientos noventa'))
+    assert perfiles.buscar('Lora').nombre == 'Laura'
+
+def test_fallo_en_la_primera_letra():
+    perfiles = almacen(('Jeremías', 'uno de enero de dos mil'))
+    # las claves (yeremias / jeremias) no empiezan igual
+    assert perfiles.buscar('Geremías').nombre == 'Jeremías'
+
+def test_nombre_distinto_no_se_confunde():
+    perfiles = almacen(('Laura', 'doce de marzo de mil novecientos noventa'))
+    assert perfiles.buscar('Roberto') is None
+
+def test_con_fecha_solo_el_perfil_de_esa_fecha():
+    perfiles = almacen(('Laura', 'doce de marzo de mil novecientos noventa'),
+                       ('Laura', 'uno de enero de dos mil'))
+    assert perfiles.buscar('Lora', date(2000, 1, 1)).nacimiento == date(2000, 1, 1)
+    assert perfiles.buscar('Laura', date(1985, 5, 5)) is None
@@ -0,0 +1,85 @@
+import os
+import json
+import pytest
+from pipeline.plan import compilar, cargar, CargadorPlan, ErrorConfiguracion, Plantilla
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def config(**cambios):
+    base = {
+        'bienvenida': "Hola",
+        'preguntas_secuencia': [
+            {'pregunta': "¿Cómo te llamas?", 'variable': 'nombre', 'validador': 'nombre'},
+            {'pregunta': "¿Cuándo naciste?", 'variable': 'fecha de nacimiento', 'validador': 'fecha'},
+        ],
+        'pregunta_tema': "¿Amor o dinero?",
+        'temas': {'amor': ['amor'], 'dinero': ['dinero']},
+        'instrucciones_llm': "Lee la suerte en {tema_elegido} a fecha {fecha_actual}.",
+    }
+    base.update(cambios)
+    return base
+
+def test_compila_la_configuracion_del_repositorio():
+    plan = cargar(os.path.join(RAIZ, 'config_secuencia.json'))
+    tipos = [paso.tipo for paso in plan.pasos]
+    assert tipos[0] == 'decir' and tipos[-2:] == ['tema', 'lectura']
+
+def test_pasos_y_validadores():
+    plan = compilar(config(estabilidad_parcial={'fecha': 5}))
+    assert [paso.tipo for paso in plan.pasos] == ['decir', 'preguntar', 'preguntar', 'tema', 'lectura']
+    fecha = plan.pasos[2]
+    assert fecha.variable == 'fecha de nacimiento'
+    assert fecha.validador.tipo == 'fecha' and fecha.validador.estabilidad == 5
+    assert plan.validador_confirmacion.estabilidad == 5
+    assert plan.max_tokens == 1000
+
+def test_el_plan_es_inmutable():
+    plan = compilar(config(kiosko={'palabras_activacion': ['oráculo']}))
+    assert plan.kiosko['palabras_activacion'] == ('oráculo',)
+    with pytest.raises(TypeError):
+        plan.kiosko['activacion'] = 'voz'
+
+def test_textos_fijos_sin_repetidos():
+    plan = compilar(config(mensaje_no_entendido="Hola"))
+    assert plan.textos_fijos() == ("Hola", "¿Cómo te llamas?", "¿Cuándo naciste?", "¿Amor o dinero?")
+
+def test_junta_todos_los_errores():
+    preguntas = [
+        {'pregunta': "¿Nombre?", 'variable': 'nombre', 'validador': 'color'},
+        {'pregunta': "¿Otra vez?", 'variable': 'nombre'},
+    ]
+    with pytest.raises(ErrorConfiguracion) as error:
+        compilar(config(preguntas_secuencia=preguntas, bienvenida="",
+                        instrucciones_llm="Hola {visitante}", max_tokens_lectura=0))
+    mensaje = str(error.value)
+    for fallo in ("'bienvenida'", "validador 'color'", "'nombre' está repetida",
+                  "campos desconocidos: visitante", "'max_tokens_lectura'"):
+        assert fallo in mensaje
+
+def test_pregunta_de_confirmacion_con_campos_desconocidos():
+    with pytest.raises(ErrorConfiguracion, match="perfiles.pregunta"):
+        compilar(config(perfiles={'pregunta': "¿Eres {apellido}?"}))
+
+def test_plantilla():
+    plantilla = Plantilla("Hola {nombre}, hoy es {fecha}.")
+    assert plantilla.campos == {'nombre', 'fecha'}
+    assert plantilla.render(nombre="Laura", fecha="lunes") == "Hola Laura, hoy es lunes."
+
+def test_recarga_mantiene_el_plan_si_el_nuevo_no_vale(tmp_path):
+    ruta = tmp_path / 'config.json'
+    ruta.write_text(json.dumps(config()), encoding='utf-8')
+    cargador = CargadorPlan(str(ruta))
+    plan = cargador.cargar()
+    assert plan is not None
+
+    ruta.write_text(json.dumps(config(bienvenida="")), encoding='utf-8')
+    os.utime(ruta, ns=(cargador.mtime + 10**9, cargador.mtime + 10**9))
+    assert cargador.actualizar() is plan
+
+    cambios = []
+    cargador.al_cambiar.append(lambda viejo, nuevo: cambios.append((viejo, nuevo)))
+    ruta.write_text(json.dumps(config(bienvenida="Buenas")), encoding='utf-8')
+    os.utime(ruta, ns=(cargador.mtime + 10**9, cargador.mtime + 10**9))
+    nuevo = cargador.actualizar()
+    assert nuevo.pasos[0].texto == "Buenas"
+    assert cambios == [(plan, nuevo)]
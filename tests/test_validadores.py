@@ -0,0 +1,80 @@
+import pytest
+from pipeline.validadores import Validador, SeguidorParcial
+from utils.texto import Coincidencias
+
+@pytest.mark.parametrize("texto, valido", [
+    ("treinta y dos", True),
+    ("veinte", True),
+    ("treinta y", False),
+    ("ciento", False),
+    ("doscientos", False),
+    ("ciento veinte", False),     # más que ANIOS_MAXIMOS
+    ("no sé", False),
+])
+def test_validar_numero(texto, valido):
+    assert (Validador('numero').validar(texto) is not None) == valido
+
+@pytest.mark.parametrize("texto, valido", [
+    ("doce de marzo de mil novecientos noventa y dos", True),
+    ("12 de marzo de 1992", True),
+    ("doce de marzo de mil novecientos", False),
+    ("doce de marzo de mil novecientos noventa y", False),
+    ("doce de marzo de", False),
+    ("doce de marzo", False),                           # sin año
+    ("doce de marzo de mil ochocientos noventa y dos", False),
+    ("doce de marzo de tres mil", False),
+])
+def test_validar_fecha(texto, valido):
+    assert (Validador('fecha').validar(texto) is not None) == valido
+
+def test_decena_abierta_solo_cuando_es_estable():
+    fecha = Validador('fecha')
+    texto = "doce de marzo de mil novecientos noventa"
+    assert fecha.validar(texto) is None
+    assert fecha.validar(texto, estable=True) == texto
+    assert Validador('numero').validar("treinta", estable=True) == "treinta"
+
+def test_validar_nombre():
+    nombre = Validador('nombre')
+    assert nombre.validar("me llamo Laura") == "me llamo Laura"
+    assert nombre.validar("me llamo") is None
+
+def test_validar_tema():
+    tema = Validador('tema', temas={'amor': ['amor', 'pareja'], 'dinero': ['dinero']})
+    assert tema.validar("quiero saber de mi pareja") == 'amor'
+    assert tema.validar("no sé") is None
+
+def test_seguidor_espera_a_la_estabilidad():
+    seguidor = SeguidorParcial(Validador('numero', estabilidad=2))
+    assert seguidor.observar("treinta", 1.0) is None
+    assert seguidor.observar("treinta y dos", 1.1) is None
+    assert seguidor.observar("treinta y dos", 1.2) == "treinta y dos"
+    assert seguidor.desde == 1.1
+
+def test_seguidor_acepta_la_decena_estable():
+    seguidor = SeguidorParcial(Validador('fecha', estabilidad=3))
+    texto = "doce de marzo de mil novecientos noventa"
+    assert [seguidor.observar(texto, t) for t in (1.0, 1.1, 1.2)] == [None, None, texto]
+
+def test_seguidor_no_acepta_un_parcial_invalido():
+    seguidor = SeguidorParcial(Validador('fecha', estabilidad=1))
+    assert seguidor.observar("doce de marzo de mil", 1.0) is None
+
+@pytest.mark.parametrize("texto, grupo", [
+    ("Quiero saber del AMOR", 'amor'),
+    ("algo amoroso", 'amor'),             # por inicio de palabra
+    ("la salud y el amor", 'salud'),      # la primera que aparece
+    ("el dinero", 'dinero'),
+    ("mi camión", 'trabajo'),             # sin tildes en las palabras clave
+    ("clamor", None),                     # no a mitad de palabra
+    ("", None),
+])
+def test_coincidencias(texto, grupo):
+    coincidencias = Coincidencias({'amor': ['amor'], 'dinero': ['dinero', 'plata'],
+                                   'salud': ['salud'], 'trabajo': ['camion']})
+    assert coincidencias.buscar(texto) == grupo
+
+def test_coincidencias_sin_palabras():
+    assert Coincidencias({}).buscar("oráculo") is None
+    assert Coincidencias({'activacion': []}).buscar("oráculo") is None
+    assert Coincidencias({'activacion': ['Oráculo']}).buscar("hola oraculo") == 'activacion'
@@ -0,0 +1,175 @@
+"""
+Atlas empaquetado: cuadros recortados y un índice binario que se mapea.
+
+El editor (`utils/sprite_arcade.py`) exporta el atlas marcado a mano como
+una imagen nueva con solo los cuadros, sin los bordes transparentes y
+colocados por estantes, más un índice binario pequeño. El renderizador lo
+abre con mmap y lee los rects sin parsear JSON.
+
+Índice (little endian):
+    cabecera  magia, ancho y alto del atlas, nº de capas, nº de cuadros
+    capas     nombre, primer cuadro, cuántos, offset x/y de la capa
+    cuadros   x, y, w, h en el atlas empaquetado y dx, dy: dónde cae el
+              cuadro recortado dentro de su rect original
+
+La base no se recorta: es el lienzo sobre el que se componen las demás capas.
+"""
+import os
+import mmap
+import time
+import json
+import struct
+
+MAGIA = b'OVATL1\0\0'
+_CABECERA = struct.Struct('<8sHHHH')
+_CAPA = struct.Struct('<8sHHhh')
+_CUADRO = struct.Struct('<HHHHhh')
+CAPAS = ("base", "hands", "eyes", "mouths", "glow")
+
+class IndiceAtlas:
+    """Índice de un atlas empaquetado, leído directamente del archivo mapeado"""
+    def __init__(self, ruta):
+        with open(ruta, 'rb') as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, self.ancho, self.alto, n_capas, n_cuadros = _CABECERA.unpack_from(self.mapa, 0)
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es un índice de atlas")
+        self.capas = {}
+        pos = _CABECERA.size
+        for nombre, primero, cuantos, ox, oy in _CAPA.iter_unpack(
+                self.mapa[pos:pos + n_capas * _CAPA.size]):
+            self.capas[nombre.rstrip(b'\0').decode('ascii')] = (primero, cuantos, ox, oy)
+        self.inicio_cuadros = pos + n_capas * _CAPA.size
+        self.n_cuadros = n_cuadros
+
+    def cuadros(self, capa):
+        """[(x, y, w, h, dx, dy), ...] de una capa"""
+        if capa not in self.capas:
+            return []
+        primero, cuantos, _, _ = self.capas[capa]
+        pos = self.inicio_cuadros + primero * _CUADRO.size
+        return list(_CUADRO.iter_unpack(self.mapa[pos:pos + cuantos * _CUADRO.size]))
+
+    def como_config(self):
+        """El mismo dict que el JSON del editor, más el desplazamiento de cada cuadro"""
+        config = {"offsets": {}, "trims": {}}
+        for capa, (_, _, ox, oy) in self.capas.items():
+            cuadros = self.cuadros(capa)
+            config[capa] = [list(c[:4]) for c in cuadros]
+            config["trims"][capa] = [list(c[4:]) for c in cuadros]
+            if capa != "base":
+                config["offsets"][capa] = [ox, oy]
+        return config
+
+    def cerrar(self):
+        self.mapa.close()
+
+def escribir_indice(ruta, ancho, alto, capas, offsets):
+    """`capas`: {nombre: [(x, y, w, h, dx, dy), ...]} en el orden de CAPAS"""
+    cabecera_capas = []
+    cuadros = []
+    for nombre in CAPAS:
+        lista = capas.get(nombre, [])
+        ox, oy = offsets.get(nombre, (0, 0))
+        cabecera_capas.append(_CAPA.pack(nombre.encode('ascii'), len(cuadros), len(lista), ox, oy))
+        cuadros.extend(_CUADRO.pack(*c) for c in lista)
+    with open(ruta, 'wb') as f:
+        f.write(_CABECERA.pack(MAGIA, ancho, alto, len(CAPAS), len(cuadros)))
+        f.write(b''.join(cabecera_capas))
+        f.write(b''.join(cuadros))
+
+# --- empaquetado (necesita Pillow, que viene con arcade) ---
+def recortar(imagen, rect, recortar_bordes=True):
+    """Recortar un rect del atlas y quitarle los bordes transparentes: (imagen, dx, dy)"""
+    x, y, w, h = rect
+    cuadro = imagen.crop((x, y, x + w, y + h))
+    caja = cuadro.getchannel('A').getbbox() if recortar_bordes else None
+    if recortar_bordes and caja is None:
+        caja = (0, 0, 1, 1)     # cuadro vacío: se queda en un píxel
+    if caja:
+        cuadro = cuadro.crop(caja)
+        return cuadro, caja[0], caja[1]
+    return cuadro, 0, 0
+
+def empaquetar(imagen, capas, margen=1):
+    """Recortar y recolocar los cuadros de todas las capas en un atlas nuevo.
+
+    `capas` son los rects del editor ya en coordenadas de imagen (origen
+    arriba a la izquierda). Los cuadros idénticos se guardan una sola vez.
+    Devuelve (imagen empaquetada, {capa: [(x, y, w, h, dx, dy), ...]}).
+    """
+    from PIL import Image
+    imagen = imagen.convert('RGBA')
+    unicos = {}         # píxeles -> índice en `piezas`
+    piezas = []         # (imagen recortada)
+    referencias = {}    # capa -> [(índice de pieza, dx, dy), ...]
+    for capa in CAPAS:
+        referencias[capa] = []
+        for rect in capas.get(capa, []):
+            cuadro, dx, dy = recortar(imagen, rect, recortar_bordes=capa != "base")
+            clave = (cuadro.size, cuadro.tobytes())
+            if clave not in unicos:
+                unicos[clave] = len(piezas)
+                piezas.append(cuadro)
+            referencias[capa].append((unicos[clave], dx, dy))
+
+    # Estantes: de más alta a más baja, llenando filas de un ancho fijo
+    area = sum((p.width + margen) * (p.height + margen) for p in piezas)
+    ancho = max([int(area ** 0.5 * 1.1)] + [p.width + margen for p in piezas])
+    posiciones = [None] * len(piezas)
+    x = y = alto_fila = 0
+    for i in sorted(range(len(piezas)), key=lambda i: -piezas[i].height):
+        pieza = piezas[i]
+        if x + pieza.width > ancho:
+            x, y, alto_fila = 0, y + alto_fila + margen, 0
+        posiciones[i] = (x, y)
+        x += pieza.width + margen
+        alto_fila = max(alto_fila, pieza.height)
+    alto = y + alto_fila
+
+    empaquetada = Image.new('RGBA', (ancho, max(1, alto)), (0, 0, 0, 0))
+    for pieza, pos in zip(piezas, posiciones):
+        empaquetada.paste(pieza, pos)
+    cuadros = {capa: [(*posiciones[i], piezas[i].width, piezas[i].height, dx, dy)
+                      for i, dx, dy in refs]
+               for capa, refs in referencias.items()}
+    return empaquetada, cuadros
+
+def exportar(ruta_atlas, capas, offsets, ruta_png, ruta_indice, ruta_config=None):
+    """Empaquetar el atlas, escribir imagen e índice e informar de tamaño y carga"""
+    from PIL import Image
+    with Image.open(ruta_atlas) as imagen:
+        empaquetada, cuadros = empaquetar(imagen, capas)
+    empaquetada.save(ruta_png, optimize=True)
+    escribir_indice(ruta_indice, empaquetada.width, empaquetada.height, cuadros, offsets)
+
+    antes = os.path.getsize(ruta_atlas) + (os.path.getsize(ruta_config) if ruta_config else 0)
+    despues = os.path.getsize(ruta_png) + os.path.getsize(ruta_indice)
+    print(f"Atlas empaquetado en: {ruta_png} + {ruta_indice}")
+    print(f"  bytes: {antes} -> {despues} ({despues / antes:.0%})")
+    print(f"  píxeles: {imagen.width}x{imagen.height} -> "
+          f"{empaquetada.width}x{empaquetada.height}")
+    if ruta_config:
+        print(f"  carga: {medir_carga(ruta_atlas, ruta_config) * 1000:.1f} ms -> "
+              f"{medir_carga(ruta_png, ruta_indice) * 1000:.1f} ms")
+
+def medir_carga(ruta_atlas, ruta_indice, repeticiones=5):
+    """Segundos (mediana) en abrir el atlas, leer sus rects y recortar cada cuadro"""
+    from PIL import Image
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        if str(ruta_indice).endswith('.json'):
+            with open(ruta_indice, encoding='utf-8') as f:
+                config = json.load(f)
+        else:
+            indice = IndiceAtlas(ruta_indice)
+            config = indice.como_config()
+            indice.cerrar()
+        with Image.open(ruta_atlas) as imagen:
+            imagen.load()
+            for capa in CAPAS:
+                for x, y, w, h in config.get(capa, []):
+                    imagen.crop((x, y, x + w, y + h)).load()
+        tiempos.append(time.perf_counter() - t0)
+    return sorted(tiempos)[len(tiempos) // 2]
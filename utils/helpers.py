@@ -1,31 +1,30 @@
 import threading
-import time
 
 class AnimacionPensando:
-    def __init__(self):
-        self.pensando_terminado = None
-        self.hilo_pensando = None
+    """Puntos de 'Pensando...' en consola; se suscribe al bus de la interfaz"""
+    def __init__(self, intervalo=0.5):
+        self.intervalo = intervalo
+        self.animado = False
+        self.puntos = 0
+        self.acumulado = 0.0
+        self.lock = threading.Lock()    # para no mezclar la línea con otro print
     
-    def iniciar(self):
-        """Iniciar animación de 'pensando...'"""
-        self.pensando_terminado = threading.Event()
-        self.hilo_pensando = threading.Thread(target=self._mostrar_animacion)
-        self.hilo_pensando.start()
+    def al_cambiar(self, estado, datos):
+        with self.lock:
+            self.animado = estado == 'pensando'
+            self.puntos = 0
+            self.acumulado = self.intervalo
     
-    def detener(self):
-        """Detener animación"""
-        if self.pensando_terminado:
-            self.pensando_terminado.set()
-        if self.hilo_pensando:
-            self.hilo_pensando.join()
-    
-    def _mostrar_animacion(self):
-        """Mostrar animación de puntos"""
-        puntos = 0
-        while not self.pensando_terminado.is_set():
-            print(f"\rPensando{'.' * (puntos % 4):<3}", end='', flush=True)
-            puntos += 1
-            time.sleep(0.5)
+    def tick(self, dt):
+        with self.lock:
+            if not self.animado:
+                return
+            self.acumulado += dt
+            if self.acumulado < self.intervalo:
+                return
+            self.acumulado = 0.0
+            print(f"\rPensando{'.' * (self.puntos % 4):<3}", end='', flush=True)
+            self.puntos += 1
 
 def formatear_mensaje(speaker, mensaje):
     """Formatear mensaje para mostrar en consola"""
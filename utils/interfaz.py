@@ -0,0 +1,93 @@
+"""
+Bus de estado de la interfaz con un único tick de dibujo.
+
+El pipeline publica en qué está el asistente (esperando, escuchando,
+pensando, hablando) y el bus se lo pasa al momento a cada suscriptor. Un
+solo hilo, creado una vez, llama a `tick(dt)` de los suscriptores que
+tienen algo que animar; si ninguno lo necesita se queda dormido hasta el
+siguiente cambio de estado, sin sondear.
+
+Un suscriptor implementa:
+    al_cambiar(estado, datos)   -> se llama desde el hilo que publica
+    animado                     -> ¿necesita ticks en el estado actual?
+    tick(dt)                    -> se llama desde el hilo del bus
+    al_nivel(nivel)             -> opcional: nivel 0..1 del audio que suena
+"""
+import time
+import threading
+
+ESTADOS = ('esperando', 'escuchando', 'pensando', 'hablando')
+
+class BusInterfaz:
+    def __init__(self, fps=10):
+        self.fps = fps
+        self.estado = 'esperando'
+        self.datos = {}
+        self.suscriptores = []
+        self.condicion = threading.Condition()
+        self.activo = False
+        self.hilo = None
+
+    def suscribir(self, suscriptor):
+        with self.condicion:
+            self.suscriptores.append(suscriptor)
+            suscriptor.al_cambiar(self.estado, self.datos)
+            self.condicion.notify()
+
+    def publicar(self, estado, **datos):
+        """Cambiar de estado y avisar a los suscriptores"""
+        with self.condicion:
+            self.estado = estado
+            self.datos = datos
+            suscriptores = list(self.suscriptores)
+        for suscriptor in suscriptores:
+            suscriptor.al_cambiar(estado, datos)
+        with self.condicion:
+            self.condicion.notify()
+
+    def nivel(self, valor):
+        """Pasar el nivel del audio en reproducción a quien lo quiera (sin cambiar de estado)"""
+        for suscriptor in self.suscriptores:
+            al_nivel = getattr(suscriptor, 'al_nivel', None)
+            if al_nivel:
+                al_nivel(valor)
+
+    def iniciar(self):
+        if self.hilo:
+            return
+        self.activo = True
+        self.hilo = threading.Thread(target=self._ejecutar, name="interfaz", daemon=True)
+        self.hilo.start()
+
+    def detener(self):
+        with self.condicion:
+            self.activo = False
+            self.condicion.notify()
+        if self.hilo:
+            self.hilo.join()
+            self.hilo = None
+
+    def _animando(self):
+        return [s for s in self.suscriptores if s.animado]
+
+    def _ejecutar(self):
+        periodo = 1.0 / self.fps
+        anterior = time.monotonic()
+        while True:
+            with self.condicion:
+                while self.activo and not self._animando():
+                    self.condicion.wait()
+                    anterior = time.monotonic()
+                if not self.activo:
+                    return
+                animados = self._animando()
+
+            ahora = time.monotonic()
+            for suscriptor in animados:
+                suscriptor.tick(ahora - anterior)
+            anterior = ahora
+
+            # Esperar al siguiente tick; un cambio de estado no adelanta el dibujo
+            espera = periodo - (time.monotonic() - ahora)
+            if espera > 0:
+                time.sleep(espera)
@@ -0,0 +1,204 @@
+"""
+Latencia por turno: marcas de tiempo de cada etapa, log JSONL rotativo y
+endpoint local en formato de texto de Prometheus.
+
+Un turno va desde que el visitante termina de hablar hasta que acaba de
+sonar la respuesta del asistente. Las marcas se pueden poner desde
+cualquier hilo; con las métricas desactivadas `marcar` no hace nada más
+que comprobar un booleano, así que se pueden activar y desactivar en
+caliente.
+"""
+import os
+import json
+import time
+import threading
+
+# Intervalos que se calculan al cerrar cada turno: nombre -> (desde, hasta)
+INTERVALOS = {
+    'reconocimiento': ('fin_habla', 'vosk_final'),
+    'llm_primer_token': ('llm_enviado', 'primer_token'),
+    'llm_total': ('llm_enviado', 'ultimo_token'),
+    'sintesis': ('sintesis_inicio', 'sintesis_fin'),
+    'respuesta': ('fin_habla', 'primera_muestra'),
+    'turno': ('fin_habla', 'fin_reproduccion'),
+}
+
+LIMITES = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0)
+
+class Histograma:
+    def __init__(self, limites=LIMITES):
+        self.limites = limites
+        self.cuentas = [0] * len(limites)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cuentas[i] += 1
+                break
+        self.suma += valor
+        self.total += 1
+
+    def exportar(self, nombre, etiquetas):
+        """Líneas de texto de Prometheus (los buckets son acumulativos)"""
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            lineas.append(f'{nombre}_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+        lineas.append(f'{nombre}_bucket{{{etiquetas},le="+Inf"}} {self.total}')
+        lineas.append(f'{nombre}_sum{{{etiquetas}}} {self.suma:.6f}')
+        lineas.append(f'{nombre}_count{{{etiquetas}}} {self.total}')
+        return lineas
+
+class Metricas:
+    def __init__(self):
+        self.activo = False
+        self.turno = None
+        self.lock = threading.Lock()
+        self.histogramas = {nombre: Histograma() for nombre in INTERVALOS}
+        self.turnos_cerrados = 0
+        self.eventos = {}       # contadores de sucesos sueltos (p. ej. cómo acabó cada lectura)
+        self.logger = None
+        self.servidor = None
+
+    def configurar(self, ruta_jsonl=None, puerto=None, max_bytes=1_000_000, copias=3):
+        """Preparar el log JSONL y el endpoint de Prometheus (ambos opcionales)"""
+        # logging y http.server solo se importan si se usan (arranque)
+        if ruta_jsonl and not self.logger:
+            import logging
+            from logging.handlers import RotatingFileHandler
+            os.makedirs(os.path.dirname(os.path.abspath(ruta_jsonl)), exist_ok=True)
+            handler = RotatingFileHandler(ruta_jsonl, maxBytes=max_bytes,
+                                          backupCount=copias, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self.logger = logging.getLogger('oracle_voice.turnos')
+            self.logger.propagate = False
+            self.logger.setLevel(logging.INFO)
+            self.logger.addHandler(handler)
+
+        if puerto and not self.servidor:
+            from http.server import ThreadingHTTPServer
+            self.servidor = ThreadingHTTPServer(('127.0.0.1', puerto), _manejador(self))
+            threading.Thread(target=self.servidor.serve_forever, name="metricas",
+                             daemon=True).start()
+            print(f"📈 Métricas en http://127.0.0.1:{puerto}/metrics")
+
+    def activar(self):
+        self.activo = True
+
+    def desactivar(self):
+        self.activo = False
+        self.turno = None
+
+    def alternar(self, *_):
+        """Cambiar de estado (se usa como manejador de SIGUSR1)"""
+        if self.activo:
+            self.desactivar()
+        else:
+            self.activar()
+        print(f"\n📈 Métricas {'activadas' if self.activo else 'desactivadas'}")
+
+    # --- marcas ---
+    def abrir_turno(self, etiqueta, **marcas):
+        """Empezar un turno nuevo con las marcas que ya se conocen"""
+        if not self.activo:
+            return
+        self.turno = {'etiqueta': etiqueta, 'fecha': time.time(), 'marcas': dict(marcas)}
+
+    def marcar(self, etapa, instante=None):
+        """Poner una marca de tiempo (monotonic) en el turno abierto"""
+        turno = self.turno
+        if turno is None:
+            return
+        turno['marcas'].setdefault(etapa, instante if instante is not None else time.monotonic())
+
+    def en_turno(self, instante):
+        """¿`instante` es posterior al comienzo del turno abierto?"""
+        turno = self.turno
+        if turno is None or not turno['marcas']:
+            return False
+        return instante >= min(turno['marcas'].values())
+
+    def anotar(self, clave, valor):
+        """Guardar un dato del turno abierto que no es una marca de tiempo"""
+        turno = self.turno
+        if turno is not None:
+            turno.setdefault('datos', {})[clave] = valor
+
+    def contar(self, evento):
+        """Sumar uno a un contador; se cuenta aunque las métricas estén desactivadas"""
+        with self.lock:
+            self.eventos[evento] = self.eventos.get(evento, 0) + 1
+
+    def cerrar_turno(self):
+        """Calcular los intervalos del turno, registrarlos y exportarlos"""
+        turno, self.turno = self.turno, None
+        if turno is None or not self.activo:
+            return None
+
+        marcas = turno['marcas']
+        intervalos = {}
+        for nombre, (desde, hasta) in INTERVALOS.items():
+            if desde in marcas and hasta in marcas:
+                intervalos[nombre] = marcas[hasta] - marcas[desde]
+
+        with self.lock:
+            for nombre, segundos in intervalos.items():
+                if segundos >= 0:
+                    self.histogramas[nombre].observar(segundos)
+            self.turnos_cerrados += 1
+
+        if self.logger:
+            origen = marcas.get('fin_habla', min(marcas.values(), default=0))
+            registro = {
+                'fecha': turno['fecha'],
+                'turno': turno['etiqueta'],
+                'marcas_ms': {k: round((v - origen) * 1000, 1) for k, v in marcas.items()},
+                'intervalos_ms': {k: round(v * 1000, 1) for k, v in intervalos.items()},
+            }
+            if 'datos' in turno:
+                registro['datos'] = turno['datos']
+            self.logger.info(json.dumps(registro, ensure_ascii=False))
+        return intervalos
+
+    def exportar(self):
+        """Todas las métricas en formato de texto de Prometheus"""
+        nombre = 'oracle_voice_turno_segundos'
+        lineas = [f'# HELP {nombre} Latencia por etapa de cada turno de conversación',
+                  f'# TYPE {nombre} histogram']
+        with self.lock:
+            for etapa, histograma in self.histogramas.items():
+                lineas.extend(histograma.exportar(nombre, f'etapa="{etapa}"'))
+            lineas.append('# TYPE oracle_voice_turnos_total counter')
+            lineas.append(f'oracle_voice_turnos_total {self.turnos_cerrados}')
+            lineas.append('# TYPE oracle_voice_eventos_total counter')
+            for evento, cuenta in sorted(self.eventos.items()):
+                lineas.append(f'oracle_voice_eventos_total{{evento="{evento}"}} {cuenta}')
+        lineas.append('# TYPE oracle_voice_metricas_activas gauge')
+        lineas.append(f'oracle_voice_metricas_activas {int(self.activo)}')
+        return '\n'.join(lineas) + '\n'
+
+def _manejador(metricas):
+    from http.server import BaseHTTPRequestHandler
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip('/') != '/metrics':
+                self.send_error(404)
+                return
+            cuerpo = metricas.exportar().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    return Manejador
+
+# Instancia compartida por todos los componentes
+metricas = Metricas()
@@ -0,0 +1,235 @@
+"""
+Cálculos numerológicos locales a partir de las respuestas habladas.
+
+Vosk entrega los números y las fechas escritos con palabras ("quince de
+marzo de mil novecientos noventa"), así que primero se interpretan y luego
+se calculan los números de forma determinista. Al LLM solo le llega el
+resumen compacto, en lugar de pedirle que simule los cálculos.
+"""
+import re
+from datetime import date
+from utils.texto import normalizar, nombre_limpio
+
+UNIDADES = {
+    'cero': 0, 'un': 1, 'uno': 1, 'una': 1, 'primero': 1, 'dos': 2, 'tres': 3,
+    'cuatro': 4, 'cinco': 5, 'seis': 6, 'siete': 7, 'ocho': 8, 'nueve': 9,
+    'diez': 10, 'once': 11, 'doce': 12, 'trece': 13, 'catorce': 14,
+    'quince': 15, 'dieciseis': 16, 'diecisiete': 17, 'dieciocho': 18,
+    'diecinueve': 19, 'veinte': 20, 'veintiun': 21, 'veintiuno': 21,
+    'veintiuna': 21, 'veintidos': 22, 'veintitres': 23, 'veinticuatro': 24,
+    'veinticinco': 25, 'veintiseis': 26, 'veintisiete': 27, 'veintiocho': 28,
+    'veintinueve': 29,
+}
+
+DECENAS = {
+    'treinta': 30, 'cuarenta': 40, 'cincuenta': 50, 'sesenta': 60,
+    'setenta': 70, 'ochenta': 80, 'noventa': 90,
+}
+
+CENTENAS = {
+    'cien': 100, 'ciento': 100, 'doscientos': 200, 'trescientos': 300,
+    'cuatrocientos': 400, 'quinientos': 500, 'seiscientos': 600,
+    'setecientos': 700, 'ochocientos': 800, 'novecientos': 900,
+}
+
+MESES = {
+    'enero': 1, 'febrero': 2, 'marzo': 3, 'abril': 4, 'mayo': 5, 'junio': 6,
+    'julio': 7, 'agosto': 8, 'septiembre': 9, 'setiembre': 9, 'octubre': 10,
+    'noviembre': 11, 'diciembre': 12,
+}
+
+# (mes, día en que empieza el signo), en orden del año
+SIGNOS = [
+    (1, 20, 'Acuario'), (2, 19, 'Piscis'), (3, 21, 'Aries'), (4, 20, 'Tauro'),
+    (5, 21, 'Géminis'), (6, 21, 'Cáncer'), (7, 23, 'Leo'), (8, 23, 'Virgo'),
+    (9, 23, 'Libra'), (10, 23, 'Escorpio'), (11, 22, 'Sagitario'),
+    (12, 22, 'Capricornio'),
+]
+
+NUMEROS_MAESTROS = (11, 22, 33)
+
+def _tokenizar(texto):
+    """Separar el texto normalizado en palabras y cifras"""
+    return re.findall(r'[a-zñ]+|\d+', normalizar(texto))
+
+def _es_palabra_numero(token):
+    return (token.isdigit() or token in UNIDADES or token in DECENAS
+            or token in CENTENAS or token == 'mil')
+
+def _leer_numero(tokens, i):
+    """Leer un número que empieza en tokens[i]; devuelve (valor, índice siguiente)"""
+    if tokens[i].isdigit():
+        return int(tokens[i]), i + 1
+
+    total = 0     # miles ya cerrados
+    actual = 0    # parte menor que mil
+    inicio = i
+    while i < len(tokens):
+        token = tokens[i]
+        if token in CENTENAS:
+            if actual % 1000 >= 100:
+                break
+            actual += CENTENAS[token]
+        elif token in DECENAS:
+            if actual % 100:
+                break
+            actual += DECENAS[token]
+            # "treinta y uno"
+            if (i + 2 < len(tokens) and tokens[i + 1] == 'y'
+                    and tokens[i + 2] in UNIDADES
+                    and UNIDADES[tokens[i + 2]] < 10):
+                actual += UNIDADES[tokens[i + 2]]
+                i += 2
+        elif token in UNIDADES:
+            if actual % 100:
+                break
+            actual += UNIDADES[token]
+        elif token == 'mil':
+            total += (actual or 1) * 1000
+            actual = 0
+        else:
+            break
+        i += 1
+
+    if i == inicio:
+        return None, i
+    return total + actual, i
+
+def extraer_numeros(texto):
+    """Devolver todos los números que aparecen en una respuesta hablada"""
+    tokens = _tokenizar(texto)
+    numeros = []
+    i = 0
+    while i < len(tokens):
+        if _es_palabra_numero(tokens[i]):
+            valor, i = _leer_numero(tokens, i)
+            if valor is not None:
+                numeros.append(valor)
+                continue
+        i += 1
+    return numeros
+
+def parsear_numero(texto):
+    """Primer número de una respuesta ("tengo treinta y dos años" -> 32)"""
+    numeros = extraer_numeros(texto)
+    return numeros[0] if numeros else None
+
+def _completar_anio(anio, hoy):
+    """Interpretar años dichos con dos cifras ("del noventa")"""
+    if anio >= 100:
+        return anio
+    return 2000 + anio if 2000 + anio <= hoy.year else 1900 + anio
+
+def parsear_fecha(texto, hoy=None, edad=None):
+    """Interpretar una fecha de nacimiento hablada; devuelve date o None"""
+    hoy = hoy or date.today()
+    tokens = _tokenizar(texto)
+
+    mes = None
+    pos_mes = None
+    for i, token in enumerate(tokens):
+        if token in MESES:
+            mes, pos_mes = MESES[token], i
+            break
+
+    if mes is not None:
+        antes = extraer_numeros(' '.join(tokens[:pos_mes]))
+        despues = extraer_numeros(' '.join(tokens[pos_mes + 1:]))
+        dia = antes[-1] if antes else None
+        anio = despues[0] if despues else None
+    else:
+        numeros = extraer_numeros(texto)
+        if len(numeros) < 2:
+            return None
+        dia, mes = numeros[0], numeros[1]
+        anio = numeros[2] if len(numeros) > 2 else None
+
+    if dia is None:
+        return None
+
+    if anio is None:
+        # Sin año: deducirlo de la edad si la conocemos
+        if edad is None:
+            return None
+        anio = hoy.year - edad
+        if (mes, dia) > (hoy.month, hoy.day):
+            anio -= 1
+    else:
+        anio = _completar_anio(anio, hoy)
+
+    try:
+        return date(anio, mes, dia)
+    except ValueError:
+        return None
+
+def reducir(numero):
+    """Sumar dígitos hasta quedar en una cifra, respetando números maestros"""
+    while numero > 9 and numero not in NUMEROS_MAESTROS:
+        numero = sum(int(d) for d in str(numero))
+    return numero
+
+def camino_de_vida(nacimiento):
+    return reducir(reducir(nacimiento.day) + reducir(nacimiento.month)
+                   + reducir(nacimiento.year))
+
+def anio_personal(nacimiento, hoy):
+    return reducir(reducir(nacimiento.day) + reducir(nacimiento.month)
+                   + reducir(hoy.year))
+
+def dia_personal(nacimiento, hoy):
+    return reducir(anio_personal(nacimiento, hoy) + reducir(hoy.month)
+                   + reducir(hoy.day))
+
+def dia_universal(hoy):
+    return reducir(sum(int(d) for d in hoy.strftime('%d%m%Y')))
+
+def signo_zodiacal(nacimiento):
+    signo = 'Capricornio'
+    for mes, dia, nombre in SIGNOS:
+        if (nacimiento.month, nacimiento.day) >= (mes, dia):
+            signo = nombre
+    return signo
+
+def calcular(datos_usuario, hoy=None):
+    """Calcular los números a partir de las respuestas recogidas en el diálogo"""
+    hoy = hoy or date.today()
+    edad = parsear_numero(datos_usuario.get('edad', ''))
+    nacimiento = parsear_fecha(datos_usuario.get('fecha de nacimiento', ''),
+                               hoy=hoy, edad=edad)
+
+    resultado = {'edad': edad, 'dia_universal': dia_universal(hoy)}
+    if nacimiento:
+        resultado.update({
+            'nacimiento': nacimiento,
+            'camino_de_vida': camino_de_vida(nacimiento),
+            'numero_dia': reducir(nacimiento.day),
+            'anio_personal': anio_personal(nacimiento, hoy),
+            'dia_personal': dia_personal(nacimiento, hoy),
+            'signo': signo_zodiacal(nacimiento),
+        })
+    return resultado
+
+def resumen(datos_usuario, hoy=None):
+    """Texto compacto con los resultados, listo para insertar en el prompt"""
+    calculo = calcular(datos_usuario, hoy)
+    lineas = []
+    nombre = nombre_limpio(datos_usuario.get('nombre', ''))
+    if nombre:
+        lineas.append(f"Nombre: {nombre}")
+    if calculo['edad'] is not None:
+        lineas.append(f"Edad: {calculo['edad']}")
+
+    if 'nacimiento' in calculo:
+        lineas.append(
+            f"Camino de vida {calculo['camino_de_vida']}, "
+            f"número del día {calculo['numero_dia']}, "
+            f"signo {calculo['signo']}, "
+            f"año personal {calculo['anio_personal']}, "
+            f"día personal {calculo['dia_personal']}, "
+            f"día universal {calculo['dia_universal']}"
+        )
+    else:
+        # No se entendió la fecha: pasar la respuesta tal cual
+        lineas.append(f"Fecha de nacimiento: {datos_usuario.get('fecha de nacimiento', '')}")
+        lineas.append(f"Día universal {calculo['dia_universal']}")
+    return '\n'.join(lineas)
@@ -0,0 +1,209 @@
+"""
+Paquete de recursos para el ejecutable congelado.
+
+En lugar de meter el modelo de Vosk, piper y piper_data dentro del
+ejecutable (PyInstaller los extrae a un temporal en cada arranque), se
+distribuyen en un solo archivo junto a él. El paquete se abre con mmap y
+cada directorio se extrae la primera vez que se pide a una caché
+persistente cuyo nombre es el hash del contenido; en los arranques
+siguientes resolver una ruta es leer el índice y comprobar que existe.
+
+Cada caché lleva un archivo `MARCA` y mientras un proceso la usa tiene un
+flock compartido sobre ella (los hijos de un fork lo heredan). Al extraer
+un paquete nuevo se borran las cachés de paquetes anteriores, pero solo
+las que tienen la marca y nadie tiene bloqueadas: el directorio de la
+caché lo puede elegir el usuario y puede haber otra instancia con un
+paquete viejo aún en marcha.
+
+Formato: `MAGIA`, longitud del índice (4 bytes), índice JSON y después los
+datos sin comprimir, en el orden del índice. Cada entrada guarda su ruta,
+posición, tamaño, permisos y sha256 (o el destino, si es un enlace).
+
+    python -m utils.paquete crear recursos.ovpak piper piper_data vosk-model-small-es-0.42
+    python -m utils.paquete listar recursos.ovpak
+"""
+import os
+import sys
+import json
+import mmap
+import shutil
+import struct
+import hashlib
+try:
+    import fcntl
+except ImportError:     # sin flock no se puede saber si otra instancia la usa: no se borra nada
+    fcntl = None
+
+MAGIA = b'OVPAK1\n\0'
+VERSION = 1
+_CABECERA = struct.Struct('<8sI')
+MARCA = '.oraculo-paquete'
+EN_USO = '.en-uso'
+
+def directorio_cache():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.environ.get('ORACULO_CACHE') or os.path.join(base, 'oraculo')
+
+class PaqueteRecursos:
+    def __init__(self, ruta, cache=None):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            self.mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magia, largo = _CABECERA.unpack_from(self.mapa, 0)
+        if magia != MAGIA:
+            raise ValueError(f"{ruta} no es un paquete de recursos")
+        crudo = self.mapa[_CABECERA.size:_CABECERA.size + largo]
+        indice = json.loads(crudo)
+        if indice['version'] != VERSION:
+            raise ValueError(f"{ruta}: versión de paquete {indice['version']} no soportada")
+        self.datos = _CABECERA.size + largo
+        self.entradas = indice['entradas']
+        # el índice incluye el sha256 de cada archivo: su hash identifica el contenido
+        self.hash = hashlib.sha256(crudo).hexdigest()[:16]
+        self.cache = os.path.join(cache or directorio_cache(), self.hash)
+        self.uso = self._bloquear_uso()
+
+    def directorio(self, nombre):
+        """Ruta en disco de un directorio del paquete; se extrae solo si no está ya"""
+        destino = os.path.join(self.cache, nombre)
+        if os.path.isdir(destino):
+            return destino
+        entradas = [e for e in self.entradas if e['ruta'].split('/', 1)[0] == nombre]
+        if not entradas:
+            raise KeyError(f"{nombre} no está en {self.ruta}")
+
+        # Se extrae aparte y se renombra al final: otro proceso nunca ve un directorio a medias
+        temporal = os.path.join(self.cache, f".{nombre}.{os.getpid()}")
+        shutil.rmtree(temporal, ignore_errors=True)
+        try:
+            for entrada in entradas:
+                self._extraer(entrada, temporal)
+            try:
+                os.rename(os.path.join(temporal, nombre), destino)
+            except OSError:
+                if not os.path.isdir(destino):     # si otro proceso ganó, vale el suyo
+                    raise
+        finally:
+            shutil.rmtree(temporal, ignore_errors=True)
+        print(f"📦 {nombre} extraído a {destino}")
+        self._limpiar_versiones_viejas()
+        return destino
+
+    def cerrar(self):
+        self.mapa.close()
+        if self.uso:
+            self.uso.close()
+            self.uso = None
+
+    def _bloquear_uso(self):
+        """Crear la caché con su marca y quedarse un flock compartido mientras se use"""
+        while True:
+            os.makedirs(self.cache, exist_ok=True)
+            ruta = os.path.join(self.cache, EN_USO)
+            try:
+                uso = open(ruta, 'a')
+            except FileNotFoundError:
+                continue        # otro proceso la acaba de borrar: volver a crearla
+            if fcntl:
+                fcntl.flock(uso, fcntl.LOCK_SH)
+                try:
+                    vigente = os.fstat(uso.fileno()).st_ino == os.stat(ruta).st_ino
+                except FileNotFoundError:
+                    vigente = False
+                if not vigente:
+                    # se borró mientras esperábamos el lock: este ya no protege nada
+                    uso.close()
+                    continue
+            with open(os.path.join(self.cache, MARCA), 'w') as f:
+                f.write(self.ruta)
+            return uso
+
+    def _extraer(self, entrada, raiz):
+        ruta = os.path.join(raiz, *entrada['ruta'].split('/'))
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        if 'enlace' in entrada:
+            os.symlink(entrada['enlace'], ruta)
+            return
+        inicio = self.datos + entrada['offset']
+        # vista sobre el mapa: ni el hash ni la escritura copian el archivo a memoria
+        with memoryview(self.mapa)[inicio:inicio + entrada['tamano']] as contenido:
+            if hashlib.sha256(contenido).hexdigest() != entrada['sha256']:
+                raise ValueError(f"{self.ruta}: {entrada['ruta']} está dañado")
+            with open(ruta, 'wb') as f:
+                f.write(contenido)
+        os.chmod(ruta, entrada['modo'])
+
+    def _limpiar_versiones_viejas(self):
+        """Borrar lo extraído de paquetes anteriores que ya no usa nadie"""
+        if not fcntl:
+            return
+        padre = os.path.dirname(self.cache)
+        for nombre in os.listdir(padre):
+            ruta = os.path.join(padre, nombre)
+            if ruta == self.cache or not os.path.isfile(os.path.join(ruta, MARCA)):
+                continue    # no es una caché de este módulo
+            try:
+                uso = open(os.path.join(ruta, EN_USO), 'a')
+            except OSError:
+                continue
+            with uso:
+                try:
+                    fcntl.flock(uso, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue    # otra instancia la está usando
+                shutil.rmtree(ruta, ignore_errors=True)
+                print(f"🧹 Caché de un paquete anterior borrada: {ruta}")
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def crear(ruta, directorios, base='.'):
+    """Empaquetar `directorios` (relativos a `base`) en un solo archivo"""
+    entradas = []
+    archivos = []
+    offset = 0
+    for directorio in directorios:
+        for raiz, subdirs, nombres in os.walk(os.path.join(base, directorio)):
+            subdirs.sort()
+            for nombre in sorted(nombres):
+                completa = os.path.join(raiz, nombre)
+                relativa = os.path.relpath(completa, base).replace(os.sep, '/')
+                if os.path.islink(completa):
+                    entradas.append({'ruta': relativa, 'enlace': os.readlink(completa)})
+                    continue
+                digest = _sha256(completa)
+                tamano = os.path.getsize(completa)
+                entradas.append({'ruta': relativa, 'offset': offset, 'tamano': tamano,
+                                 'modo': os.stat(completa).st_mode & 0o777, 'sha256': digest})
+                archivos.append(completa)
+                offset += tamano
+
+    indice = json.dumps({'version': VERSION, 'entradas': entradas},
+                        separators=(',', ':')).encode('utf-8')
+    with open(ruta, 'wb') as salida:
+        salida.write(_CABECERA.pack(MAGIA, len(indice)))
+        salida.write(indice)
+        for completa in archivos:
+            with open(completa, 'rb') as f:
+                shutil.copyfileobj(f, salida, 1024 * 1024)
+    print(f"📦 {ruta}: {len(entradas)} entradas, {offset / (1024 * 1024):.1f} MB")
+
+def main():
+    if len(sys.argv) >= 4 and sys.argv[1] == 'crear':
+        crear(sys.argv[2], sys.argv[3:])
+    elif len(sys.argv) == 3 and sys.argv[1] == 'listar':
+        paquete = PaqueteRecursos(sys.argv[2])
+        for entrada in paquete.entradas:
+            detalle = f"-> {entrada['enlace']}" if 'enlace' in entrada else f"{entrada['tamano']:>12}"
+            print(f"{detalle}  {entrada['ruta']}")
+        print(f"hash {paquete.hash}, caché {paquete.cache}")
+    else:
+        print("Uso: python -m utils.paquete crear PAQUETE DIR [DIR ...]")
+        print("     python -m utils.paquete listar PAQUETE")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Medición del tiempo de arranque por etapas (--profile-startup).
+
+Las etapas se registran siempre (el coste es un perf_counter por etapa);
+el informe solo se muestra cuando se pide.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+class PerfilArranque:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.etapas = []
+
+    @contextmanager
+    def medir(self, nombre):
+        """Medir el tiempo de un bloque y guardarlo como etapa"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.etapas.append((nombre, time.perf_counter() - t0))
+
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def informe(self):
+        """Texto con el desglose de etapas, de más lenta a más rápida"""
+        total = self.total()
+        lineas = ["⏱️ Perfil de arranque", "-" * 40]
+        for nombre, segundos in sorted(self.etapas, key=lambda e: -e[1]):
+            lineas.append(f"{nombre:<28} {segundos * 1000:9.1f} ms  {segundos / total:6.1%}")
+        lineas.append("-" * 40)
+        lineas.append(f"{'total':<28} {total * 1000:9.1f} ms")
+        return '\n'.join(lineas)
+
+    def guardar_json(self, ruta):
+        datos = {'total_ms': self.total() * 1000,
+                 'etapas': {nombre: segundos * 1000 for nombre, segundos in self.etapas}}
+        with open(ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=2)
+
+# Instancia compartida: el reloj empieza al importar este módulo
+perfil = PerfilArranque()
@@ -0,0 +1,302 @@
+"""
+Varios kioskos en una misma máquina, uno por tarjeta de sonido.
+
+El lanzador carga una sola vez lo que pesa (el modelo de Vosk, los módulos
+que usan todos y los WAV de las frases fijas del plan) y después hace fork
+de un proceso por puesto. Los hijos heredan esas páginas y el sistema solo
+las copia si alguien las escribe: el modelo de Kaldi vive fuera del heap de
+Python y no se toca al reconocer, así que queda compartido de verdad. La voz
+de Piper no se puede compartir así (es un ejecutable aparte en cada
+síntesis), pero su .onnx ya lo comparte la caché de páginas del sistema.
+
+Cada puesto abre su micrófono y su altavoz y atiende en modo kiosko. El
+lanzador lo vigila a través de un bloque de memoria compartido donde cada
+hijo deja un latido y el instante del último audio leído: si el proceso
+muere, deja de latir o su micrófono deja de dar audio, se relanza solo ese
+puesto (sin volver a cargar el modelo). Cada cierto tiempo informa de la
+memoria total frente al número de puestos.
+
+El lanzador no crea hilos: hacer fork de un proceso con hilos puede dejar
+locks tomados en el hijo.
+"""
+import os
+import gc
+import sys
+import mmap
+import time
+import signal
+import struct
+import shutil
+import tempfile
+import traceback
+from utils.recursos import memoria_proceso
+
+# latido, ¿escuchando?, monotonic del último bloque del micrófono.
+# Se escribe y se lee sin sincronizar: una lectura a medias solo retrasa un aviso.
+_RANURA = struct.Struct('<IB3xd')
+
+class Puesto:
+    """Un kiosko: su nombre, sus dispositivos y el estado de su proceso"""
+    def __init__(self, indice, nombre, entrada=None, salida=None):
+        self.indice = indice
+        self.nombre = nombre
+        self.entrada = entrada
+        self.salida = salida
+        self.pid = None
+        self.arranque = 0.0
+        self.latido = None
+        self.ultimo_latido = 0.0
+        self.reinicios = 0
+        self.espera = 1.0
+        self.proximo_arranque = 0.0
+        self.terminado = False
+
+    def archivo(self, ruta):
+        """La ruta de un archivo propio del puesto: logs/turnos.jsonl -> logs/turnos-puesto1.jsonl"""
+        base, extension = os.path.splitext(ruta)
+        return f"{base}-{self.nombre}{extension}"
+
+class Latido:
+    """Suscriptor del bus (en el hijo): deja en su ranura el latido y el estado del micrófono"""
+    def __init__(self, mapa, puesto, stt, captura):
+        self.mapa = mapa
+        self.offset = puesto.indice * _RANURA.size
+        self.stt = stt
+        self.captura = captura
+        self.animado = True
+        self.cuenta = 0
+        self.padre = os.getppid()
+
+    def al_cambiar(self, estado, datos):
+        pass
+
+    def tick(self, dt):
+        if os.getppid() != self.padre:
+            # el lanzador ya no está: cerrar el puesto como con Ctrl+C
+            self.animado = False
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+        self.cuenta = (self.cuenta + 1) & 0xFFFFFFFF
+        _RANURA.pack_into(self.mapa, self.offset, self.cuenta,
+                          self.captura.escuchando.is_set(), self.stt.ultimo_bloque)
+
+class Lanzador:
+    def __init__(self, plan, crear_asistente, opciones=None):
+        """`crear_asistente(puesto, stt, tts)` devuelve el AsistenteVoz de un puesto,
+        que se inicia en modo kiosko con `opciones`"""
+        conf = plan.prefork
+        self.plan = plan
+        self.crear_asistente = crear_asistente
+        self.opciones = dict(opciones or {})
+        self.puestos = [Puesto(i, p['nombre'], p.get('entrada'), p.get('salida'))
+                        for i, p in enumerate(conf.get('puestos', ()))]
+        self.registros = conf.get('registros')
+        self.revisar_cada = conf.get('revisar_cada_s', 2)
+        self.colgado = conf.get('colgado_s', 30)
+        self.sin_audio = conf.get('sin_audio_s', 10)
+        self.informe_cada = conf.get('informe_cada_s', 300)
+        self.mapa = None
+        self.stt = None
+        self.tts = None
+        self.fijas = {}
+        self.directorio_fijas = None
+        self.activo = False
+
+    def preparar(self):
+        """Cargar en el lanzador lo que van a compartir los puestos"""
+        from audio.speech_to_text import VoskSTT
+        from audio.text_to_speech import PiperTTS
+        # solo se importan los módulos; PortAudio no se inicia antes del fork
+        for modulo in ('pyaudio', 'requests', 'numpy'):
+            try:
+                __import__(modulo)
+            except ImportError:
+                pass
+
+        self.stt = VoskSTT()
+        if not self.stt.initialize():
+            print("❌ No se pudo cargar el modelo de Vosk")
+            return False
+        self.tts = PiperTTS()
+        if not self.tts.verificar_configuracion():
+            return False
+
+        # las frases fijas se sintetizan aquí una vez, en serie (sin hilos), para todos
+        self.directorio_fijas = tempfile.mkdtemp(prefix='oraculo-fijas-')
+        for i, texto in enumerate(self.plan.textos_fijos()):
+            archivo = self.tts.sintetizar(texto)
+            if archivo:
+                destino = os.path.join(self.directorio_fijas, f"{i}.wav")
+                shutil.move(archivo, destino)
+                self.fijas[texto] = destino
+        print(f"🧩 Compartido entre {len(self.puestos)} puestos: modelo de Vosk y "
+              f"{len(self.fijas)} frases fijas")
+        return True
+
+    def ejecutar(self):
+        if not self.puestos:
+            print("❌ No hay puestos en la sección 'prefork' de la configuración")
+            return
+        if not self.preparar():
+            self._limpiar()
+            return
+
+        self.mapa = mmap.mmap(-1, len(self.puestos) * _RANURA.size)
+        self.activo = True
+        signal.signal(signal.SIGTERM, self._al_terminar)
+        for puesto in self.puestos:
+            self._arrancar(puesto)
+        print(f"🎯 {len(self.puestos)} puestos atendiendo (Ctrl+C para salir)")
+
+        proximo_informe = time.monotonic() + min(self.informe_cada, 30)
+        try:
+            while self.activo and not all(p.terminado for p in self.puestos):
+                time.sleep(self.revisar_cada)
+                ahora = time.monotonic()
+                for puesto in self.puestos:
+                    self._revisar(puesto, ahora)
+                if ahora >= proximo_informe:
+                    print(self.informe())
+                    proximo_informe = ahora + self.informe_cada
+        except KeyboardInterrupt:
+            print("\n👋 Deteniendo puestos...")
+        finally:
+            print(self.informe())
+            for puesto in self.puestos:
+                if puesto.pid:
+                    self._parar(puesto)
+            self._limpiar()
+
+    def informe(self):
+        """Memoria de todos los procesos frente al número de puestos"""
+        lanzador = memoria_proceso(os.getpid())
+        hijos = [m for m in (memoria_proceso(p.pid) for p in self.puestos if p.pid) if m]
+        if not lanzador:
+            return "🧮 Memoria: no disponible (hace falta /proc/<pid>/smaps_rollup)"
+        rss = lanzador[0] + sum(m[0] for m in hijos)
+        pss = lanzador[1] + sum(m[1] for m in hijos)
+        lineas = [f"🧮 Memoria con {len(hijos)} puestos: RSS sumado {rss:.0f} MB, "
+                  f"real (PSS) {pss:.0f} MB"]
+        if hijos:
+            privada = sum(m[2] for m in hijos) / len(hijos)
+            lineas.append(f"   lanzador {lanzador[0]:.0f} MB, cada puesto añade {privada:.0f} MB "
+                          f"propios (sin compartir serían ~{lanzador[0] + privada:.0f} MB cada uno)")
+        for puesto in self.puestos:
+            estado = f"pid {puesto.pid}" if puesto.pid else "parado"
+            lineas.append(f"   {puesto.nombre}: {estado}, {puesto.reinicios} reinicios")
+        return '\n'.join(lineas)
+
+    # --- procesos ---
+    def _arrancar(self, puesto):
+        # lo cargado hasta aquí no lo vuelve a recorrer el recolector: sus páginas
+        # no se escriben en los hijos y siguen compartidas
+        gc.freeze()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            puesto.pid = pid
+            puesto.arranque = puesto.ultimo_latido = time.monotonic()
+            puesto.latido = None
+            registro = (f", registro en {os.path.join(self.registros, puesto.nombre + '.log')}"
+                        if self.registros else "")
+            print(f"🚪 Puesto {puesto.nombre}: pid {pid}{registro}")
+            return
+        codigo = 1
+        try:
+            codigo = self._atender(puesto)
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # sin salir por el camino normal: nada del lanzador debe ejecutarse en el hijo
+            os._exit(codigo)
+
+    def _atender(self, puesto):
+        """Cuerpo del hijo: el kiosko de un puesto"""
+        signal.signal(signal.SIGTERM, _interrumpir)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        if self.registros:
+            os.makedirs(self.registros, exist_ok=True)
+            salida = os.open(os.path.join(self.registros, f"{puesto.nombre}.log"),
+                             os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            os.dup2(salida, 1)
+            os.dup2(salida, 2)
+            os.close(salida)
+        _RANURA.pack_into(self.mapa, puesto.indice * _RANURA.size, 0, False, 0.0)
+        print(f"\n🚪 Puesto {puesto.nombre} (pid {os.getpid()}): micrófono "
+              f"{puesto.entrada if puesto.entrada is not None else 'predeterminado'}, altavoz "
+              f"{puesto.salida if puesto.salida is not None else 'predeterminado'}")
+
+        self.stt.dispositivo = puesto.entrada
+        self.tts.dispositivo = puesto.salida
+        asistente = self.crear_asistente(puesto, self.stt, self.tts)
+        asistente.orquestador.compartir_fijos(self.fijas)
+        asistente.interfaz.suscribir(Latido(self.mapa, puesto, self.stt,
+                                            asistente.orquestador.captura))
+        return 0 if asistente.iniciar(kiosko=True, **self.opciones) else 1
+
+    def _revisar(self, puesto, ahora):
+        if puesto.terminado:
+            return
+        if puesto.pid is None:
+            if ahora >= puesto.proximo_arranque:
+                self._arrancar(puesto)
+            return
+
+        pid, estado = os.waitpid(puesto.pid, os.WNOHANG)
+        latido, escuchando, ultimo_bloque = _RANURA.unpack_from(self.mapa,
+                                                                puesto.indice * _RANURA.size)
+        if latido != puesto.latido:
+            puesto.latido, puesto.ultimo_latido = latido, ahora
+
+        if pid:
+            puesto.pid = None
+            codigo = os.waitstatus_to_exitcode(estado)
+            if codigo == 0:
+                print(f"\n🚪 Puesto {puesto.nombre}: terminó")
+                puesto.terminado = True
+                return
+            motivo = f"salió con código {codigo}"
+        elif ahora - puesto.ultimo_latido > self.colgado:
+            motivo = "no responde"
+        elif escuchando and ahora - max(ultimo_bloque, puesto.arranque) > self.sin_audio:
+            motivo = "su micrófono no da audio"
+        else:
+            if ahora - puesto.arranque > 10:
+                puesto.espera = 1.0     # llevaba un rato bien: la próxima caída se relanza ya
+            return
+
+        print(f"\n⚠️ Puesto {puesto.nombre}: {motivo}; relanzando en {puesto.espera:.0f} s")
+        if puesto.pid:
+            self._parar(puesto)
+        puesto.reinicios += 1
+        puesto.proximo_arranque = ahora + puesto.espera
+        puesto.espera = min(puesto.espera * 2, 30.0)
+
+    def _parar(self, puesto):
+        """SIGTERM (el hijo cierra sus dispositivos) y, si no basta, SIGKILL"""
+        try:
+            os.kill(puesto.pid, signal.SIGTERM)
+            limite = time.monotonic() + 3
+            while time.monotonic() < limite:
+                if os.waitpid(puesto.pid, os.WNOHANG)[0]:
+                    break
+                time.sleep(0.05)
+            else:
+                os.kill(puesto.pid, signal.SIGKILL)
+                os.waitpid(puesto.pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            pass
+        puesto.pid = None
+
+    def _al_terminar(self, *_):
+        self.activo = False
+
+    def _limpiar(self):
+        if self.directorio_fijas:
+            shutil.rmtree(self.directorio_fijas, ignore_errors=True)
+
+def _interrumpir(*_):
+    raise KeyboardInterrupt
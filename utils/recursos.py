@@ -0,0 +1,162 @@
+"""
+Presupuesto de memoria para los componentes pesados.
+
+Cada recurso (el modelo de Vosk, las frases fijas ya sintetizadas...) se
+registra con una función para cargarlo y otra para soltarlo. Entre
+visitantes, `revisar` suelta los que llevan demasiado tiempo sin usarse y,
+si el proceso pasa del presupuesto, los menos usados recientemente. Cuando
+alguien se acerca, `precargar` los vuelve a cargar en segundo plano.
+
+Nada de lo que se registra se puede mapear con mmap en lugar de cargarlo:
+Kaldi (Vosk) lee el modelo a su propio heap, las frases fijas ya son WAV en
+disco que se leen a través de la caché de páginas y Piper corre en su propio
+proceso. Lo más parecido es soltar el recurso y devolver el heap con
+malloc_trim, que es lo que hace `_descargar`.
+"""
+import os
+import time
+import threading
+
+def rss_mb():
+    """Memoria residente actual del proceso (Linux) o None"""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+def memoria_proceso(pid):
+    """(RSS, PSS, privada) en MB de otro proceso (Linux), o None.
+
+    El RSS cuenta entera cada página compartida; el PSS la reparte entre los
+    procesos que la comparten, así que la suma de PSS es la memoria real.
+    """
+    valores = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for linea in f:
+                partes = linea.split()
+                if len(partes) == 3 and partes[2] == 'kB':
+                    valores[partes[0].rstrip(':')] = int(partes[1]) / 1024
+    except (OSError, ValueError):
+        return None
+    privada = valores.get('Private_Clean', 0) + valores.get('Private_Dirty', 0)
+    return valores.get('Rss', 0), valores.get('Pss', 0), privada
+
+def devolver_memoria():
+    """Pedir a glibc que devuelva al sistema la memoria libre del heap"""
+    try:
+        import ctypes
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+class Recurso:
+    def __init__(self, nombre, cargar, descargar, cargado):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.descargar = descargar
+        self.cargado = cargado          # función: ¿está en memoria?
+        self.ultimo_uso = time.monotonic()
+        self.tamano_mb = None           # lo que subió el RSS al cargarlo
+        self.recargas = []              # segundos de cada recarga
+        self.hilo = None                # carga en segundo plano en curso
+        self.lock = threading.Lock()
+
+class GestorRecursos:
+    def __init__(self, presupuesto_mb=None, inactividad=600, intervalo=30):
+        self.presupuesto_mb = presupuesto_mb
+        self.inactividad = inactividad
+        self.intervalo = intervalo      # cada cuánto revisar mientras se espera
+        self.recursos = {}
+
+    def registrar(self, nombre, cargar, descargar, cargado):
+        self.recursos[nombre] = Recurso(nombre, cargar, descargar, cargado)
+
+    def cargado(self, nombre):
+        return self.recursos[nombre].cargado()
+
+    def usar(self, nombre):
+        """Marcar el recurso como usado y asegurarse de que está cargado (bloquea si no)"""
+        recurso = self.recursos[nombre]
+        recurso.ultimo_uso = time.monotonic()
+        hilo = recurso.hilo
+        if hilo:
+            hilo.join()
+        if not recurso.cargado():
+            self._cargar(recurso)
+
+    def precargar(self):
+        """Volver a cargar en segundo plano todo lo que se soltó"""
+        for recurso in self.recursos.values():
+            if recurso.cargado() or recurso.hilo:
+                continue
+            recurso.hilo = threading.Thread(target=self._cargar, args=(recurso,),
+                                            name=f"cargar {recurso.nombre}", daemon=True)
+            recurso.hilo.start()
+
+    def revisar(self):
+        """Soltar lo inactivo y, si hace falta, lo menos usado hasta entrar en el presupuesto.
+
+        Solo se debe llamar cuando no hay ninguna sesión en curso. Devuelve los
+        nombres de los recursos que se soltaron.
+        """
+        ahora = time.monotonic()
+        cargados = sorted((r for r in self.recursos.values() if r.cargado() and not r.hilo),
+                          key=lambda r: r.ultimo_uso)
+        soltados = []
+        for recurso in cargados:
+            inactivo = ahora - recurso.ultimo_uso >= self.inactividad
+            rss = rss_mb()
+            excedido = self.presupuesto_mb and rss and rss > self.presupuesto_mb
+            if inactivo or excedido:
+                motivo = "inactivo" if inactivo else f"RSS {rss:.0f} MB > {self.presupuesto_mb} MB"
+                self._descargar(recurso, motivo)
+                soltados.append(recurso.nombre)
+        return soltados
+
+    def informe(self):
+        lineas = []
+        for recurso in self.recursos.values():
+            estado = "cargado" if recurso.cargado() else "suelto"
+            tamano = f"{recurso.tamano_mb:.0f} MB" if recurso.tamano_mb is not None else "?"
+            recarga = ""
+            if recurso.recargas:
+                recarga = (f", recarga media {sum(recurso.recargas) / len(recurso.recargas):.2f} s"
+                           f" ({len(recurso.recargas)})")
+            lineas.append(f"   {recurso.nombre}: {estado}, {tamano}{recarga}")
+        rss = rss_mb()
+        if rss is not None:
+            lineas.append(f"   RSS {rss:.0f} MB" + (f" / presupuesto {self.presupuesto_mb} MB"
+                                                   if self.presupuesto_mb else ""))
+        return '\n'.join(lineas)
+
+    def _cargar(self, recurso):
+        with recurso.lock:
+            try:
+                if recurso.cargado():
+                    return
+                antes = rss_mb()
+                t0 = time.perf_counter()
+                recurso.cargar()
+                segundos = time.perf_counter() - t0
+                despues = rss_mb()
+                if antes is not None and despues is not None:
+                    recurso.tamano_mb = max(0.0, despues - antes)
+                recurso.recargas.append(segundos)
+                print(f"\n♻️ {recurso.nombre} cargado en {segundos:.2f} s"
+                      + (f" (RSS {despues:.0f} MB)" if despues is not None else ""))
+            finally:
+                recurso.hilo = None
+
+    def _descargar(self, recurso, motivo):
+        with recurso.lock:
+            antes = rss_mb()
+            recurso.descargar()
+            devolver_memoria()
+            despues = rss_mb()
+        liberado = ""
+        if antes is not None and despues is not None:
+            liberado = f", -{max(0.0, antes - despues):.0f} MB"
+        print(f"\n💤 {recurso.nombre} descargado ({motivo}{liberado})")
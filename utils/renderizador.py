@@ -0,0 +1,213 @@
+"""
+El oráculo animado en su propio proceso.
+
+pygame corre en un proceso aparte para no pelear por el GIL con Vosk, Piper
+y el cliente del LLM. Los dos procesos comparten un bloque pequeño de
+memoria (un archivo mapeado) con el estado a dibujar: modo, nivel de la
+boca, parpadeo y texto. Lo escribe solo el asistente, protegido por un
+contador de secuencia: el renderizador relee si lo pilla a medias, sin
+locks entre procesos. Al final del bloque el renderizador deja sus
+contadores (cuadros, cuadros perdidos y un latido).
+
+Este módulo no importa pygame; el bucle de dibujo está en
+`utils/sprite_pygame.py` (`ejecutar_renderizador`).
+"""
+import os
+import sys
+import mmap
+import time
+import struct
+import tempfile
+import threading
+import multiprocessing
+from utils.interfaz import ESTADOS
+
+# secuencia, modo, parpadeo, nivel, largo del texto
+_ESTADO = struct.Struct('<IBxHfH')
+TEXTO_MAX = 240
+# Si el asistente deja una escritura a medias (murió con la secuencia impar), el
+# renderizador se queda con el último estado bueno tras estos intentos
+REINTENTOS_LECTURA = 1000
+# cuadros dibujados, cuadros perdidos, latido
+_CONTADORES = struct.Struct('<III')
+_OFFSET_TEXTO = _ESTADO.size
+_OFFSET_CONTADORES = _OFFSET_TEXTO + TEXTO_MAX
+TAMANO = _OFFSET_CONTADORES + _CONTADORES.size
+
+class EstadoCompartido:
+    """Bloque de estado mapeado en memoria que ven los dos procesos"""
+    def __init__(self, ruta, crear=False):
+        self.ruta = ruta
+        if crear:
+            with open(ruta, 'wb') as f:
+                f.write(bytes(TAMANO))
+        with open(ruta, 'r+b') as f:
+            self.mapa = mmap.mmap(f.fileno(), TAMANO)
+        self.lock = threading.Lock()    # varios hilos del asistente escriben
+        self.ultimo = (0, ESTADOS[0], 0, 0.0, '')  # última lectura coherente
+        self.padre = os.getppid()
+
+    # --- lado del asistente ---
+    def escribir(self, modo=None, nivel=None, parpadeo=False, texto=None):
+        """Cambiar los campos indicados; el resto se conserva"""
+        with self.lock:
+            secuencia, m, p, n, largo = _ESTADO.unpack_from(self.mapa, 0)
+            if modo is not None:
+                m = ESTADOS.index(modo)
+            if nivel is not None:
+                n = nivel
+            if parpadeo:
+                p = (p + 1) & 0xFFFF
+            # impar = escritura a medias
+            struct.pack_into('<I', self.mapa, 0, secuencia + 1)
+            if texto is not None:
+                crudo = texto.encode('utf-8')[:TEXTO_MAX]
+                largo = len(crudo)
+                self.mapa[_OFFSET_TEXTO:_OFFSET_TEXTO + largo] = crudo
+            _ESTADO.pack_into(self.mapa, 0, secuencia + 1, m, p, n, largo)
+            struct.pack_into('<I', self.mapa, 0, secuencia + 2)
+
+    def contadores(self):
+        """(cuadros, perdidos, latido) que deja el renderizador"""
+        return _CONTADORES.unpack_from(self.mapa, _OFFSET_CONTADORES)
+
+    # --- lado del renderizador ---
+    def leer(self):
+        """(secuencia, modo, parpadeo, nivel, texto) coherentes entre sí.
+
+        Si no llega a leer un estado entero (el asistente murió a mitad de una
+        escritura) devuelve el último bueno; el bucle de dibujo ya se cierra
+        al ver que el asistente no está.
+        """
+        for _ in range(REINTENTOS_LECTURA):
+            secuencia, m, p, n, largo = _ESTADO.unpack_from(self.mapa, 0)
+            if secuencia % 2 == 0:
+                texto = bytes(self.mapa[_OFFSET_TEXTO:_OFFSET_TEXTO + largo])
+                if struct.unpack_from('<I', self.mapa, 0)[0] == secuencia:
+                    self.ultimo = (secuencia, ESTADOS[m], p, n, texto.decode('utf-8', 'ignore'))
+                    return self.ultimo
+            if os.getppid() != self.padre:
+                break
+            time.sleep(0)
+        return self.ultimo
+
+    def anotar(self, cuadros, perdidos, latido):
+        _CONTADORES.pack_into(self.mapa, _OFFSET_CONTADORES,
+                              cuadros & 0xFFFFFFFF, perdidos & 0xFFFFFFFF, latido & 0xFFFFFFFF)
+
+    def cerrar(self):
+        self.mapa.close()
+
+class Renderizador:
+    """Suscriptor del bus: pasa el estado al proceso del oráculo y lo vigila.
+
+    Si el proceso muere, o deja de latir durante `colgado` segundos, se
+    relanza (esperando cada vez un poco más si se cae nada más arrancar).
+    """
+    def __init__(self, revisar_cada=1.0, colgado=5.0):
+        self.revisar_cada = revisar_cada
+        self.colgado = colgado
+        self.animado = True     # el tick solo vigila el proceso
+        fd, ruta = tempfile.mkstemp(prefix='oraculo-', suffix='.estado',
+                                    dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        os.close(fd)
+        self.estado = EstadoCompartido(ruta, crear=True)
+        self.proceso = None
+        self.arranque = 0.0
+        self.reinicios = 0
+        self.espera = 1.0
+        self.proximo_arranque = 0.0
+        self.acumulado = 0.0
+        self.latido = None
+        self.ultimo_latido = 0.0
+        self.perdidos_previos = 0   # cuadros perdidos por procesos anteriores
+        self.cuadros_previos = 0
+
+    def al_cambiar(self, estado, datos):
+        # el oráculo levanta la mirada cuando alguien empieza a hablarle
+        self.estado.escribir(modo=estado, texto=datos.get('texto', ''),
+                             parpadeo=estado == 'escuchando')
+
+    def al_nivel(self, nivel):
+        self.estado.escribir(nivel=nivel)
+
+    def tick(self, dt):
+        self.acumulado += dt
+        if self.proceso is not None and self.acumulado < self.revisar_cada:
+            return
+        self.acumulado = 0.0
+        ahora = time.monotonic()
+        if self.proceso is None:
+            if ahora >= self.proximo_arranque:
+                self._arrancar()
+            return
+
+        codigo = self.proceso.exitcode
+        cuadros, perdidos, latido = self.estado.contadores()
+        if latido != self.latido:
+            self.latido, self.ultimo_latido = latido, ahora
+        if codigo is None and ahora - self.ultimo_latido < self.colgado:
+            if ahora - self.arranque > 10:
+                self.espera = 1.0       # llevaba un rato bien: la próxima caída se relanza ya
+            return
+
+        if codigo == 0:
+            # se cerró la ventana a mano: no se relanza
+            print(f"\n🖼️ Oráculo cerrado: {self.informe()}")
+            self.proceso = None
+            self.animado = False
+            return
+        motivo = f"salió con código {codigo}" if codigo is not None else "no responde"
+        print(f"\n⚠️ Oráculo: el renderizador {motivo}; relanzando en {self.espera:.0f} s")
+        self._parar()
+        self.cuadros_previos += cuadros
+        self.perdidos_previos += perdidos
+        self.estado.anotar(0, 0, 0)
+        self.reinicios += 1
+        self.proximo_arranque = ahora + self.espera
+        self.espera = min(self.espera * 2, 30.0)
+
+    def informe(self):
+        cuadros, perdidos, _ = self.estado.contadores()
+        cuadros += self.cuadros_previos
+        perdidos += self.perdidos_previos
+        porcentaje = 100.0 * perdidos / (cuadros + perdidos) if cuadros + perdidos else 0.0
+        return (f"{cuadros} cuadros, {perdidos} perdidos ({porcentaje:.1f}%), "
+                f"{self.reinicios} reinicios")
+
+    def cerrar(self):
+        self.animado = False
+        if self.proceso is not None:
+            self._parar()
+            print(f"🖼️ Oráculo: {self.informe()}")
+        self.estado.cerrar()
+        try:
+            os.remove(self.estado.ruta)
+        except OSError:
+            pass
+
+    def _arrancar(self):
+        from config import BASE_DIR
+        # proceso nuevo (spawn, no fork): no hereda los hilos ni los modelos del
+        # asistente, y en el ejecutable de PyInstaller también funciona (no hay
+        # un intérprete al que pasarle -m)
+        contexto = multiprocessing.get_context('spawn')
+        self.proceso = contexto.Process(target=_proceso_renderizador, name='oraculo',
+                                        args=(self.estado.ruta, BASE_DIR), daemon=True)
+        self.proceso.start()
+        self.arranque = self.ultimo_latido = time.monotonic()
+        self.latido = None
+
+    def _parar(self):
+        self.proceso.terminate()
+        self.proceso.join(timeout=2)
+        if self.proceso.exitcode is None:
+            self.proceso.kill()
+            self.proceso.join()
+        self.proceso = None
+
+def _proceso_renderizador(ruta_estado, directorio):
+    """Punto de entrada del proceso del oráculo"""
+    os.chdir(directorio)    # el sprite busca sus recursos en rutas relativas
+    from utils.sprite_pygame import ejecutar_renderizador
+    sys.exit(ejecutar_renderizador(ruta_estado))
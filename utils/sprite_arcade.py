@@ -154,6 +154,7 @@ class SpriteAtlasEditor(arcade.Window):
             "Z: Deshacer último rectángulo",
             "C: Limpiar capa actual",
             "S: Guardar configuración",
+            "E: Exportar atlas empaquetado",
             "Rueda del mouse: Zoom",
             "Click derecho y arrastra: Mover vista"
         ]
@@ -259,6 +260,9 @@ class SpriteAtlasEditor(arcade.Window):
         elif key == arcade.key.S:  # Guardar
             self.save_config()
         
+        elif key == arcade.key.E:  # Exportar empaquetado
+            self.export_packed()
+        
         elif key == arcade.key.R:  # Reset vista
             self.center_atlas()
 
@@ -280,6 +284,29 @@ class SpriteAtlasEditor(arcade.Window):
         print(f"Configuración guardada en: {config_path}")
         print(f"Total de sprites: {sum(len(rects) for rects in self.layers.values())}")
 
+    def export_packed(self):
+        """Exporta un atlas recortado y reempaquetado con su índice binario"""
+        try:
+            from utils.atlas_empaquetado import exportar
+        except ImportError:     # ejecutado como script desde utils/
+            from atlas_empaquetado import exportar
+        
+        # El editor guarda los rects con origen abajo a la izquierda; la imagen, arriba
+        alto = self.atlas_texture.height
+        capas = {
+            layer: [[x, alto - y - h, w, h] for x, y, w, h in rects]
+            for layer, rects in self.layers.items()
+        }
+        
+        config_path = self.atlas_path.with_suffix('.json')
+        packed_png = self.atlas_path.with_name(self.atlas_path.stem + '_packed.png')
+        packed_idx = packed_png.with_suffix('.idx')
+        try:
+            exportar(self.atlas_path, capas, self.offsets, packed_png, packed_idx,
+                     config_path if config_path.exists() else None)
+        except Exception as e:
+            print(f"Error exportando atlas: {e}")
+
     def load_config(self, config_path):
         """Carga una configuración existente"""
         try:
@@ -1,4 +1,5 @@
-import json, time, random
+import os, json, time, random
+from collections import OrderedDict
 from pathlib import Path
 import pygame
 
@@ -8,9 +9,22 @@ FPS    = 60
 ASSETS = Path("assets")
 ATLAS  = ASSETS / "atlas.png"
 CONF   = ASSETS / "atlas_config.json"
+# exportado por el editor de arcade (tecla E): cuadros recortados + índice binario
+PACKED_ATLAS = ASSETS / "atlas_packed.png"
+PACKED_INDEX = ASSETS / "atlas_packed.idx"
 
 SCALE  = 3   # factor para escalar el sprite final en pantalla
 BG     = (16, 16, 20)
+FRAME_CACHE = 24   # cuadros compuestos (ya escalados) que se guardan
+LAYER_NAMES = ("base", "glow", "hands", "eyes", "mouths")   # orden de composición
+
+# fps de manos y brillo según lo que esté haciendo el asistente
+STATE_STYLE = {
+    "esperando":  (10, 7),
+    "escuchando": (6, 4),
+    "pensando":   (16, 14),
+    "hablando":   (10, 7),
+}
 
 # -------- Herramientas ----------
 def surf_from_rect(big_surf, rect):
@@ -24,24 +38,34 @@ def now():
 
 # --------- Anim layer -----------
 class AnimLayer:
-    def __init__(self, frames=None, fps=10, loop=True):
+    def __init__(self, frames=None, fps=10, loop=True, shifts=None):
         self.frames = frames[:] if frames else []
+        # desplazamiento de cada cuadro dentro de la capa (cuadros recortados)
+        self.shifts = shifts[:] if shifts else [(0, 0)] * len(self.frames)
         self.fps = fps
         self.loop = loop
         self.playing = True
         self.t = 0.0
         self.i = 0
+        self.dirty = True       # cambió el cuadro visible desde la última composición
+        self.version = 0        # sube al cambiar la lista de cuadros
 
     @property
     def empty(self): return not self.frames
 
-    def set_frames(self, frames):
+    def set_frames(self, frames, shifts=None):
         self.frames = frames[:]
+        self.shifts = shifts[:] if shifts else [(0, 0)] * len(self.frames)
         self.i, self.t = 0, 0
+        self.version += 1
+        self.dirty = True
 
     def set_frame(self, idx):
         if self.empty: return
-        self.i = max(0, min(idx, len(self.frames)-1))
+        i = max(0, min(idx, len(self.frames)-1))
+        if i != self.i:
+            self.i = i
+            self.dirty = True
         self.t = 0
 
     def play(self, fps=None):
@@ -55,6 +79,7 @@ class AnimLayer:
         if self.empty or not self.playing or self.fps <= 0: return
         self.t += dt
         step = 1.0 / self.fps
+        anterior = self.i
         while self.t >= step:
             self.t -= step
             self.i += 1
@@ -63,6 +88,8 @@ class AnimLayer:
                 else:
                     self.i = len(self.frames)-1
                     self.playing = False
+        if self.i != anterior:
+            self.dirty = True
 
     def current(self):
         if self.empty: return None
@@ -70,27 +97,48 @@ class AnimLayer:
 
 # ---------- Fortune Teller -----------
 class FortuneTeller(pygame.sprite.Sprite):
-    def __init__(self, atlas, config):
+    def __init__(self, atlas, config, cache_size=FRAME_CACHE):
         super().__init__()
         self.atlas = atlas
         self.cfg   = config
 
+        # cuadros compuestos por índices de capa (LRU acotado) y estadísticas
+        self.cache_size = cache_size
+        self.frame_cache = OrderedDict()
+        self.cache_versions = None
+        self.stats = {"frames": 0, "skipped": 0, "hits": 0, "misses": 0, "compose_ms": 0.0}
+
         # Cargar capas desde config (listas de rects)
-        self.base  = AnimLayer([surf_from_rect(atlas, pygame.Rect(r)) for r in self.cfg.get("base", [])], fps=0, loop=False)
+        # Las capas se escalan una sola vez al cargarlas; componer ya no escala
+        def frames(key):
+            return [scale_nn(surf_from_rect(atlas, pygame.Rect(r)), SCALE) for r in self.cfg.get(key, [])]
+
+        # en un atlas empaquetado cada cuadro recortado trae dónde iba dentro de su rect
+        trims = self.cfg.get("trims", {})
+        def shifts(key):
+            return [(dx*SCALE, dy*SCALE) for dx, dy in trims.get(key, [])]
+
+        self.base  = AnimLayer(frames("base"), fps=0, loop=False)
         if self.base.empty:
             raise RuntimeError("Config: falta 'base' (al menos 1 rect).")
 
-        self.hands = AnimLayer([surf_from_rect(atlas, pygame.Rect(r)) for r in self.cfg.get("hands", [])], fps=10, loop=True)
-        self.eyes  = AnimLayer([surf_from_rect(atlas, pygame.Rect(r)) for r in self.cfg.get("eyes",  [])], fps=0,  loop=False)
-        self.mouth = AnimLayer([surf_from_rect(atlas, pygame.Rect(r)) for r in self.cfg.get("mouths",[])], fps=12, loop=True)
+        self.hands = AnimLayer(frames("hands"), fps=10, loop=True, shifts=shifts("hands"))
+        self.eyes  = AnimLayer(frames("eyes"), fps=0,  loop=False, shifts=shifts("eyes"))
+        self.mouth = AnimLayer(frames("mouths"), fps=12, loop=True, shifts=shifts("mouths"))
         self.mouth.stop()
-        self.glow  = AnimLayer([surf_from_rect(atlas, pygame.Rect(r)) for r in self.cfg.get("glow",  [])], fps=7,  loop=True)
+        self.glow  = AnimLayer(frames("glow"), fps=7,  loop=True, shifts=shifts("glow"))
 
         # offsets (para alinear cada capa sobre la base)
         # en el JSON puedes guardar offsets por capa si tu atlas no está ya alineado
         self.offsets = self.cfg.get("offsets", {
             "hands": [0,0], "eyes":[0,0], "mouths":[0,0], "glow":[0,0]
         })
+        # ya multiplicados por la escala, como las capas
+        self.offsets_px = {k: (v[0]*SCALE, v[1]*SCALE) for k, v in self.offsets.items()}
+
+        # zonas (en pantalla) que cambiaron en el último update y lo último dibujado por capa
+        self.changed_rects = []
+        self.drawn_rects = {}
 
         # timers
         self.parp_next  = random.uniform(2.8, 5.5)
@@ -99,9 +147,11 @@ class FortuneTeller(pygame.sprite.Sprite):
 
         self.speaking = False
         self.speech_end_t = 0.0
+        self.state = None
+        self.level_driven = False   # la boca la mueve el audio real, no el conteo de palabras
 
         # imagen compuesta inicial
-        self.image = self.compose(scale=SCALE)
+        self.image = self.cached_frame(self.layers())
         self.rect  = self.image.get_rect(center=(W//2, H//2+80))
 
     # --- acciones ---
@@ -122,6 +172,23 @@ class FortuneTeller(pygame.sprite.Sprite):
         words = max(1, len(text.split()))
         self.speak_for(words * (60.0 / wpm))
 
+    def set_mouth_level(self, level):
+        """Abrir la boca según el nivel del audio (0..1): cuadro 0 cerrada, último abierta"""
+        if self.mouth.empty: return
+        self.level_driven = True
+        self.speaking = False
+        self.mouth.stop()
+        self.mouth.set_frame(int(level * len(self.mouth.frames)))
+
+    def set_state(self, state, data):
+        """Aplicar un estado del bus de la interfaz"""
+        self.state = state
+        hands_fps, glow_fps = STATE_STYLE.get(state, STATE_STYLE["esperando"])
+        self.hands.play(hands_fps)
+        self.glow.play(glow_fps)
+        if state == "hablando" and data.get("texto") and not self.level_driven:
+            self.speak_text(data["texto"])
+
     # --- ciclo ---
     def update(self, dt):
         self.hands.update(dt)
@@ -152,21 +219,95 @@ class FortuneTeller(pygame.sprite.Sprite):
         if self.speaking:
             self.mouth.update(dt)
 
-        self.image = self.compose(scale=SCALE)
+        self.stats["frames"] += 1
+        layers = self.layers()
+        if not any(layer.dirty for layer in layers):
+            # nada cambió: la imagen de este cuadro es la del anterior
+            self.stats["skipped"] += 1
+            return
+        for name, layer in zip(LAYER_NAMES, layers):
+            if layer.dirty and not layer.empty:
+                r = self.layer_rect(name, layer)
+                prev = self.drawn_rects.get(name)
+                self.changed_rects.append((r.union(prev) if prev else r).move(self.rect.topleft))
+                self.drawn_rects[name] = r
+            layer.dirty = False
+        self.image = self.cached_frame(layers)
+
+    def layers(self):
+        return (self.base, self.glow, self.hands, self.eyes, self.mouth)
+
+    def layer_pos(self, name, layer):
+        """Esquina del cuadro actual de una capa, relativa al sprite"""
+        ox, oy = self.offsets_px.get(name, (0,0))
+        dx, dy = layer.shifts[layer.i]
+        return (ox + dx, oy + dy)
+
+    def layer_rect(self, name, layer):
+        """Zona que ocupa el cuadro actual de una capa, relativa al sprite"""
+        return layer.current().get_rect(topleft=self.layer_pos(name, layer))
+
+    def cached_frame(self, layers):
+        """Cuadro compuesto y escalado para los índices actuales, de la caché si está"""
+        versions = tuple(layer.version for layer in layers)
+        if versions != self.cache_versions:
+            self.frame_cache.clear()
+            self.cache_versions = versions
+        key = tuple(layer.i for layer in layers)
+        image = self.frame_cache.get(key)
+        if image is not None:
+            self.frame_cache.move_to_end(key)
+            self.stats["hits"] += 1
+            return image
+
+        t0 = time.perf_counter()
+        image = self.compose()
+        self.stats["compose_ms"] += (time.perf_counter() - t0) * 1000
+        self.stats["misses"] += 1
+        self.frame_cache[key] = image
+        if len(self.frame_cache) > self.cache_size:
+            self.frame_cache.popitem(last=False)
+        return image
+
+    def stats_text(self):
+        st = self.stats
+        lookups = st["hits"] + st["misses"]
+        hit_rate = st["hits"] / lookups if lookups else 0.0
+        ms_frame = st["compose_ms"] / st["frames"] if st["frames"] else 0.0
+        return (f"cuadros {st['frames']}, sin cambios {st['skipped']}, "
+                f"caché {hit_rate:.0%} aciertos ({len(self.frame_cache)}/{self.cache_size}), "
+                f"componer {ms_frame:.3f} ms/cuadro")
 
     def compose(self, scale=1):
         base = self.base.current().copy()
         # superponer en orden: glow, hands, eyes, mouth
         if not self.glow.empty:
-            base.blit(self.glow.current(), self.offsets.get("glow", [0,0]))
+            base.blit(self.glow.current(), self.layer_pos("glow", self.glow))
         if not self.hands.empty:
-            base.blit(self.hands.current(), self.offsets.get("hands",[0,0]))
+            base.blit(self.hands.current(), self.layer_pos("hands", self.hands))
         if not self.eyes.empty:
-            base.blit(self.eyes.current(),  self.offsets.get("eyes", [0,0]))
+            base.blit(self.eyes.current(),  self.layer_pos("eyes", self.eyes))
         if not self.mouth.empty:
-            base.blit(self.mouth.current(), self.offsets.get("mouths",[0,0]))
+            base.blit(self.mouth.current(), self.layer_pos("mouths", self.mouth))
         return scale_nn(base, scale)
 
+# --------- Dibujo por zonas ----------
+def draw_full(screen, ft):
+    """Dibujar toda la pantalla (al empezar o al volver del modo marcado)"""
+    screen.fill(BG)
+    screen.blit(ft.image, ft.rect)
+    ft.changed_rects = []
+    pygame.display.flip()
+
+def draw_changes(screen, ft):
+    """Redibujar solo las zonas del oráculo que cambiaron y actualizar esas zonas"""
+    rects, ft.changed_rects = ft.changed_rects, []
+    for r in rects:
+        screen.fill(BG, r)
+        screen.blit(ft.image, r.topleft, area=r.move(-ft.rect.x, -ft.rect.y))
+    if rects:
+        pygame.display.update(rects)
+
 # --------- Marcador de rects (click-drag) ----------
 class RectMarker:
     LAYERS = ["base","hands","eyes","mouths","glow"]
@@ -256,6 +397,64 @@ class RectMarker:
             screen.blit(img, (8,y)); y += 18
         screen.blit(self.font.render(f"Capa actual: {self.layer}", True, (250,210,100)), (8,y))
 
+# --------- Renderizador del asistente (proceso aparte) ----------
+def ejecutar_renderizador(ruta_estado):
+    """Dibujar el oráculo según el estado compartido que escribe el asistente.
+
+    Lo lanza `utils.renderizador.Renderizador`; aquí solo se lee el bloque
+    compartido y se anotan los cuadros dibujados, los perdidos (los que no
+    llegaron a tiempo para `FPS`) y un latido por cuadro.
+    """
+    from utils.renderizador import EstadoCompartido
+    estado = EstadoCompartido(ruta_estado)
+    padre = os.getppid()
+
+    pygame.init()
+    screen = pygame.display.set_mode((W,H))
+    pygame.display.set_caption("Oráculo")
+    clock  = pygame.time.Clock()
+    atlas, cfg = load_sprite()
+    if not cfg:
+        print(f"⚠️ Sin ventana del oráculo: falta {CONF}")
+        pygame.quit()
+        return 0
+    ft = FortuneTeller(atlas, cfg)
+    draw_full(screen, ft)
+
+    secuencia = parpadeo = anterior = None
+    boca = 0.0
+    cuadros = perdidos = 0
+    periodo = 1.0 / FPS
+    while True:
+        dt = clock.tick(FPS)/1000.0
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT:
+                pygame.quit()
+                return 0
+        if os.getppid() != padre:
+            break       # el asistente ya no está
+
+        s, modo, p, nivel, texto = estado.leer()
+        if s != secuencia:
+            if (modo, texto) != anterior:
+                ft.set_state(modo, {"texto": texto})
+            if parpadeo is not None and p != parpadeo:
+                ft.blink_now()
+            if nivel != boca:
+                ft.set_mouth_level(nivel)
+            secuencia, parpadeo, anterior, boca = s, p, (modo, texto), nivel
+
+        ft.update(dt)
+        draw_changes(screen, ft)
+
+        cuadros += 1
+        if dt > periodo * 1.5:
+            perdidos += round(dt / periodo) - 1
+        estado.anotar(cuadros, perdidos, cuadros)
+
+    pygame.quit()
+    return 0
+
 # ------------- main -------------
 def load_config():
     if CONF.exists():
@@ -265,22 +464,38 @@ def load_config():
             pass
     return None
 
+def load_sprite():
+    """(atlas, config) para el oráculo: el empaquetado si está, si no el atlas marcado a mano"""
+    if PACKED_ATLAS.exists() and PACKED_INDEX.exists():
+        try:
+            from utils.atlas_empaquetado import IndiceAtlas
+        except ImportError:     # ejecutado como script desde utils/
+            from atlas_empaquetado import IndiceAtlas
+        indice = IndiceAtlas(str(PACKED_INDEX))
+        cfg = indice.como_config()
+        indice.cerrar()
+        return pygame.image.load(str(PACKED_ATLAS)).convert_alpha(), cfg
+    cfg = load_config()
+    if not cfg:
+        return None, None
+    return pygame.image.load(str(ATLAS)).convert_alpha(), cfg
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode((W,H))
     clock  = pygame.time.Clock()
 
     atlas = pygame.image.load(str(ATLAS)).convert_alpha()
-    mode  = "mark" if not CONF.exists() else "play"  # si no hay config, empezamos marcando
+    sprite_atlas, cfg = load_sprite()
+    mode  = "mark" if not cfg else "play"  # si no hay config, empezamos marcando
 
     marker = RectMarker(atlas, CONF)
 
     # si ya hay config, creamos sprite
     ft = None
     if mode=="play":
-        cfg = load_config()
-        ft = FortuneTeller(atlas, cfg)
-        group = pygame.sprite.GroupSingle(ft)
+        ft = FortuneTeller(sprite_atlas, cfg)
+        draw_full(screen, ft)
 
     running = True
     while running:
@@ -295,7 +510,7 @@ def main():
                     marker.path.write_text(json.dumps(marker.data, indent=2))
                     try:
                         ft = FortuneTeller(atlas, marker.data)
-                        group = pygame.sprite.GroupSingle(ft)
+                        draw_full(screen, ft)
                         mode = "play"
                     except Exception as ex:
                         print("Config incompleta:", ex)
@@ -305,6 +520,8 @@ def main():
                         ft.speak_text("Bienvenido, veo tu destino...", wpm=150)
                     if e.key == pygame.K_b:
                         ft.blink_now()
+                    if e.key == pygame.K_i:
+                        print(ft.stats_text())
                     if e.key == pygame.K_TAB:
                         # volver a marcar
                         mode="mark"
@@ -312,12 +529,11 @@ def main():
 
         if mode=="mark":
             marker.draw(screen)
+            pygame.display.flip()
         else:
-            group.update(dt)
-            screen.fill(BG)
-            group.draw(screen)
-
-        pygame.display.flip()
+            # solo se envían a la pantalla las zonas que cambiaron
+            ft.update(dt)
+            draw_changes(screen, ft)
 
     pygame.quit()
 
@@ -0,0 +1,40 @@
+import re
+import unicodedata
+
+# Palabras que acompañan al nombre pero no lo son
+RELLENO_NOMBRE = {'me', 'llamo', 'mi', 'nombre', 'es', 'soy', 'yo', 'el', 'la',
+                  'pues', 'hola', 'eh', 'este', 'bueno', 'se', 'dice'}
+
+def normalizar(texto):
+    """Pasar texto a minúsculas y quitar tildes para comparar respuestas habladas"""
+    texto = unicodedata.normalize('NFKD', texto.lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+def nombre_limpio(texto):
+    """El nombre sin "me llamo", "soy"..., tal como se dijo"""
+    palabras = [p for p in texto.split() if normalizar(p) not in RELLENO_NOMBRE]
+    return ' '.join(palabras).title()
+
+class Coincidencias:
+    """Buscador de palabras clave precompilado e insensible a tildes y mayúsculas.
+
+    `grupos` es un dict nombre -> lista de palabras; `buscar` devuelve el
+    nombre del grupo de la primera palabra que aparece en el texto. Las
+    palabras coinciden por inicio de palabra ("amor" encuentra "amorosa").
+    """
+    def __init__(self, grupos):
+        self.nombres = list(grupos)
+        alternativas = []
+        for i, nombre in enumerate(self.nombres):
+            palabras = sorted({normalizar(p) for p in grupos[nombre]}, key=len, reverse=True)
+            if palabras:
+                alternativas.append(f"(?P<g{i}>{'|'.join(re.escape(p) for p in palabras)})")
+        self.patron = re.compile(r'\b(?:' + '|'.join(alternativas) + ')') if alternativas else None
+
+    def buscar(self, texto):
+        if not self.patron:
+            return None
+        encontrado = self.patron.search(normalizar(texto))
+        if not encontrado:
+            return None
+        return self.nombres[int(encontrado.lastgroup[1:])]